@@ -1,13 +1,18 @@
-from django.contrib import admin
-from .models import AttendanceRecord, LeaveType, LeaveRequest
+from django.contrib import admin, messages
+from django.http import HttpResponseRedirect
+from apps.core.changelists import LargeTableAdmin
+from .leave import LeaveError, approve_leave, cancel_leave, decide_leave_requests, reject_leave
+from .models import AttendanceRecord, LeaveBalance, LeaveType, LeaveRequest
 
 # Register your models here.
 
 @admin.register(AttendanceRecord)
-class AttendanceRecordAdmin(admin.ModelAdmin):
+class AttendanceRecordAdmin(LargeTableAdmin):
     list_display = ['employee', 'date', 'check_in_time', 'check_out_time', 'hours_worked', 'status']
     list_filter = ['status', 'date', 'employee__department']
+    list_select_related = ['employee__user']
     search_fields = ['employee__user__first_name', 'employee__user__last_name', 'employee__employee_id']
+    raw_id_fields = ['employee']
     date_hierarchy = 'date'
     readonly_fields = ['hours_worked', 'overtime_hours', 'created_at', 'updated_at']
     
@@ -34,11 +39,15 @@ class LeaveTypeAdmin(admin.ModelAdmin):
     search_fields = ['name']
 
 @admin.register(LeaveRequest)
-class LeaveRequestAdmin(admin.ModelAdmin):
+class LeaveRequestAdmin(LargeTableAdmin):
     list_display = ['employee', 'leave_type', 'start_date', 'end_date', 'days_requested', 'status']
     list_filter = ['status', 'leave_type', 'start_date']
-    search_fields = ['employee__user__first_name', 'employee__user__last_name', 'reason']
+    list_select_related = ['employee__user', 'leave_type']
+    search_fields = ['employee__user__first_name', 'employee__user__last_name', 'employee__employee_id', 'reason']
+    raw_id_fields = ['employee', 'approved_by']
+    date_hierarchy = 'start_date'
     readonly_fields = ['days_requested', 'created_at', 'updated_at']
+    actions = ['approve_selected', 'reject_selected']
     
     fieldsets = (
         ('Leave Information', {
@@ -52,3 +61,64 @@ class LeaveRequestAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         })
     )
+
+    def get_readonly_fields(self, request, obj=None):
+        # Approved days are booked in the ledger; cancel and re-request to change them
+        if obj and obj.status == 'approved':
+            return self.readonly_fields + ['employee', 'leave_type', 'start_date', 'end_date']
+        return self.readonly_fields
+
+    def changeform_view(self, request, object_id=None, form_url='', extra_context=None):
+        # The admin saves inside one transaction: a refused status change
+        # raises out of save_model so the whole save is rolled back
+        try:
+            return super().changeform_view(request, object_id, form_url, extra_context)
+        except LeaveError as e:
+            self.message_user(request, f'Not saved: {e}', level=messages.ERROR)
+            return HttpResponseRedirect(request.get_full_path())
+
+    def save_model(self, request, obj, form, change):
+        # Status changes go through the leave engine so the balance ledger
+        # and the overlap constraint are respected
+        new_status = obj.status
+        if new_status == (form.initial.get('status') if change else 'pending'):
+            return super().save_model(request, obj, form, change)
+        
+        obj.status = form.initial['status'] if change else 'pending'
+        super().save_model(request, obj, form, change)
+        if new_status == 'approved':
+            approve_leave(obj, request.user)
+        elif new_status == 'rejected':
+            reject_leave(obj, request.user, obj.rejection_reason or '')
+        elif new_status == 'cancelled':
+            cancel_leave(obj)
+        else:
+            raise LeaveError(f'Requests cannot be moved back to {new_status}')
+
+    def _decide(self, request, queryset, approve):
+        try:
+            decided, skipped = decide_leave_requests(list(queryset.values_list('id', flat=True)), approve, request.user)
+        except LeaveError as e:
+            self.message_user(request, str(e), level=messages.ERROR)
+            return
+        verb = 'Approved' if approve else 'Rejected'
+        self.message_user(request, f'{verb} {len(decided)} leave request(s).')
+        for leave_request_id, reason in skipped.items():
+            self.message_user(request, f'Request {leave_request_id} skipped: {reason}', level=messages.WARNING)
+
+    @admin.action(description='Approve selected pending requests')
+    def approve_selected(self, request, queryset):
+        self._decide(request, queryset, approve=True)
+
+    @admin.action(description='Reject selected pending requests')
+    def reject_selected(self, request, queryset):
+        self._decide(request, queryset, approve=False)
+
+@admin.register(LeaveBalance)
+class LeaveBalanceAdmin(admin.ModelAdmin):
+    list_display = ['employee', 'leave_type', 'year', 'days_allowed', 'days_used']
+    list_filter = ['year', 'leave_type']
+    list_select_related = ['employee__user', 'leave_type']
+    raw_id_fields = ['employee']
+    search_fields = ['employee__user__first_name', 'employee__user__last_name', 'employee__employee_id']
+    readonly_fields = ['days_used', 'updated_at']
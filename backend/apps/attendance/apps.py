@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class AttendanceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.attendance'
+
+    def ready(self):
+        from apps.core.cache import register_cache_invalidation
+        from .models import LeaveType
+        register_cache_invalidation(LeaveType)
@@ -0,0 +1,86 @@
+"""
+Geofence-driven attendance (``AUTO_ATTENDANCE``).
+
+Works off the enter/exit events of ``apps.geofencing.visits`` in batches,
+away from the request path: the first geofence entry of an employee's day
+opens the day's ``AttendanceRecord``, and a record opened that way is
+checked out at the last exit once the employee has stayed outside every
+geofence for ``AUTO_CHECKOUT_AFTER_MINUTES``.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef, Subquery
+from django.utils import timezone
+
+from apps.geofencing.models import GeofenceVisit
+
+from .models import AttendanceRecord
+
+
+def open_attendance(events):
+    """
+    Create check-ins for the first entry event per employee and day; returns
+    how many rows were inserted. Run it as ``process_location_stream``'s
+    ``handle_events`` so the check-ins commit with the stream cursor.
+    """
+    first_entries = {}
+    for event in events:
+        if event.kind != 'enter':
+            continue
+        key = (event.employee_id, timezone.localdate(event.timestamp))
+        if key not in first_entries or event.timestamp < first_entries[key].timestamp:
+            first_entries[key] = event
+    if not first_entries:
+        return 0
+
+    existing = set(
+        AttendanceRecord.objects.filter(
+            employee_id__in={employee_id for employee_id, day in first_entries},
+            date__in={day for employee_id, day in first_entries},
+        ).values_list('employee_id', 'date')
+    )
+    records = [
+        AttendanceRecord(
+            employee_id=employee_id, date=day, check_in_time=event.timestamp, status='present',
+            source='geofence', notes=f'Automatic check-in on entering geofence {event.geofence_id}',
+        )
+        for (employee_id, day), event in first_entries.items()
+        if (employee_id, day) not in existing
+    ]
+    # A concurrent manual check-in wins over the automatic one, and
+    # ignore_conflicts does not report which rows it skipped: count the
+    # automatic records now present for the days that had none
+    AttendanceRecord.objects.bulk_create(records, ignore_conflicts=True)
+    wanted = {(record.employee_id, record.date) for record in records}
+    inserted = AttendanceRecord.objects.filter(
+        employee_id__in={employee_id for employee_id, day in wanted},
+        date__in={day for employee_id, day in wanted},
+        source='geofence',
+    ).values_list('employee_id', 'date')
+    return sum(1 for key in inserted if key in wanted)
+
+
+def close_attendance(now=None):
+    """Check out open geofence records after a sustained exit; returns how many"""
+    now = now or timezone.now()
+    cutoff = now - timedelta(minutes=settings.AUTO_CHECKOUT_AFTER_MINUTES)
+    visits = GeofenceVisit.objects.filter(employee_id=OuterRef('employee_id'))
+    records = list(
+        AttendanceRecord.objects.filter(
+            source='geofence', check_in_time__isnull=False, check_out_time__isnull=True,
+        ).annotate(
+            inside=Exists(visits.filter(exited_at__isnull=True)),
+            last_exit=Subquery(
+                visits.filter(exited_at__gte=OuterRef('check_in_time')).order_by('-exited_at').values('exited_at')[:1]
+            ),
+        ).filter(inside=False, last_exit__lt=cutoff)
+    )
+    for record in records:
+        record.check_out_time = record.last_exit
+        record.calculate_hours()
+        record.updated_at = now
+    AttendanceRecord.objects.bulk_update(
+        records, ['check_out_time', 'hours_worked', 'overtime_hours', 'updated_at'], batch_size=1000
+    )
+    return len(records)
@@ -0,0 +1,41 @@
+from apps.core.bulk import iter_rows
+from apps.core.serialization import display_name
+from .models import AttendanceRecord
+
+EXPORT_CHUNK_SIZE = 5000
+
+ATTENDANCE_COLUMNS = [
+    ('id', 'int'),
+    ('employee_id', 'str'),
+    ('employee_name', 'str'),
+    ('department', 'str'),
+    ('date', 'date'),
+    ('check_in_time', 'datetime'),
+    ('check_out_time', 'datetime'),
+    ('status', 'str'),
+    ('hours_worked', 'decimal'),
+    ('overtime_hours', 'decimal'),
+]
+
+
+def attendance_rows(start=None, end=None, using=None):
+    """Attendance export rows between ``start`` and ``end`` (inclusive), streamed from the ``using`` DB"""
+    records = AttendanceRecord.objects.using(using).order_by('date', 'id')
+    if start:
+        records = records.filter(date__gte=start)
+    if end:
+        records = records.filter(date__lte=end)
+
+    fields = (
+        'id', 'employee__employee_id', 'employee__user__first_name',
+        'employee__user__last_name', 'employee__user__username',
+        'employee__department__name', 'date', 'check_in_time',
+        'check_out_time', 'status', 'hours_worked', 'overtime_hours',
+    )
+    for row in iter_rows(records, fields, chunk_size=EXPORT_CHUNK_SIZE):
+        yield (
+            row.id, row.employee__employee_id,
+            display_name(row.employee__user__first_name, row.employee__user__last_name, row.employee__user__username),
+            row.employee__department__name, row.date, row.check_in_time, row.check_out_time,
+            row.status, row.hours_worked, row.overtime_hours,
+        )
@@ -0,0 +1,257 @@
+"""
+Leave approval and balance engine.
+
+Overlap between approved requests of one employee is rejected by the
+``leave_no_overlapping_approved`` GiST exclusion constraint on
+``LeaveRequest.period``, so approving never scans an employee's history.
+Approved days are booked in the ``LeaveBalance`` ledger (one row per
+employee, leave type and year, found through its unique index); requests
+spanning New Year are booked against both years.
+
+``decide_leave_requests`` approves or rejects many requests at once: one
+locking read, one ``UPDATE ... WHERE id IN`` for the requests and one for
+the ledger, and a single notification job for the whole batch.
+"""
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+
+from django.contrib.postgres.fields.ranges import DateRange
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.utils import timezone
+
+from .models import LeaveBalance, LeaveRequest
+
+MAX_BULK_DECISIONS = 500
+
+
+class LeaveError(Exception):
+    """A leave request cannot move to the requested state"""
+
+
+def days_by_year(start_date, end_date):
+    """Inclusive day counts of [start_date, end_date] per calendar year"""
+    days = Counter()
+    while start_date <= end_date:
+        year_end = min(end_date, date(start_date.year, 12, 31))
+        days[start_date.year] += (year_end - start_date).days + 1
+        start_date = year_end + timedelta(days=1)
+    return days
+
+
+def _locked_balances(employee_id, leave_type, years):
+    """Ledger rows for ``years``, created on first use and locked for update"""
+    LeaveBalance.objects.bulk_create(
+        [
+            LeaveBalance(employee_id=employee_id, leave_type=leave_type, year=year, days_allowed=leave_type.days_allowed)
+            for year in years
+        ],
+        ignore_conflicts=True,
+    )
+    return {
+        balance.year: balance
+        for balance in LeaveBalance.objects.select_for_update().filter(
+            employee_id=employee_id, leave_type=leave_type, year__in=years
+        )
+    }
+
+
+def book_days(employee_id, leave_type, days, check_balance=True):
+    """
+    Add ``days`` ({year: days}, negative to refund) to the ledger. Raises
+    ``LeaveError`` when a booking would exceed the yearly entitlement.
+    """
+    balances = _locked_balances(employee_id, leave_type, list(days))
+    if check_balance:
+        for year, count in days.items():
+            if count > 0 and balances[year].days_remaining < count:
+                raise LeaveError(
+                    f'Not enough {leave_type.name} balance for {year}: '
+                    f'{balances[year].days_remaining} days left, {count} requested'
+                )
+    for year, count in days.items():
+        LeaveBalance.objects.filter(pk=balances[year].pk).update(
+            days_used=F('days_used') + count, updated_at=timezone.now()
+        )
+
+
+# Celery priorities (0 = most urgent): a single decision is delivered ahead
+# of a queued month-end batch
+SINGLE_DECISION_PRIORITY = 2
+BULK_DECISION_PRIORITY = 6
+
+
+def _notify(leave_request_ids):
+    from apps.notifications.tasks import send_leave_decisions
+
+    # After commit, so the job never sees (or misses) uncommitted decisions
+    priority = SINGLE_DECISION_PRIORITY if len(leave_request_ids) == 1 else BULK_DECISION_PRIORITY
+    transaction.on_commit(
+        lambda: send_leave_decisions.apply_async((leave_request_ids,), priority=priority), robust=True
+    )
+
+
+def approve_leave(leave_request, approved_by):
+    """Approve a pending request and book its days"""
+    with transaction.atomic():
+        leave_request = LeaveRequest.objects.select_for_update().select_related('leave_type').get(pk=leave_request.pk)
+        if leave_request.status != 'pending':
+            raise LeaveError(f'Only pending requests can be approved, this one is {leave_request.status}')
+
+        book_days(
+            leave_request.employee_id, leave_request.leave_type,
+            days_by_year(leave_request.start_date, leave_request.end_date),
+        )
+        leave_request.status = 'approved'
+        leave_request.approved_by = approved_by
+        leave_request.approved_at = timezone.now()
+        try:
+            with transaction.atomic():
+                leave_request.save(update_fields=['status', 'approved_by', 'approved_at', 'updated_at'])
+        except IntegrityError:
+            raise LeaveError('The request overlaps leave that is already approved')
+        _notify([leave_request.pk])
+    return leave_request
+
+
+def reject_leave(leave_request, rejected_by, reason=''):
+    with transaction.atomic():
+        leave_request = LeaveRequest.objects.select_for_update().get(pk=leave_request.pk)
+        if leave_request.status != 'pending':
+            raise LeaveError(f'Only pending requests can be rejected, this one is {leave_request.status}')
+        leave_request.status = 'rejected'
+        leave_request.approved_by = rejected_by
+        leave_request.approved_at = timezone.now()
+        leave_request.rejection_reason = reason
+        leave_request.save(update_fields=['status', 'approved_by', 'approved_at', 'rejection_reason', 'updated_at'])
+        _notify([leave_request.pk])
+    return leave_request
+
+
+def cancel_leave(leave_request):
+    """Cancel a pending or approved request, refunding approved days"""
+    with transaction.atomic():
+        leave_request = LeaveRequest.objects.select_for_update().select_related('leave_type').get(pk=leave_request.pk)
+        if leave_request.status not in ('pending', 'approved'):
+            raise LeaveError(f'A {leave_request.status} request cannot be cancelled')
+        if leave_request.status == 'approved':
+            refund = days_by_year(leave_request.start_date, leave_request.end_date)
+            book_days(
+                leave_request.employee_id, leave_request.leave_type,
+                {year: -count for year, count in refund.items()}, check_balance=False,
+            )
+        leave_request.status = 'cancelled'
+        leave_request.save(update_fields=['status', 'updated_at'])
+    return leave_request
+
+
+def _overlaps(start_date, end_date, periods):
+    return any(start_date <= other_end and other_start <= end_date for other_start, other_end in periods)
+
+
+def decide_leave_requests(leave_request_ids, approve, decided_by, reason=''):
+    """
+    Approve (or reject) the pending requests among ``leave_request_ids`` in
+    one transaction. Requests that would overlap approved leave or exceed a
+    balance are skipped rather than failing the batch. Returns
+    ``(decided_ids, {skipped_id: reason})``.
+    """
+    if len(leave_request_ids) > MAX_BULK_DECISIONS:
+        raise LeaveError(f'At most {MAX_BULK_DECISIONS} requests can be decided at once')
+    requested = set(leave_request_ids)
+
+    with transaction.atomic():
+        pending = list(
+            LeaveRequest.objects.select_for_update(of=('self',))
+            .filter(id__in=requested, status='pending')
+            .order_by('created_at', 'id')
+            .values_list('id', 'employee_id', 'leave_type_id', 'leave_type__name',
+                         'leave_type__days_allowed', 'start_date', 'end_date', named=True)
+        )
+        skipped = {leave_request_id: 'Not found or no longer pending'
+                   for leave_request_id in requested - {row.id for row in pending}}
+        if not pending:
+            return [], skipped
+
+        now = timezone.now()
+        if not approve:
+            decided = [row.id for row in pending]
+            LeaveRequest.objects.filter(id__in=decided).update(
+                status='rejected', approved_by=decided_by, approved_at=now,
+                rejection_reason=reason, updated_at=now,
+            )
+            _notify(decided)
+            return decided, skipped
+
+        # Approved leave of these employees anywhere in the batch's date span,
+        # found through the GiST index on period
+        approved = defaultdict(list)
+        span = DateRange(min(row.start_date for row in pending), max(row.end_date for row in pending), '[]')
+        for employee_id, period in LeaveRequest.objects.filter(
+            employee_id__in={row.employee_id for row in pending}, status='approved', period__overlap=span,
+        ).values_list('employee_id', 'period'):
+            approved[employee_id].append((period.lower, period.upper - timedelta(days=1)))
+
+        # Ledger rows for every (employee, leave type, year) touched, created
+        # on first use and locked
+        wanted = {}
+        for row in pending:
+            for year in days_by_year(row.start_date, row.end_date):
+                wanted[row.employee_id, row.leave_type_id, year] = row.leave_type__days_allowed
+        LeaveBalance.objects.bulk_create(
+            [
+                LeaveBalance(employee_id=employee_id, leave_type_id=leave_type_id, year=year, days_allowed=days_allowed)
+                for (employee_id, leave_type_id, year), days_allowed in wanted.items()
+            ],
+            ignore_conflicts=True,
+        )
+        match = Q()
+        for employee_id, leave_type_id, year in wanted:
+            match |= Q(employee_id=employee_id, leave_type_id=leave_type_id, year=year)
+        balances = {
+            (balance.employee_id, balance.leave_type_id, balance.year): balance
+            for balance in LeaveBalance.objects.select_for_update().filter(match)
+        }
+
+        # Oldest requests first, each checked against what the batch has
+        # already booked
+        decided = []
+        booked = Counter()
+        for row in pending:
+            if _overlaps(row.start_date, row.end_date, approved[row.employee_id]):
+                skipped[row.id] = 'Overlaps leave that is already approved'
+                continue
+            days = days_by_year(row.start_date, row.end_date)
+            short = [
+                year for year, count in days.items()
+                if balances[row.employee_id, row.leave_type_id, year].days_remaining
+                - booked[row.employee_id, row.leave_type_id, year] < count
+            ]
+            if short:
+                skipped[row.id] = f'Not enough {row.leave_type__name} balance for {short[0]}'
+                continue
+            for year, count in days.items():
+                booked[row.employee_id, row.leave_type_id, year] += count
+            approved[row.employee_id].append((row.start_date, row.end_date))
+            decided.append(row.id)
+
+        if not decided:
+            return [], skipped
+
+        try:
+            with transaction.atomic():
+                LeaveRequest.objects.filter(id__in=decided).update(
+                    status='approved', approved_by=decided_by, approved_at=now, updated_at=now,
+                )
+        except IntegrityError:
+            # Approved concurrently by someone not holding these row locks
+            raise LeaveError('Some requests overlap leave that is already approved')
+        LeaveBalance.objects.filter(pk__in=[balances[key].pk for key in booked]).update(
+            days_used=F('days_used') + Case(
+                *(When(pk=balances[key].pk, then=Value(count)) for key, count in booked.items()),
+                output_field=IntegerField(),
+            ),
+            updated_at=now,
+        )
+        _notify(decided)
+    return decided, skipped
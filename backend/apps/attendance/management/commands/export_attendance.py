@@ -0,0 +1,25 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.attendance.exports import ATTENDANCE_COLUMNS, attendance_rows
+from apps.core.exports import write_export
+
+
+class Command(BaseCommand):
+    help = 'Export attendance records to CSV or Parquet with a server-side cursor (constant memory).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=date.fromisoformat, help='First date to include (YYYY-MM-DD)')
+        parser.add_argument('--end', type=date.fromisoformat, help='Last date to include (YYYY-MM-DD)')
+        parser.add_argument('--format', choices=['csv', 'parquet'], default='csv')
+        parser.add_argument('--output', required=True, help='File to write')
+        parser.add_argument('--database', help='Database alias to read from, e.g. replica1 (default: default)')
+
+    def handle(self, *args, **options):
+        rows = attendance_rows(options['start'], options['end'], using=options['database'])
+        try:
+            count = write_export(options['output'], options['format'], ATTENDANCE_COLUMNS, rows)
+        except RuntimeError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"{count} attendance records written to {options['output']}"))
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendancerecord',
+            name='source',
+            field=models.CharField(choices=[('manual', 'Manual'), ('geofence', 'Geofence')], default='manual', max_length=20),
+        ),
+    ]
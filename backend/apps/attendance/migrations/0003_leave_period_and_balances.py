@@ -0,0 +1,75 @@
+from collections import Counter
+from datetime import date, timedelta
+
+import django.contrib.postgres.constraints
+import django.contrib.postgres.fields.ranges
+import django.db.models.deletion
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations, models
+
+
+def days_by_year(start_date, end_date):
+    # Frozen copy of apps.attendance.leave.days_by_year
+    days = Counter()
+    while start_date <= end_date:
+        year_end = min(end_date, date(start_date.year, 12, 31))
+        days[start_date.year] += (year_end - start_date).days + 1
+        start_date = year_end + timedelta(days=1)
+    return days
+
+
+def backfill_balances(apps, schema_editor):
+    """Book the already approved requests into the new ledger"""
+    LeaveRequest = apps.get_model('attendance', 'LeaveRequest')
+    LeaveBalance = apps.get_model('attendance', 'LeaveBalance')
+
+    balances = {}
+    approved = LeaveRequest.objects.filter(status='approved').select_related('leave_type')
+    for leave in approved.iterator(chunk_size=2000):
+        for year, days in days_by_year(leave.start_date, leave.end_date).items():
+            key = (leave.employee_id, leave.leave_type_id, year)
+            if key not in balances:
+                balances[key] = LeaveBalance(
+                    employee_id=leave.employee_id, leave_type_id=leave.leave_type_id, year=year,
+                    days_allowed=leave.leave_type.days_allowed, days_used=0,
+                )
+            balances[key].days_used += days
+    LeaveBalance.objects.bulk_create(balances.values(), batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0002_attendancerecord_source'),
+        ('employees', '0001_initial'),
+    ]
+
+    operations = [
+        BtreeGistExtension(),
+        migrations.AddField(
+            model_name='leaverequest',
+            name='period',
+            field=models.GeneratedField(db_persist=True, expression=models.Func(models.F('start_date'), models.F('end_date'), models.Value('[]'), function='daterange', output_field=django.contrib.postgres.fields.ranges.DateRangeField()), output_field=django.contrib.postgres.fields.ranges.DateRangeField()),
+        ),
+        migrations.AddConstraint(
+            model_name='leaverequest',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(condition=models.Q(('status', 'approved')), expressions=[('employee', '='), ('period', '&&')], index_type='gist', name='leave_no_overlapping_approved'),
+        ),
+        migrations.CreateModel(
+            name='LeaveBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('days_allowed', models.IntegerField(help_text='Entitlement for the year, from the leave type when the ledger is opened')),
+                ('days_used', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leave_balances', to='employees.employee')),
+                ('leave_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='attendance.leavetype')),
+            ],
+            options={
+                'ordering': ['year', 'leave_type'],
+                'constraints': [models.UniqueConstraint(fields=('employee', 'leave_type', 'year'), name='unique_leave_balance')],
+            },
+        ),
+        migrations.RunPython(backfill_balances, migrations.RunPython.noop),
+    ]
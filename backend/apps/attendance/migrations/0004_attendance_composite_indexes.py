@@ -0,0 +1,23 @@
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction; check-ins
+    # keep writing while the indexes build
+    atomic = False
+
+    dependencies = [
+        ('attendance', '0003_leave_period_and_balances'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='attendancerecord',
+            index=models.Index(fields=['employee', '-date', '-check_in_time'], name='attendance_employee_date_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='attendancerecord',
+            index=models.Index(fields=['date', 'status'], name='attendance_date_status_idx'),
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateRangeField, RangeOperators
 from django.utils import timezone
 from apps.employees.models import Employee
 
@@ -14,7 +16,13 @@ class AttendanceRecord(models.Model):
         ('on_leave', 'On Leave'),
     ]
 
-    employee = models.ForeignKey(Employee, on_delete=models.CASCADE)
+    SOURCE_CHOICES = [
+        ('manual', 'Manual'),
+        ('geofence', 'Geofence'),
+    ]
+
+    # Indexed by attendance_employee_date_idx (and unique_together)
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, db_index=False)
     date = models.DateField()
     check_in_time = models.DateTimeField(null=True, blank=True)
     check_out_time = models.DateTimeField(null=True, blank=True)
@@ -22,10 +30,15 @@ class AttendanceRecord(models.Model):
     hours_worked = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
     overtime_hours = models.DecimalField(max_digits=5, decimal_places=2, default=0)
     notes = models.TextField(blank=True, null=True)
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, default='manual')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def save(self, *args, **kwargs):
+        self.calculate_hours()
+        super().save(*args, **kwargs)
+
+    def calculate_hours(self):
         # Calculate hours worked if both check-in and check-out times are available
         if self.check_in_time and self.check_out_time:
             time_diff = self.check_out_time - self.check_in_time
@@ -36,8 +49,6 @@ class AttendanceRecord(models.Model):
                 self.overtime_hours = self.hours_worked - 8
             else:
                 self.overtime_hours = 0
-        
-        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.employee.user.get_full_name()} - {self.date} ({self.status})"
@@ -45,6 +56,12 @@ class AttendanceRecord(models.Model):
     class Meta:
         ordering = ['-date', '-check_in_time']
         unique_together = ['employee', 'date']
+        indexes = [
+            # An employee's history in list order, without a sort step
+            models.Index(fields=['employee', '-date', '-check_in_time'], name='attendance_employee_date_idx'),
+            # Day roll-ups (who is present / late / absent on a date)
+            models.Index(fields=['date', 'status'], name='attendance_date_status_idx'),
+        ]
 
 class LeaveType(models.Model):
     name = models.CharField(max_length=50)
@@ -56,6 +73,11 @@ class LeaveType(models.Model):
     def __str__(self):
         return self.name
 
+def get_leave_types():
+    """All leave types, served from cache"""
+    from apps.core.cache import cached
+    return cached(LeaveType, 'all', lambda: list(LeaveType.objects.order_by('name')))
+
 class LeaveRequest(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -74,6 +96,16 @@ class LeaveRequest(models.Model):
     approved_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='approved_leaves')
     approved_at = models.DateTimeField(null=True, blank=True)
     rejection_reason = models.TextField(blank=True, null=True)
+    # Inclusive [start_date, end_date] range maintained by PostgreSQL, for
+    # the overlap constraint and range queries
+    period = models.GeneratedField(
+        expression=models.Func(
+            models.F('start_date'), models.F('end_date'), models.Value('[]'),
+            function='daterange', output_field=DateRangeField()
+        ),
+        output_field=DateRangeField(),
+        db_persist=True,
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -88,3 +120,37 @@ class LeaveRequest(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        constraints = [
+            # Approved leave of one employee may not overlap (GiST, needs btree_gist)
+            ExclusionConstraint(
+                name='leave_no_overlapping_approved',
+                expressions=[('employee', RangeOperators.EQUAL), ('period', RangeOperators.OVERLAPS)],
+                condition=models.Q(status='approved'),
+                index_type='gist',
+            ),
+        ]
+
+class LeaveBalance(models.Model):
+    """
+    Per employee, leave type and year ledger of approved leave days, kept up
+    to date by ``apps.attendance.leave`` on approval and cancellation.
+    """
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='leave_balances')
+    leave_type = models.ForeignKey(LeaveType, on_delete=models.CASCADE)
+    year = models.PositiveSmallIntegerField()
+    days_allowed = models.IntegerField(help_text="Entitlement for the year, from the leave type when the ledger is opened")
+    days_used = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def days_remaining(self):
+        return self.days_allowed - self.days_used
+
+    def __str__(self):
+        return f"{self.employee} - {self.leave_type} {self.year}: {self.days_used}/{self.days_allowed}"
+
+    class Meta:
+        ordering = ['year', 'leave_type']
+        constraints = [
+            models.UniqueConstraint(fields=['employee', 'leave_type', 'year'], name='unique_leave_balance'),
+        ]
@@ -1,3 +1,221 @@
+import csv
+from datetime import date, datetime, timezone as dt_timezone
+from io import StringIO
+from unittest.mock import patch
+
 from django.test import TestCase
+from django.urls import reverse
+
+from apps.core.testing import create_employee
+from apps.employees.models import Department
+from apps.notifications.tasks import send_leave_decisions
+
+from .exports import ATTENDANCE_COLUMNS
+from .leave import (
+    BULK_DECISION_PRIORITY, SINGLE_DECISION_PRIORITY, LeaveError, approve_leave, cancel_leave, days_by_year,
+    decide_leave_requests,
+)
+from .models import AttendanceRecord, LeaveBalance, LeaveRequest, LeaveType
+
+
+class LeaveAdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_employee('leave-admin', is_staff=True).user
+        cls.admin.is_superuser = True
+        cls.admin.save()
+        cls.employee = create_employee('leave-taker')
+        cls.leave_type = LeaveType.objects.create(name='Short', days_allowed=1)
+
+    def test_refused_approval_rolls_back_the_whole_save(self):
+        leave = LeaveRequest.objects.create(
+            employee=self.employee, leave_type=self.leave_type, reason='before',
+            start_date=date(2026, 3, 2), end_date=date(2026, 3, 6),
+        )
+        self.client.force_login(self.admin)
+        url = reverse('admin:attendance_leaverequest_change', args=[leave.pk])
+        response = self.client.post(url, {
+            'employee': self.employee.pk, 'leave_type': self.leave_type.pk,
+            'start_date': '2026-03-02', 'end_date': '2026-03-06', 'reason': 'after',
+            'status': 'approved', 'approved_by': '', 'approved_at_0': '', 'approved_at_1': '',
+            'rejection_reason': '',
+        }, follow=True)
+
+        leave.refresh_from_db()
+        self.assertEqual((leave.status, leave.reason), ('pending', 'before'))
+        sent = [str(message) for message in response.context['messages']]
+        self.assertEqual(len(sent), 1)
+        self.assertTrue(sent[0].startswith('Not saved:'), sent)
+
+
+class LeaveLedgerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = create_employee('ledger-manager', is_staff=True).user
+        cls.employee = create_employee('ledger-taker')
+        cls.annual = LeaveType.objects.create(name='Annual', days_allowed=5)
+
+    def request(self, start_date, end_date):
+        return LeaveRequest.objects.create(
+            employee=self.employee, leave_type=self.annual, reason='time off', start_date=start_date, end_date=end_date,
+        )
+
+    def used(self):
+        return dict(LeaveBalance.objects.filter(employee=self.employee).values_list('year', 'days_used'))
+
+    def test_days_by_year_splits_at_new_year(self):
+        self.assertEqual(days_by_year(date(2026, 3, 2), date(2026, 3, 2)), {2026: 1})
+        self.assertEqual(days_by_year(date(2025, 12, 30), date(2027, 1, 1)), {2025: 2, 2026: 365, 2027: 1})
+
+    def test_overlapping_approval_is_refused_by_the_constraint(self):
+        approve_leave(self.request(date(2026, 3, 2), date(2026, 3, 3)), self.manager)
+        overlapping = self.request(date(2026, 3, 3), date(2026, 3, 4))
+
+        with self.assertRaisesMessage(LeaveError, 'overlaps leave that is already approved'):
+            approve_leave(overlapping, self.manager)
+        overlapping.refresh_from_db()
+        self.assertEqual(overlapping.status, 'pending')
+        self.assertEqual(self.used(), {2026: 2})
+
+    def test_approval_beyond_the_balance_is_refused(self):
+        approve_leave(self.request(date(2026, 3, 2), date(2026, 3, 4)), self.manager)
+        too_long = self.request(date(2026, 4, 6), date(2026, 4, 8))
+
+        with self.assertRaisesMessage(LeaveError, 'Not enough Annual balance for 2026: 2 days left, 3 requested'):
+            approve_leave(too_long, self.manager)
+        too_long.refresh_from_db()
+        self.assertEqual(too_long.status, 'pending')
+        self.assertEqual(self.used(), {2026: 3})
+
+    def test_cancelling_refunds_the_balance(self):
+        leave = approve_leave(self.request(date(2026, 3, 2), date(2026, 3, 4)), self.manager)
+        self.assertEqual(self.used(), {2026: 3})
+
+        self.assertEqual(cancel_leave(leave).status, 'cancelled')
+        self.assertEqual(self.used(), {2026: 0})
+        # The refunded days and dates are free again
+        approve_leave(self.request(date(2026, 3, 2), date(2026, 3, 6)), self.manager)
+        self.assertEqual(self.used(), {2026: 5})
+
+    def test_leave_over_new_year_is_booked_against_both_years(self):
+        leave = approve_leave(self.request(date(2026, 12, 29), date(2027, 1, 2)), self.manager)
+        self.assertEqual(self.used(), {2026: 3, 2027: 2})
+        self.assertEqual(
+            set(LeaveBalance.objects.filter(employee=self.employee).values_list('days_allowed', flat=True)), {5},
+        )
+
+        cancel_leave(leave)
+        self.assertEqual(self.used(), {2026: 0, 2027: 0})
+
+
+class LeaveDecisionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = create_employee('leave-manager', is_staff=True).user
+        cls.first = create_employee('first-taker')
+        cls.second = create_employee('second-taker')
+        cls.annual = LeaveType.objects.create(name='Annual', days_allowed=10)
+
+    def request(self, employee, start_date, end_date):
+        return LeaveRequest.objects.create(
+            employee=employee, leave_type=self.annual, reason='time off', start_date=start_date, end_date=end_date,
+        )
+
+    def used(self, employee, year):
+        return LeaveBalance.objects.get(employee=employee, leave_type=self.annual, year=year).days_used
+
+    def test_batch_skips_overlaps_and_overdrafts_and_books_the_rest(self):
+        earlier = approve_leave(self.request(self.first, date(2026, 2, 2), date(2026, 2, 3)), self.manager)
+        week = self.request(self.first, date(2026, 3, 2), date(2026, 3, 6))
+        clashing = self.request(self.first, date(2026, 3, 5), date(2026, 3, 9))
+        too_long = self.request(self.first, date(2026, 4, 1), date(2026, 4, 7))
+        touching_earlier = self.request(self.first, date(2026, 2, 3), date(2026, 2, 4))
+        new_year = self.request(self.second, date(2026, 12, 30), date(2027, 1, 2))
+        spring = self.request(self.second, date(2026, 3, 2), date(2026, 3, 4))
+        ids = [earlier.id, week.id, clashing.id, too_long.id, touching_earlier.id, new_year.id, spring.id]
+
+        with patch.object(send_leave_decisions, 'apply_async') as apply_async:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                decided, skipped = decide_leave_requests(ids, approve=True, decided_by=self.manager)
+                apply_async.assert_not_called()
+
+        self.assertEqual(decided, [week.id, new_year.id, spring.id])
+        self.assertEqual(skipped, {
+            earlier.id: 'Not found or no longer pending',
+            clashing.id: 'Overlaps leave that is already approved',
+            too_long.id: 'Not enough Annual balance for 2026',
+            touching_earlier.id: 'Overlaps leave that is already approved',
+        })
+        self.assertEqual(
+            dict(LeaveRequest.objects.filter(id__in=ids).values_list('id', 'status')),
+            {earlier.id: 'approved', week.id: 'approved', clashing.id: 'pending', too_long.id: 'pending',
+             touching_earlier.id: 'pending', new_year.id: 'approved', spring.id: 'approved'},
+        )
+        self.assertEqual(self.used(self.first, 2026), 2 + 5)
+        self.assertEqual((self.used(self.second, 2026), self.used(self.second, 2027)), (2 + 3, 2))
+        self.assertEqual(len(callbacks), 1)
+        apply_async.assert_called_once_with(([week.id, new_year.id, spring.id],), priority=BULK_DECISION_PRIORITY)
+
+    def test_rejecting_a_batch_leaves_the_ledger_alone(self):
+        requests = [self.request(self.first, date(2026, 5, 4), date(2026, 5, 5)),
+                    self.request(self.second, date(2026, 5, 4), date(2026, 5, 8))]
+        ids = [leave.id for leave in requests]
+
+        with patch.object(send_leave_decisions, 'apply_async') as apply_async:
+            with self.captureOnCommitCallbacks(execute=True):
+                decided, skipped = decide_leave_requests(ids, approve=False, decided_by=self.manager, reason='Busy')
+
+        self.assertEqual((decided, skipped), (ids, {}))
+        self.assertEqual(
+            set(LeaveRequest.objects.filter(id__in=ids).values_list('status', 'approved_by', 'rejection_reason')),
+            {('rejected', self.manager.id, 'Busy')},
+        )
+        self.assertFalse(LeaveBalance.objects.exists())
+        apply_async.assert_called_once_with((ids,), priority=BULK_DECISION_PRIORITY)
+
+    def test_single_decisions_are_queued_ahead_of_batches(self):
+        leave = self.request(self.first, date(2026, 6, 1), date(2026, 6, 1))
+        with patch.object(send_leave_decisions, 'apply_async') as apply_async:
+            with self.captureOnCommitCallbacks(execute=True):
+                approve_leave(leave, self.manager)
+        apply_async.assert_called_once_with(([leave.id],), priority=SINGLE_DECISION_PRIORITY)
+
+
+class AttendanceExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = create_employee('attendance-admin', is_staff=True).user
+        cls.employee = create_employee('exported', department=Department.objects.create(name='Field'))
+        cls.unnamed = create_employee('nameless')
+        cls.unnamed.user.first_name = cls.unnamed.user.last_name = ''
+        cls.unnamed.user.save()
+        check_in = datetime(2026, 3, 2, 8, 0, tzinfo=dt_timezone.utc)
+        cls.worked = AttendanceRecord.objects.create(
+            employee=cls.employee, date=date(2026, 3, 2), check_in_time=check_in,
+            check_out_time=datetime(2026, 3, 2, 17, 30, tzinfo=dt_timezone.utc),
+        )
+        cls.absent = AttendanceRecord.objects.create(employee=cls.unnamed, date=date(2026, 3, 3), status='absent')
+        AttendanceRecord.objects.create(employee=cls.employee, date=date(2026, 4, 1), status='late')
+
+    def download(self, **params):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('export_attendance'), params)
+        self.assertEqual(response.status_code, 200)
+        return list(csv.reader(StringIO(b''.join(response.streaming_content).decode())))
+
+    def test_csv_has_the_declared_columns_and_filters_by_date(self):
+        header, *rows = self.download(start='2026-03-01', end='2026-03-31')
+        self.assertEqual(header, [name for name, kind in ATTENDANCE_COLUMNS])
+        self.assertEqual(rows, [
+            [str(self.worked.id), 'T-exported', 'Exported Tester', 'Field', '2026-03-02',
+             '2026-03-02 08:00:00+00:00', '2026-03-02 17:30:00+00:00', 'present', '9.50', '1.50'],
+            [str(self.absent.id), 'T-nameless', 'nameless', '', '2026-03-03', '', '', 'absent', '', '0.00'],
+        ])
+
+    def test_open_ended_ranges(self):
+        self.assertEqual([row[4] for row in self.download(start='2026-03-03')[1:]], ['2026-03-03', '2026-04-01'])
+        self.assertEqual(len(self.download()), 4)
 
-# Create your tests here.
+    def test_only_staff_can_export(self):
+        self.client.force_login(self.employee.user)
+        self.assertEqual(self.client.get(reverse('export_attendance')).status_code, 403)
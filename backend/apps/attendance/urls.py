@@ -6,4 +6,8 @@ urlpatterns = [
     path('', views.list_attendance, name='list_attendance'),
     path('check-in/', views.check_in, name='check_in'),
     path('check-out/', views.check_out, name='check_out'),
+    path('export/', views.export_attendance, name='export_attendance'),
+    path('leave-balances/', views.list_leave_balances, name='list_leave_balances'),
+    path('leave-requests/decide/', views.decide_leave, name='decide_leave'),
+    path('leave-types/', views.list_leave_types, name='list_leave_types'),
 ]
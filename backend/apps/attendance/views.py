@@ -4,13 +4,60 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
-from drf_spectacular.utils import extend_schema, OpenApiResponse
-from .models import AttendanceRecord
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
+from apps.core.async_views import api_response, async_api_view
+from apps.core.exports import streaming_csv_response
+from apps.core.routers import replica_reads
+from apps.core.serialization import display_name, values_rows
+from .exports import ATTENDANCE_COLUMNS, attendance_rows
+from .leave import LeaveError, MAX_BULK_DECISIONS, decide_leave_requests
+from .models import AttendanceRecord, LeaveBalance, get_leave_types
 from django.contrib.auth.models import User
+from django.db import router
+from django.utils import timezone
 from datetime import datetime, date
 
 # Create your views here.
 
+ATTENDANCE_LIST_FIELDS = (
+    'id', 'employee__employee_id', 'employee__user__first_name',
+    'employee__user__last_name', 'employee__user__username', 'date',
+    'check_in_time', 'check_out_time', 'status', 'hours_worked',
+    'overtime_hours', 'notes', 'source',
+)
+
+def _attendance_row(row):
+    return {
+        'id': row.id,
+        'employee_name': display_name(
+            row.employee__user__first_name,
+            row.employee__user__last_name,
+            row.employee__user__username,
+        ),
+        'employee_id': row.employee__employee_id,
+        'date': row.date,
+        'check_in_time': row.check_in_time,
+        'check_out_time': row.check_out_time,
+        'status': row.status,
+        'hours_worked': row.hours_worked or None,
+        'overtime_hours': row.overtime_hours or 0.0,
+        'notes': row.notes,
+        'source': row.source
+    }
+
+LEAVE_BALANCE_FIELDS = ('leave_type_id', 'leave_type__name', 'year', 'days_allowed', 'days_used')
+
+def _leave_balance_row(row):
+    return {
+        'leave_type_id': row.leave_type_id,
+        'leave_type': row.leave_type__name,
+        'year': row.year,
+        'days_allowed': row.days_allowed,
+        'days_used': row.days_used,
+        'days_remaining': row.days_allowed - row.days_used
+    }
+
 def test_view(request):
     """Simple test view to verify URL configuration is working"""
     return JsonResponse({
@@ -33,32 +80,20 @@ def test_view(request):
 )
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@replica_reads
 def list_attendance(request):
     """Get attendance records"""
     try:
         if request.user.is_staff:
             # Admin can see all attendance records
-            attendance_records = AttendanceRecord.objects.select_related('employee__user').all()
+            attendance_records = AttendanceRecord.objects.all()
         else:
             # Regular users see only their own records
             attendance_records = AttendanceRecord.objects.filter(
                 employee__user=request.user
-            ).select_related('employee__user')
-        
-        attendance_data = []
-        for record in attendance_records:
-            attendance_data.append({
-                'id': record.id,
-                'employee_name': record.employee.user.get_full_name() or record.employee.user.username,
-                'employee_id': record.employee.employee_id,
-                'date': record.date,
-                'check_in_time': record.check_in_time,
-                'check_out_time': record.check_out_time,
-                'status': record.status,
-                'hours_worked': float(record.hours_worked) if record.hours_worked else None,
-                'overtime_hours': float(record.overtime_hours) if record.overtime_hours else 0.0,
-                'notes': record.notes
-            })
+            )
+        
+        attendance_data = values_rows(attendance_records, ATTENDANCE_LIST_FIELDS, _attendance_row)
         
         return Response({
             'attendance_records': attendance_data,
@@ -70,6 +105,207 @@ def list_attendance(request):
             'error': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@extend_schema(
+    tags=['Attendance'],
+    summary='List Leave Types',
+    description='Get all leave types (served from cache)',
+    responses={
+        200: OpenApiResponse(
+            description='List of leave types'
+        ),
+        401: OpenApiResponse(
+            description='Authentication required'
+        )
+    }
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def list_leave_types(request):
+    """Get leave types"""
+    try:
+        leave_types = [
+            {
+                'id': leave_type.id,
+                'name': leave_type.name,
+                'description': leave_type.description,
+                'days_allowed': leave_type.days_allowed,
+                'is_paid': leave_type.is_paid
+            }
+            for leave_type in get_leave_types()
+        ]
+        
+        return Response({
+            'leave_types': leave_types,
+            'count': len(leave_types)
+        }, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@extend_schema(
+    tags=['Attendance'],
+    summary='List Leave Balances',
+    description="Get the authenticated employee's leave balances for a year (default: the current year)",
+    parameters=[
+        OpenApiParameter('year', OpenApiTypes.INT, description='Calendar year'),
+    ],
+    responses={
+        200: OpenApiResponse(
+            description='Leave balances per leave type'
+        ),
+        400: OpenApiResponse(
+            description='Invalid year'
+        )
+    }
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def list_leave_balances(request):
+    """Get leave balances from the ledger"""
+    try:
+        year = request.query_params.get('year') or str(date.today().year)
+        if not year.isdigit():
+            return Response({
+                'error': 'year must be a number'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        balances = LeaveBalance.objects.filter(employee__user=request.user, year=int(year))
+        balance_data = values_rows(balances, LEAVE_BALANCE_FIELDS, _leave_balance_row)
+        
+        return Response({
+            'year': int(year),
+            'balances': balance_data,
+            'count': len(balance_data)
+        }, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@extend_schema(
+    tags=['Attendance'],
+    summary='Decide Leave Requests',
+    description=f'Approve or reject up to {MAX_BULK_DECISIONS} pending leave requests in one transaction (admin only). '
+                'Requests that overlap approved leave or exceed a balance are skipped.',
+    request={
+        'type': 'object',
+        'properties': {
+            'ids': {'type': 'array', 'items': {'type': 'integer'}},
+            'action': {'type': 'string', 'enum': ['approve', 'reject']},
+            'reason': {'type': 'string'}
+        },
+        'required': ['ids', 'action']
+    },
+    responses={
+        200: OpenApiResponse(
+            description='Decided and skipped request ids'
+        ),
+        400: OpenApiResponse(
+            description='Invalid request data'
+        ),
+        403: OpenApiResponse(
+            description='Admin access required'
+        ),
+        409: OpenApiResponse(
+            description='The batch conflicts with a concurrent approval'
+        )
+    }
+)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def decide_leave(request):
+    """Approve or reject leave requests in bulk"""
+    try:
+        if not request.user.is_staff:
+            return Response({
+                'error': 'Only administrators can approve or reject leave'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        ids = request.data.get('ids')
+        action = request.data.get('action')
+        if (not isinstance(ids, list) or not ids
+                or not all(isinstance(value, int) and not isinstance(value, bool) for value in ids)):
+            return Response({
+                'error': 'ids must be a non-empty list of integers'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if action not in ('approve', 'reject'):
+            return Response({
+                'error': "action must be 'approve' or 'reject'"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > MAX_BULK_DECISIONS:
+            return Response({
+                'error': f'At most {MAX_BULK_DECISIONS} requests can be decided at once'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            decided, skipped = decide_leave_requests(
+                ids, action == 'approve', request.user, reason=request.data.get('reason', '')
+            )
+        except LeaveError as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_409_CONFLICT)
+        
+        return Response({
+            'action': action,
+            'decided': decided,
+            'skipped': [{'id': leave_request_id, 'reason': reason} for leave_request_id, reason in skipped.items()],
+            'count': len(decided)
+        }, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@extend_schema(
+    tags=['Attendance'],
+    summary='Export Attendance',
+    description='Stream attendance records as CSV (admin only). Optional start/end dates (YYYY-MM-DD).',
+    parameters=[
+        OpenApiParameter('start', OpenApiTypes.DATE, description='First date to include'),
+        OpenApiParameter('end', OpenApiTypes.DATE, description='Last date to include'),
+    ],
+    responses={
+        200: OpenApiResponse(
+            description='CSV file'
+        ),
+        400: OpenApiResponse(
+            description='Invalid date'
+        ),
+        403: OpenApiResponse(
+            description='Admin access required'
+        )
+    }
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@replica_reads
+def export_attendance(request):
+    """Stream attendance records as CSV"""
+    if not request.user.is_staff:
+        return Response({
+            'error': 'Only administrators can export attendance'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    try:
+        start = request.query_params.get('start')
+        end = request.query_params.get('end')
+        start = date.fromisoformat(start) if start else None
+        end = date.fromisoformat(end) if end else None
+    except ValueError:
+        return Response({
+            'error': 'start and end must be dates in YYYY-MM-DD format'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    filename = f"attendance-{start or 'all'}-{end or 'all'}.csv"
+    # Rows stream after the view returns; bind the replica chosen for this request
+    rows = attendance_rows(start, end, using=router.db_for_read(AttendanceRecord))
+    return streaming_csv_response(request, filename, ATTENDANCE_COLUMNS, rows)
+
 @extend_schema(
     tags=['Attendance'],
     summary='Check In',
@@ -92,15 +328,14 @@ def list_attendance(request):
         )
     }
 )
-@api_view(['POST'])
-@permission_classes([IsAuthenticated])
-def check_in(request):
-    """Record employee check-in"""
+@async_api_view(['POST'])
+async def check_in(request):
+    """Record employee check-in (async, served natively under ASGI)"""
     try:
         from apps.employees.models import Employee
         
         # Get or create employee record
-        employee, created = Employee.objects.get_or_create(
+        employee, created = await Employee.objects.aget_or_create(
             user=request.user,
             defaults={
                 'employee_id': f'EMP{request.user.id:04d}',
@@ -111,27 +346,27 @@ def check_in(request):
         
         # Check if already checked in today
         today = date.today()
-        existing_checkin = AttendanceRecord.objects.filter(
+        already_checked_in = await AttendanceRecord.objects.filter(
             employee=employee,
             date=today,
             check_in_time__isnull=False
-        ).first()
+        ).aexists()
         
-        if existing_checkin:
-            return Response({
+        if already_checked_in:
+            return api_response({
                 'error': 'Already checked in today'
             }, status=status.HTTP_400_BAD_REQUEST)
         
         # Create attendance record
-        attendance = AttendanceRecord.objects.create(
+        attendance = await AttendanceRecord.objects.acreate(
             employee=employee,
             date=today,
-            check_in_time=datetime.now(),
+            check_in_time=timezone.now(),
             notes=request.data.get('notes', ''),
             status='present'
         )
         
-        return Response({
+        return api_response({
             'message': 'Check-in recorded successfully',
             'attendance_id': attendance.id,
             'check_in_time': attendance.check_in_time,
@@ -139,7 +374,7 @@ def check_in(request):
         }, status=status.HTTP_201_CREATED)
         
     except Exception as e:
-        return Response({
+        return api_response({
             'error': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -159,40 +394,34 @@ def check_in(request):
         )
     }
 )
-@api_view(['POST'])
-@permission_classes([IsAuthenticated])
-def check_out(request):
-    """Record employee check-out"""
+@async_api_view(['POST'])
+async def check_out(request):
+    """Record employee check-out (async, served natively under ASGI)"""
     try:
-        from apps.employees.models import Employee
-        
-        # Get employee record
-        try:
-            employee = Employee.objects.get(user=request.user)
-        except Employee.DoesNotExist:
-            return Response({
-                'error': 'Employee record not found'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Find today's attendance record
+        # Find today's open attendance record for the user's employee
         today = date.today()
-        attendance = AttendanceRecord.objects.filter(
-            employee=employee,
+        attendance = await AttendanceRecord.objects.filter(
+            employee__user=request.user,
             date=today,
             check_in_time__isnull=False,
             check_out_time__isnull=True
-        ).first()
+        ).afirst()
         
         if not attendance:
-            return Response({
+            from apps.employees.models import Employee
+            if not await Employee.objects.filter(user=request.user).aexists():
+                return api_response({
+                    'error': 'Employee record not found'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            return api_response({
                 'error': 'No check-in found for today'
             }, status=status.HTTP_400_BAD_REQUEST)
         
         # Update check-out time
-        attendance.check_out_time = datetime.now()
-        attendance.save()
+        attendance.check_out_time = timezone.now()
+        await attendance.asave()
         
-        return Response({
+        return api_response({
             'message': 'Check-out recorded successfully',
             'attendance_id': attendance.id,
             'check_out_time': attendance.check_out_time,
@@ -201,6 +430,6 @@ def check_out(request):
         }, status=status.HTTP_200_OK)
         
     except Exception as e:
-        return Response({
+        return api_response({
             'error': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -0,0 +1,193 @@
+import json
+import time
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.middleware.csrf import CsrfViewMiddleware
+from rest_framework import exceptions, status
+from rest_framework.authentication import SessionAuthentication, TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+
+from .middleware import record_serialization
+
+
+class _CSRFCheck(CsrfViewMiddleware):
+    def _reject(self, request, reason):
+        return reason
+
+
+def api_response(data, status=status.HTTP_200_OK, headers=None):
+    """Render ``data`` with the configured DRF renderer outside of an APIView"""
+    renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+    start = time.perf_counter()
+    content = renderer.render(data)
+    record_serialization(time.perf_counter() - start)
+    response = HttpResponse(
+        content,
+        status=status,
+        content_type=renderer.media_type,
+    )
+    for name, value in (headers or {}).items():
+        response[name] = value
+    return response
+
+
+async def _token_user(request):
+    """Native async TokenAuthentication.authenticate"""
+    auth = request.headers.get('Authorization', '').split()
+    if not auth or auth[0].lower() != 'token':
+        return None
+    if len(auth) != 2:
+        raise exceptions.AuthenticationFailed('Invalid token header.')
+    try:
+        token = await Token.objects.select_related('user').aget(key=auth[1])
+    except Token.DoesNotExist:
+        raise exceptions.AuthenticationFailed('Invalid token.')
+    if not token.user.is_active:
+        raise exceptions.AuthenticationFailed('User inactive or deleted.')
+    return token.user, token
+
+
+async def _session_user(request):
+    """Native async SessionAuthentication.authenticate, CSRF included"""
+    user = await request.auser()
+    if not user or not user.is_active:
+        return None
+    if request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE'):
+        check = _CSRFCheck(lambda req: None)
+        check.process_request(request)
+        reason = check.process_view(request, None, (), {})
+        if reason:
+            raise exceptions.PermissionDenied(f'CSRF Failed: {reason}')
+    return user, None
+
+
+# DRF's stock authentication classes run natively on the async ORM; any other
+# configured class runs in a thread through sync_to_async
+_NATIVE_AUTHENTICATION = {
+    TokenAuthentication: _token_user,
+    SessionAuthentication: _session_user,
+}
+
+
+async def authenticate(request, drf_request, view):
+    """
+    Apply ``DEFAULT_AUTHENTICATION_CLASSES``, ``DEFAULT_PERMISSION_CLASSES``
+    and ``DEFAULT_THROTTLE_CLASSES`` in DRF's order. Returns the user; raises
+    ``APIException`` like ``APIView.initial`` would.
+    """
+    user = AnonymousUser()
+    for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        native = _NATIVE_AUTHENTICATION.get(authentication_class)
+        if native is not None:
+            result = await native(request)
+        else:
+            result = await sync_to_async(authentication_class().authenticate)(drf_request)
+        if result is not None:
+            user = result[0]
+            break
+    drf_request.user = user
+
+    for permission_class in api_settings.DEFAULT_PERMISSION_CLASSES:
+        permission = permission_class()
+        if permission_class is IsAuthenticated:
+            allowed = user.is_authenticated
+        else:
+            allowed = await sync_to_async(permission.has_permission)(drf_request, view)
+        if not allowed:
+            if not user.is_authenticated:
+                raise exceptions.NotAuthenticated()
+            raise exceptions.PermissionDenied(getattr(permission, 'message', None))
+
+    for throttle_class in api_settings.DEFAULT_THROTTLE_CLASSES:
+        throttle = throttle_class()
+        if not await sync_to_async(throttle.allow_request)(drf_request, view):
+            raise exceptions.Throttled(throttle.wait())
+    return user
+
+
+def _error_response(exc, drf_request):
+    """Render an APIException the way DRF's exception handler does"""
+    headers = {}
+    status_code = exc.status_code
+    if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+        authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
+        header = authentication_classes[0]().authenticate_header(drf_request) if authentication_classes else None
+        if header:
+            headers['WWW-Authenticate'] = header
+        else:
+            status_code = status.HTTP_403_FORBIDDEN
+    if getattr(exc, 'wait', None):
+        headers['Retry-After'] = str(int(exc.wait))
+    return api_response({'detail': exc.detail}, status_code, headers=headers)
+
+
+def _schema_view(view, http_method_names):
+    """
+    APIView stand-in exposed as ``cls`` so drf-spectacular lists the async
+    view (and ``@extend_schema`` applies to it), and the ``view`` handed to
+    permission and throttle classes. It is schema-only: its handlers raise
+    RuntimeError if anything ever dispatches it.
+    """
+    def handler(self, request, *args, **kwargs):
+        raise RuntimeError(
+            f'{type(self).__name__} is a schema-only stand-in; requests are served by the async view '
+            f'{view.__module__}.{view.__qualname__}'
+        )
+
+    attrs = {'http_method_names': [method.lower() for method in http_method_names], '__doc__': view.__doc__}
+    for method in http_method_names:
+        attrs[method.lower()] = handler
+    return type(view.__name__, (APIView,), attrs)
+
+
+def async_api_view(http_method_names):
+    """
+    Async counterpart of ``@api_view`` for hot endpoints.
+
+    Runs natively under ASGI: Token and Session authentication and the view
+    body use Django's async ORM, so no request is routed through the
+    sync_to_async thread pool. Other configured authentication, permission
+    and throttle classes are honoured too, run through sync_to_async. The
+    JSON object body is exposed as ``request.data``. Put ``@extend_schema``
+    above it, as with ``@api_view``.
+    """
+    def decorator(view):
+        schema_view = _schema_view(view, http_method_names)
+
+        @wraps(view)
+        async def wrapped_view(request, *args, **kwargs):
+            if request.method not in http_method_names:
+                return api_response(
+                    {'detail': f'Method "{request.method}" not allowed.'},
+                    status.HTTP_405_METHOD_NOT_ALLOWED,
+                    headers={'Allow': ', '.join(http_method_names)},
+                )
+
+            drf_request = Request(request)
+            try:
+                request.user = await authenticate(request, drf_request, schema_view())
+            except exceptions.APIException as exc:
+                return _error_response(exc, drf_request)
+
+            try:
+                request.data = json.loads(request.body) if request.body else {}
+            except ValueError as e:
+                return api_response({'detail': f'JSON parse error - {e}'}, status.HTTP_400_BAD_REQUEST)
+            if not isinstance(request.data, dict):
+                return api_response({'detail': 'Expected a JSON object.'}, status.HTTP_400_BAD_REQUEST)
+
+            return await view(request, *args, **kwargs)
+
+        # CSRF is enforced in authenticate() for session users only, like DRF
+        wrapped_view.csrf_exempt = True
+        wrapped_view.cls = schema_view
+        wrapped_view.initkwargs = {}
+        return wrapped_view
+    return decorator
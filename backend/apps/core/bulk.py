@@ -0,0 +1,32 @@
+"""
+Bulk reads without model instances.
+
+Rows are fetched with ``values_list(*fields, named=True)`` through
+``QuerySet.iterator(chunk_size)``, which on PostgreSQL reads from a named
+(server-side) cursor ``chunk_size`` rows at a time. Memory is bounded by one
+chunk however many rows match, and each row is a plain namedtuple addressed
+by field path, e.g. ``row.employee__user__username``.
+
+With ``DB_PGBOUNCER`` server-side cursors are disabled and Django falls back
+to fetching the result client-side in ``chunk_size`` batches.
+"""
+from itertools import islice
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def iter_rows(queryset, fields, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield one namedtuple per row of ``queryset`` with the given ``fields``"""
+    return queryset.values_list(*fields, named=True).iterator(chunk_size=chunk_size)
+
+
+def aiter_rows(queryset, fields, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Async counterpart of ``iter_rows`` for ``async for``"""
+    return queryset.values_list(*fields, named=True).aiterator(chunk_size=chunk_size)
+
+
+def iter_batches(queryset, fields, batch_size=DEFAULT_CHUNK_SIZE):
+    """Yield lists of up to ``batch_size`` rows, for jobs that work a batch at a time"""
+    rows = iter_rows(queryset, fields, chunk_size=batch_size)
+    while batch := list(islice(rows, batch_size)):
+        yield batch
@@ -0,0 +1,124 @@
+"""
+Small model-aware caching layer on top of Django's cache framework.
+
+Every cached value is keyed by the *generation* of the models it was built
+from. Saving or deleting an instance of a registered model bumps that
+model's generation, which orphans every key built from it at once (lists,
+per-user payloads, lookups) without having to track individual keys.
+
+Values are always built from the ``default`` database, never a replica.
+
+Signals do not fire for ``QuerySet.update()``, ``bulk_create()`` or raw SQL;
+call ``invalidate_model()`` explicitly after those.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+
+from .routers import primary_reads
+
+DEFAULT_TIMEOUT = getattr(settings, 'MODEL_CACHE_TIMEOUT', 15 * 60)
+
+_registered = set()
+
+
+def _generation_key(model):
+    return f'cachegen:{model._meta.label_lower}'
+
+
+def model_generation(model):
+    """Current cache generation of ``model``"""
+    key = _generation_key(model)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, 1, timeout=None)
+        generation = cache.get(key, 1)
+    return generation
+
+
+def invalidate_model(model):
+    """Orphan every cached value built from ``model``"""
+    key = _generation_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+
+
+def model_cache_key(models, *parts):
+    """Cache key for ``parts`` scoped to the generations of ``models``"""
+    generations = ':'.join(
+        f'{model._meta.label_lower}.{model_generation(model)}' for model in models
+    )
+    return ':'.join(['model', generations, *map(str, parts)])
+
+
+def cached(models, key, builder, timeout=DEFAULT_TIMEOUT):
+    """
+    Return the cached value for ``key`` or build and store it.
+
+    ``models`` is a model or an iterable of the models the value is derived
+    from; changes to any of them invalidate it.
+    """
+    if not isinstance(models, (list, tuple)):
+        models = (models,)
+    cache_key = model_cache_key(models, key)
+    value = cache.get(cache_key)
+    if value is None:
+        with primary_reads():
+            value = builder()
+        cache.set(cache_key, value, timeout)
+    return value
+
+
+async def amodel_generation(model):
+    key = _generation_key(model)
+    generation = await cache.aget(key)
+    if generation is None:
+        await cache.aadd(key, 1, timeout=None)
+        generation = await cache.aget(key, 1)
+    return generation
+
+
+async def acached(models, key, abuilder, timeout=DEFAULT_TIMEOUT):
+    """Async variant of ``cached()``; ``abuilder`` is a coroutine function"""
+    if not isinstance(models, (list, tuple)):
+        models = (models,)
+    generations = ':'.join(
+        [f'{model._meta.label_lower}.{await amodel_generation(model)}' for model in models]
+    )
+    cache_key = ':'.join(['model', generations, str(key)])
+    value = await cache.aget(cache_key)
+    if value is None:
+        with primary_reads():
+            value = await abuilder()
+        await cache.aset(cache_key, value, timeout)
+    return value
+
+
+def _invalidate_sender(sender, **kwargs):
+    invalidate_model(sender)
+
+
+def _invalidate_on_fields(fields):
+    fields = frozenset(fields)
+
+    def receiver(sender, update_fields=None, **kwargs):
+        if update_fields is None or fields.intersection(update_fields):
+            invalidate_model(sender)
+    return receiver
+
+
+def register_cache_invalidation(*models, fields=None):
+    """
+    Bump the cache generation of ``models`` whenever a row is saved or
+    deleted. With ``fields``, saves restricted by ``update_fields`` to other
+    columns (such as the ``last_login`` update on every login) are ignored.
+    """
+    on_save = _invalidate_sender if fields is None else _invalidate_on_fields(fields)
+    for model in models:
+        if model in _registered:
+            continue
+        post_save.connect(on_save, sender=model, dispatch_uid=f'cache:{model._meta.label_lower}:save')
+        post_delete.connect(_invalidate_sender, sender=model, dispatch_uid=f'cache:{model._meta.label_lower}:delete')
+        _registered.add(model)
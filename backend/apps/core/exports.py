@@ -0,0 +1,114 @@
+"""
+Constant-memory exports.
+
+Rows come from ``values_list(...).iterator(chunk_size)`` (a server-side
+cursor on PostgreSQL) and are written out chunk by chunk as CSV, either
+streamed over HTTP or to a file, or as Parquet record batches when pyarrow
+is installed. Columns are declared as ``(name, kind)`` pairs with kind one
+of ``int``, ``str``, ``bool``, ``date``, ``datetime`` or ``decimal``.
+"""
+import csv
+import io
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet export is optional
+    pyarrow = None
+
+ROWS_PER_CHUNK = 1000
+PARQUET_BATCH_SIZE = 50_000
+
+
+def csv_chunks(columns, rows, rows_per_chunk=ROWS_PER_CHUNK):
+    """Yield CSV text in chunks of ``rows_per_chunk`` rows, header first"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, kind in columns])
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, rows_per_chunk))
+        if chunk:
+            writer.writerows(chunk)
+        if buffer.tell():
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if not chunk:
+            return
+
+
+async def _async_chunks(chunks):
+    # Pull chunks on the request's sync thread so the server-side cursor
+    # stays on the connection that opened it.
+    next_chunk = sync_to_async(lambda: next(chunks, None), thread_sensitive=True)
+    while (chunk := await next_chunk()) is not None:
+        yield chunk
+
+
+def streaming_csv_response(request, filename, columns, rows):
+    """StreamingHttpResponse that never holds more than one chunk of rows"""
+    chunks = csv_chunks(columns, rows)
+    django_request = getattr(request, '_request', request)
+    if isinstance(django_request, ASGIRequest):
+        # ASGI would otherwise buffer a sync iterator entirely in memory
+        chunks = _async_chunks(chunks)
+    response = StreamingHttpResponse(chunks, content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def write_csv(path, columns, rows):
+    count = 0
+
+    def counted(rows):
+        nonlocal count
+        for row in rows:
+            count += 1
+            yield row
+
+    with open(path, 'w', newline='') as output:
+        for chunk in csv_chunks(columns, counted(rows)):
+            output.write(chunk)
+    return count
+
+
+def _arrow_type(kind):
+    return {
+        'int': pyarrow.int64(),
+        'str': pyarrow.string(),
+        'bool': pyarrow.bool_(),
+        'date': pyarrow.date32(),
+        'datetime': pyarrow.timestamp('us', tz='UTC'),
+        'decimal': pyarrow.decimal128(12, 2),
+    }[kind]
+
+
+def write_parquet(path, columns, rows, batch_size=PARQUET_BATCH_SIZE):
+    """Write ``rows`` as Parquet, one record batch of ``batch_size`` rows at a time"""
+    if pyarrow is None:
+        raise RuntimeError('Parquet export requires pyarrow (pip install pyarrow)')
+    schema = pyarrow.schema([(name, _arrow_type(kind)) for name, kind in columns])
+    count = 0
+    rows = iter(rows)
+    with pyarrow.parquet.ParquetWriter(path, schema, compression='zstd') as writer:
+        while chunk := list(islice(rows, batch_size)):
+            arrays = [
+                pyarrow.array([row[index] for row in chunk], type=schema.field(index).type)
+                for index in range(len(columns))
+            ]
+            writer.write_batch(pyarrow.RecordBatch.from_arrays(arrays, schema=schema))
+            count += len(chunk)
+    return count
+
+
+def write_export(path, file_format, columns, rows):
+    """Write an export file; returns the number of rows written"""
+    if file_format == 'parquet':
+        return write_parquet(path, columns, rows)
+    return write_csv(path, columns, rows)
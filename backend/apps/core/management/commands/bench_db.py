@@ -0,0 +1,74 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import request_finished, request_started
+from django.db import connection
+
+from apps.attendance.models import AttendanceRecord
+from apps.core.stats import latency_summary
+from apps.employees.models import Employee
+from apps.notifications.models import Notification
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test database connection handling by replaying request cycles '
+        '(request_started -> queries -> request_finished) from concurrent threads. '
+        'The default workload runs the inbox and attendance-history queries of a random '
+        'employee. Run once per DB_CONN_MAX_AGE / DB_POOL / DB_PGBOUNCER setting to compare p99.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--workload', choices=['endpoints', 'select1'], default='endpoints')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        settings_dict = connection.settings_dict
+        self.stdout.write(
+            f"CONN_MAX_AGE={settings_dict['CONN_MAX_AGE']} "
+            f"pool={bool(settings_dict['OPTIONS'].get('pool'))} "
+            f"pgbouncer={settings_dict.get('DISABLE_SERVER_SIDE_CURSORS', False)}"
+        )
+
+        self.workload = getattr(self, f"workload_{options['workload']}")
+        self.employees = []
+        if options['workload'] == 'endpoints':
+            self.employees = list(Employee.objects.values_list('id', 'user_id')[:1000])
+            if not self.employees:
+                raise CommandError('No employees found, run generate_workforce first')
+        self.rng = random.Random(options['seed'])
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            samples = list(executor.map(self.request_cycle, range(options['requests'])))
+        summary = latency_summary(samples, time.perf_counter() - start)
+
+        self.stdout.write(
+            f"{summary['requests']} requests  {summary['rps']:,.0f} req/s  "
+            f"p50={summary['p50_ms']:.2f}ms p95={summary['p95_ms']:.2f}ms "
+            f"p99={summary['p99_ms']:.2f}ms"
+        )
+
+    def request_cycle(self, _):
+        start = time.perf_counter()
+        request_started.send(sender=self.__class__)
+        try:
+            self.workload()
+        finally:
+            request_finished.send(sender=self.__class__)
+        return time.perf_counter() - start
+
+    def workload_select1(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+
+    def workload_endpoints(self):
+        # The queries behind the inbox and attendance history pages
+        employee_id, user_id = self.rng.choice(self.employees)
+        list(Notification.objects.filter(recipient_id=user_id, is_read=False).values('id', 'title', 'created_at')[:20])
+        list(AttendanceRecord.objects.filter(employee_id=employee_id).values('date', 'status', 'hours_worked')[:30])
@@ -0,0 +1,57 @@
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from apps.core.renderers import ORJSONRenderer, orjson
+
+
+class Command(BaseCommand):
+    help = 'Benchmark JSON rendering of list endpoint payloads (rows/second)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        payload = {'attendance_records': self.build_rows(rows), 'count': rows}
+
+        renderers = [('JSONRenderer', JSONRenderer())]
+        if orjson is not None:
+            renderers.append(('ORJSONRenderer', ORJSONRenderer()))
+        else:
+            self.stdout.write(self.style.WARNING('orjson is not installed, skipping ORJSONRenderer'))
+
+        for name, renderer in renderers:
+            best = min(self.time_render(renderer, payload) for _ in range(options['repeat']))
+            self.stdout.write(
+                f'{name:<16} {rows} rows in {best:.3f}s  ({rows / best:,.0f} rows/s)'
+            )
+
+    def time_render(self, renderer, payload):
+        start = time.perf_counter()
+        renderer.render(payload)
+        return time.perf_counter() - start
+
+    def build_rows(self, count):
+        """Rows shaped like the values() output of list_attendance"""
+        base_day = date(2025, 1, 1)
+        base_time = datetime(2025, 1, 1, 9, 0, tzinfo=dt_timezone.utc)
+        return [
+            {
+                'id': i,
+                'employee_name': f'Employee {i % 500}',
+                'employee_id': f'EMP{i % 500:04d}',
+                'date': base_day + timedelta(days=i % 365),
+                'check_in_time': base_time + timedelta(days=i % 365),
+                'check_out_time': base_time + timedelta(days=i % 365, hours=8, minutes=i % 60),
+                'status': 'present',
+                'hours_worked': Decimal('8.25'),
+                'overtime_hours': Decimal('0.25'),
+                'notes': ''
+            }
+            for i in range(count)
+        ]
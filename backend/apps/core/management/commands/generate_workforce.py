@@ -0,0 +1,247 @@
+import random
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.gis.geos import Point
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from apps.attendance.models import AttendanceRecord
+from apps.core.cache import invalidate_model
+from apps.employees.models import Department, Employee
+from apps.geofencing.models import EmployeeLocationLog, GeofenceLocation
+from apps.notifications.models import Notification
+from apps.payroll.models import EmployeeSalaryStructure, PayrollPeriod, Payslip, SalaryComponent
+
+# Synthetic sites are scattered around this point (longitude, latitude)
+ORIGIN = (74.3587, 31.5204)
+METERS_PER_DEGREE = 111000
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+@contextmanager
+def _historical_timestamps(model, field_name):
+    """Let bulk_create keep explicit values for an auto_now_add field"""
+    field = model._meta.get_field(field_name)
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def _working_days(start, end):
+    day = start
+    while day <= end:
+        if day.weekday() < 5:
+            yield day
+        day += timedelta(days=1)
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a synthetic workforce (departments, employees with API tokens, fences, '
+        'attendance, location logs, payslips, notifications) with bulk_create for load testing.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=1000)
+        parser.add_argument('--departments', type=int, default=10)
+        parser.add_argument('--fences', type=int, default=20)
+        parser.add_argument('--months', type=int, default=3, help='Months of history up to yesterday')
+        parser.add_argument('--pings', type=int, default=8, help='Location logs per employee per working day')
+        parser.add_argument('--notifications', type=int, default=20, help='Notifications per employee')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--prefix', default='synthetic', help='Username / employee_id prefix')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        for option in ('departments', 'fences'):
+            if options[option] < 1:
+                raise CommandError(f'--{option} must be at least 1')
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        prefix = options['prefix']
+
+        end = date.today() - timedelta(days=1)
+        start = (end.replace(day=1) - timedelta(days=31 * (options['months'] - 1))).replace(day=1)
+        days = list(_working_days(start, end))
+
+        departments = self.bulk(Department, (
+            Department(name=f'{prefix} department {i}') for i in range(options['departments'])
+        ))
+        fences = self.bulk(GeofenceLocation, (
+            GeofenceLocation(
+                name=f'{prefix} site {i}',
+                location_type=self.rng.choice(['office', 'branch', 'site']),
+                location=Point(ORIGIN[0] + self.rng.uniform(-0.2, 0.2), ORIGIN[1] + self.rng.uniform(-0.2, 0.2)),
+                radius=self.rng.choice([100, 150, 250, 500]),
+            )
+            for i in range(options['fences'])
+        ))
+
+        password = make_password(prefix)
+        users = self.bulk(User, (
+            User(username=f'{prefix}{i:06d}', first_name='Synthetic', last_name=f'{i:06d}', password=password)
+            for i in range(options['employees'])
+        ))
+        self.bulk(Token, (Token(key=Token.generate_key(), user=user) for user in users))
+        employees = self.bulk(Employee, (
+            Employee(
+                user=user,
+                employee_id=f'{prefix[:8].upper()}{i:06d}',
+                department=departments[i % len(departments)],
+                position='Field Staff',
+                hire_date=start - timedelta(days=self.rng.randint(30, 2000)),
+                salary=Decimal(self.rng.randrange(40_000, 150_000, 500)),
+            )
+            for i, user in enumerate(users)
+        ))
+        self.stdout.write(f'{len(employees)} employees across {len(departments)} departments, {len(fences)} fences')
+
+        records = self.bulk(AttendanceRecord, self.attendance(employees, days))
+        self.stdout.write(f'{records} attendance records over {len(days)} working days')
+
+        with _historical_timestamps(EmployeeLocationLog, 'timestamp'):
+            logs = self.bulk(EmployeeLocationLog, self.location_logs(employees, fences, days, options['pings']))
+        self.stdout.write(f'{logs} location logs')
+
+        payslips = self.bulk(Payslip, self.payslips(employees, prefix, start, end))
+        self.stdout.write(f'{payslips} payslips')
+
+        with _historical_timestamps(Notification, 'created_at'):
+            notifications = self.bulk(Notification, self.notifications(users, options['notifications'], start, end))
+        self.stdout.write(f'{notifications} notifications')
+
+        # bulk_create bypasses the post_save cache invalidation hooks
+        for model in (User, Department, Employee, GeofenceLocation, SalaryComponent, PayrollPeriod, Payslip):
+            invalidate_model(model)
+        self.stdout.write(self.style.SUCCESS('Synthetic workforce generated'))
+
+    def bulk(self, model, objects):
+        """bulk_create ``objects`` in batches; returns the list or, for large tables, the count"""
+        created = []
+        count = 0
+        keep = model in (Department, GeofenceLocation, User, Employee)
+        for chunk in _chunks(objects, self.batch_size):
+            model.objects.bulk_create(chunk, batch_size=self.batch_size)
+            count += len(chunk)
+            if keep:
+                created.extend(chunk)
+        return created if keep else count
+
+    def attendance(self, employees, days):
+        for employee in employees:
+            for day in days:
+                if self.rng.random() < 0.04:
+                    continue  # absent
+                check_in = datetime.combine(day, time(8, 30), dt_timezone.utc) + timedelta(minutes=self.rng.randint(0, 75))
+                check_out = check_in + timedelta(minutes=self.rng.randint(420, 600))
+                hours = Decimal(f'{(check_out - check_in).total_seconds() / 3600:.2f}')
+                yield AttendanceRecord(
+                    employee=employee,
+                    date=day,
+                    check_in_time=check_in,
+                    check_out_time=check_out,
+                    status='late' if check_in.time() > time(9, 15) else 'present',
+                    hours_worked=hours,
+                    overtime_hours=max(hours - 8, Decimal('0')),
+                )
+
+    def location_logs(self, employees, fences, days, pings):
+        for index, employee in enumerate(employees):
+            fence = fences[index % len(fences)]
+            radius_degrees = fence.radius / METERS_PER_DEGREE
+            for day in days:
+                start = datetime.combine(day, time(8, 30), dt_timezone.utc)
+                for ping in range(pings):
+                    # Most fixes land inside the assigned fence, some drift outside
+                    spread = radius_degrees * (0.8 if self.rng.random() < 0.9 else 3)
+                    location = Point(
+                        fence.location.x + self.rng.uniform(-spread, spread),
+                        fence.location.y + self.rng.uniform(-spread, spread),
+                    )
+                    distance = fence.location.distance(location) * METERS_PER_DEGREE
+                    within = distance <= fence.radius
+                    action = 'check_in' if ping == 0 else 'check_out' if ping == pings - 1 else 'location_update'
+                    yield EmployeeLocationLog(
+                        employee=employee,
+                        geofence_location=fence,
+                        location=location,
+                        action=action,
+                        is_within_geofence=within,
+                        distance_from_geofence=Decimal('0') if within else Decimal(f'{distance:.2f}'),
+                        timestamp=start + timedelta(minutes=ping * 540 // max(pings - 1, 1)),
+                    )
+
+    def payslips(self, employees, prefix, start, end):
+        periods = []
+        month = start
+        while month <= end:
+            next_month = (month + timedelta(days=32)).replace(day=1)
+            period, _ = PayrollPeriod.objects.get_or_create(
+                name=f'{prefix} {month:%B %Y}',
+                defaults={
+                    'start_date': month,
+                    'end_date': next_month - timedelta(days=1),
+                    'payment_date': next_month,
+                    'is_processed': True,
+                },
+            )
+            periods.append(period)
+            month = next_month
+
+        basic, _ = SalaryComponent.objects.get_or_create(name='Basic Salary', component_type='basic')
+        tax, _ = SalaryComponent.objects.get_or_create(name='Income Tax', component_type='tax')
+        self.bulk(EmployeeSalaryStructure, (
+            EmployeeSalaryStructure(
+                employee=employee, salary_component=component, amount=amount,
+                is_percentage=is_percentage, effective_from=employee.hire_date,
+            )
+            for employee in employees
+            for component, amount, is_percentage in (
+                (basic, (employee.salary / 12).quantize(Decimal('0.01')), False),
+                (tax, Decimal('10'), True),
+            )
+        ))
+
+        for employee in employees:
+            gross = (employee.salary / 12).quantize(Decimal('0.01'))
+            deductions = (gross / 10).quantize(Decimal('0.01'))
+            for period in periods:
+                yield Payslip(
+                    employee=employee,
+                    payroll_period=period,
+                    gross_salary=gross,
+                    total_deductions=deductions,
+                    net_salary=gross - deductions,
+                    working_days=22,
+                    present_days=self.rng.randint(18, 22),
+                    status='paid',
+                    payment_date=period.payment_date,
+                )
+
+    def notifications(self, users, per_user, start, end):
+        span = int((end - start).total_seconds() // 60) if end > start else 1
+        base = datetime.combine(start, time(0), dt_timezone.utc)
+        for user in users:
+            for i in range(per_user):
+                yield Notification(
+                    recipient=user,
+                    title=f'Update {i}',
+                    message='Synthetic notification for load testing',
+                    priority=self.rng.choice(['low', 'medium', 'high']),
+                    status='delivered',
+                    is_read=self.rng.random() < 0.7,
+                    metadata={'type': 'info'},
+                    created_at=base + timedelta(minutes=self.rng.randint(0, span)),
+                )
@@ -0,0 +1,157 @@
+import http.client
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from apps.attendance.models import AttendanceRecord
+from apps.core.stats import latency_summary
+from apps.geofencing.models import GeofenceLocation
+
+ENDPOINTS = {
+    'check_in': ('POST', '/api/attendance/check-in/'),
+    'check_location': ('POST', '/api/geofencing/check-location/'),
+    'list_notifications': ('GET', '/api/notifications/'),
+    'payroll_summary': ('GET', '/api/payroll/summary/'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay a shift-change pattern (check-in, location pings, inbox, payroll summary) '
+        'against a running server with employees from generate_workforce and report '
+        'p50/p95/p99 and requests/second per endpoint.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://localhost:8000')
+        parser.add_argument('--users', type=int, default=500, help='Employees arriving for the shift')
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--pings', type=int, default=5, help='check_location calls per employee')
+        parser.add_argument('--prefix', default='synthetic')
+        parser.add_argument('--reset-today', action='store_true', help="Delete today's attendance so check-ins succeed")
+        parser.add_argument('--output', help='Write the results as JSON (e.g. a new baseline)')
+        parser.add_argument('--compare', help='Baseline JSON file to compare against')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        tokens = list(
+            Token.objects.filter(user__username__startswith=options['prefix'])
+            .order_by('user__username').values_list('key', flat=True)[:options['users']]
+        )
+        if not tokens:
+            raise CommandError(f"No users with prefix '{options['prefix']}', run generate_workforce first")
+        fences = list(GeofenceLocation.objects.filter(is_active=True).values_list('location', flat=True))
+        if not fences:
+            raise CommandError('No active geofences found')
+
+        if options['reset_today']:
+            AttendanceRecord.objects.filter(
+                employee__user__auth_token__key__in=tokens, date=date.today()
+            ).delete()
+
+        target = urlsplit(options['base_url'])
+        self.connection_class = http.client.HTTPSConnection if target.scheme == 'https' else http.client.HTTPConnection
+        self.netloc = target.netloc
+        self.local = threading.local()
+        self.rng = random.Random(options['seed'])
+        self.pings = options['pings']
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock = threading.Lock()
+
+        # Every random draw happens here, in order, so a --seed replays the
+        # same fences and ping positions whatever the thread scheduling
+        jobs = []
+        for token in tokens:
+            fence = self.rng.choice(fences)
+            pings = [
+                (fence.y + self.rng.uniform(-0.0005, 0.0005), fence.x + self.rng.uniform(-0.0005, 0.0005))
+                for _ in range(self.pings)
+            ]
+            jobs.append((token, pings))
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            list(executor.map(self.shift, jobs))
+        elapsed = time.perf_counter() - start
+
+        results = {
+            'config': {
+                key: options[key] for key in ('users', 'concurrency', 'pings')
+            },
+            'elapsed_seconds': round(elapsed, 3),
+            'endpoints': {
+                name: {**latency_summary(self.samples[name], elapsed), 'errors': self.errors[name]}
+                for name in ENDPOINTS
+            },
+            'overall': latency_summary([s for samples in self.samples.values() for s in samples], elapsed),
+        }
+        self.report(results, options.get('compare'))
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def shift(self, job):
+        token, pings = job
+        self.call('check_in', token, {'notes': 'shift start'})
+        for latitude, longitude in pings:
+            self.call('check_location', token, {'latitude': latitude, 'longitude': longitude})
+        self.call('list_notifications', token)
+        self.call('payroll_summary', token)
+
+    def call(self, name, token, payload=None):
+        method, path = ENDPOINTS[name]
+        body = json.dumps(payload) if payload is not None else None
+        headers = {'Authorization': f'Token {token}', 'Content-Type': 'application/json'}
+
+        start = time.perf_counter()
+        try:
+            connection = self.connection()
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            failed = response.status >= 500
+        except (OSError, http.client.HTTPException):
+            self.local.connection = None
+            failed = True
+        elapsed = time.perf_counter() - start
+
+        with self.lock:
+            self.samples[name].append(elapsed)
+            if failed:
+                self.errors[name] += 1
+
+    def connection(self):
+        # One keep-alive connection per worker thread, like a mobile client
+        if getattr(self.local, 'connection', None) is None:
+            self.local.connection = self.connection_class(self.netloc, timeout=30)
+        return self.local.connection
+
+    def report(self, results, compare_path):
+        baseline = None
+        if compare_path:
+            with open(compare_path) as baseline_file:
+                baseline = json.load(baseline_file)
+
+        self.stdout.write(f"{'endpoint':<20}{'requests':>9}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+        rows = list(results['endpoints'].items()) + [('overall', {**results['overall'], 'errors': sum(self.errors.values())})]
+        for name, summary in rows:
+            line = (
+                f"{name:<20}{summary['requests']:>9}{summary['rps']:>9.0f}{summary['p50_ms']:>9.1f}"
+                f"{summary['p95_ms']:>9.1f}{summary['p99_ms']:>9.1f}{summary['errors']:>8}"
+            )
+            if baseline:
+                previous = baseline['endpoints'].get(name) or (baseline['overall'] if name == 'overall' else None)
+                if previous and previous['p99_ms']:
+                    change = (summary['p99_ms'] - previous['p99_ms']) / previous['p99_ms'] * 100
+                    line += f'   p99 {change:+.1f}% vs baseline'
+            self.stdout.write(line)
@@ -0,0 +1,113 @@
+"""
+In-process metrics registry rendered in the Prometheus text format.
+
+Values are per process; scrape every worker (or aggregate upstream) when
+running several.
+"""
+import math
+import threading
+from collections import defaultdict
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+        for name, value in labels
+    )
+    return '{' + pairs + '}'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value))
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._meta = {}
+        self._counters = defaultdict(float)
+        self._gauges = {}
+        self._histograms = {}
+
+    def describe(self, name, kind, help_text):
+        self._meta[name] = (kind, help_text)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] += value
+
+    def set(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name, value, buckets=DURATION_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {
+                    'buckets': buckets, 'counts': [0] * len(buckets), 'sum': 0.0, 'count': 0,
+                }
+            for index, bound in enumerate(histogram['buckets']):
+                if value <= bound:
+                    histogram['counts'][index] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    def add_histogram(self, name, buckets, counts, total, count, **labels):
+        """Merge pre-aggregated observations (cumulative ``counts`` per bucket)"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {
+                    'buckets': buckets, 'counts': [0] * len(buckets), 'sum': 0.0, 'count': 0,
+                }
+            for index, value in enumerate(counts):
+                histogram['counts'][index] += value
+            histogram['sum'] += total
+            histogram['count'] += count
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    def render(self):
+        """Prometheus text exposition (version 0.0.4)"""
+        with self._lock:
+            samples = defaultdict(list)
+            for (name, labels), value in self._counters.items():
+                samples[name].append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+            for (name, labels), value in self._gauges.items():
+                samples[name].append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+            for (name, labels), histogram in self._histograms.items():
+                lines = samples[name]
+                for bound, count in zip(histogram['buckets'], histogram['counts']):
+                    bucket_labels = labels + (('le', _format_value(bound)),)
+                    lines.append(f'{name}_bucket{_format_labels(bucket_labels)} {count}')
+                inf_labels = labels + (('le', '+Inf'),)
+                lines.append(f"{name}_bucket{_format_labels(inf_labels)} {histogram['count']}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram['sum'])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+
+        output = []
+        for name in sorted(samples):
+            kind, help_text = self._meta.get(name, ('untyped', ''))
+            output.append(f'# HELP {name} {help_text}')
+            output.append(f'# TYPE {name} {kind}')
+            output.extend(samples[name])
+        return '\n'.join(output) + '\n'
+
+
+registry = MetricsRegistry()
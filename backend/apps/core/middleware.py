@@ -0,0 +1,207 @@
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db.backends.signals import connection_created
+
+from . import profiling
+from .metrics import QUERY_COUNT_BUCKETS, registry
+from .routers import apin_to_primary, pin_to_primary
+
+_request_stats = ContextVar('request_stats', default=None)
+
+registry.describe('tracewing_http_requests_total', 'counter', 'HTTP requests by view and status')
+registry.describe('tracewing_http_request_duration_seconds', 'histogram', 'Request latency by view')
+registry.describe('tracewing_http_request_queries', 'histogram', 'SQL queries issued per request by view')
+registry.describe('tracewing_db_query_seconds_total', 'counter', 'Time spent in SQL by view')
+registry.describe('tracewing_serialization_seconds_total', 'counter', 'Time spent rendering responses by view')
+registry.describe('tracewing_response_bytes_total', 'counter', 'Response body bytes by view')
+
+
+class RequestStats:
+    __slots__ = ('queries', 'db_time', 'serialization_time')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialization_time = 0.0
+
+
+def record_serialization(seconds):
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.serialization_time += seconds
+
+
+def _record_query(execute, sql, params, many, context):
+    stats = _request_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_time += time.perf_counter() - start
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    # Connections are thread-local and async views run their ORM calls on
+    # a worker thread, so hook every connection and attribute queries through
+    # the request's context variable instead of wrapping a single connection.
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+class RequestMetricsMiddleware:
+    """
+    Record per-view query count, DB time, serialisation time and response size.
+
+    The numbers are returned in a ``Server-Timing`` header and aggregated in
+    the Prometheus registry exposed at ``/metrics``. Enabled with
+    ``REQUEST_METRICS=True``.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        connection_created.connect(install_query_recorder, dispatch_uid='request_metrics_query_recorder')
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_stats.reset(token)
+        return self.finish(request, response, stats, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_stats.reset(token)
+        return self.finish(request, response, stats, time.perf_counter() - start)
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns; time that step
+        stats = _request_stats.get()
+        if stats is not None:
+            start = time.perf_counter()
+
+            def rendered(response):
+                stats.serialization_time += time.perf_counter() - start
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def finish(self, request, response, stats, duration):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unresolved'
+        if view == 'metrics':
+            return response
+
+        size = 0 if response.streaming else len(response.content)
+        labels = {'view': view}
+        registry.inc('tracewing_http_requests_total', view=view, status=response.status_code)
+        registry.observe('tracewing_http_request_duration_seconds', duration, **labels)
+        registry.observe('tracewing_http_request_queries', stats.queries, buckets=QUERY_COUNT_BUCKETS, **labels)
+        registry.inc('tracewing_db_query_seconds_total', stats.db_time, **labels)
+        registry.inc('tracewing_serialization_seconds_total', stats.serialization_time, **labels)
+        registry.inc('tracewing_response_bytes_total', size, **labels)
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={stats.db_time * 1000:.2f};desc="{stats.queries} queries"',
+            f'serialize;dur={stats.serialization_time * 1000:.2f}',
+            f'total;dur={duration * 1000:.2f}',
+        ])
+        response['X-Query-Count'] = str(stats.queries)
+        return response
+
+
+class SlowRequestProfilerMiddleware:
+    """
+    Sample the stack of every request and keep a flamegraph-compatible profile
+    of the ones slower than ``SLOW_PROFILER_THRESHOLD_MS``.
+
+    Under ASGI async requests share the event loop thread, so their profiles
+    show everything that ran on the loop meanwhile, which is where blocking
+    calls in async code show up. Enabled with ``SLOW_PROFILER=True``.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        unit = profiling.get_profiler().start()
+        try:
+            return self.get_response(request)
+        finally:
+            profiling.finish('request', self.view_name(request), unit)
+
+    async def __acall__(self, request):
+        unit = profiling.get_profiler().start()
+        try:
+            return await self.get_response(request)
+        finally:
+            profiling.finish('request', self.view_name(request), unit)
+
+    def view_name(self, request):
+        match = getattr(request, 'resolver_match', None)
+        return match.view_name if match else request.path
+
+
+class ReplicaPinMiddleware:
+    """
+    Pin a user to the primary database for ``REPLICA_STICKY_SECONDS`` after
+    each successful write request, so replica-routed reads that follow see
+    their own changes. Installed when ``DB_REPLICA_HOSTS`` is set.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        response = self.get_response(request)
+        user_id = self.writer(request, response)
+        if user_id is not None:
+            pin_to_primary(user_id)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        user_id = self.writer(request, response)
+        if user_id is not None:
+            await apin_to_primary(user_id)
+        return response
+
+    def writer(self, request, response):
+        # DRF authenticates in the view and sets the user on the Django request
+        if request.method in ('GET', 'HEAD', 'OPTIONS') or response.status_code >= 400:
+            return None
+        user = getattr(request, 'user', None)
+        return user.pk if user is not None and user.is_authenticated else None
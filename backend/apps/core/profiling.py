@@ -0,0 +1,136 @@
+"""
+Low-overhead sampling profiler for slow requests and Celery tasks.
+
+A single daemon thread per process samples the stacks of the threads that
+are currently inside a profiled unit of work (``sys._current_frames()``,
+every ``SLOW_PROFILER_INTERVAL_MS``) and sleeps when there are none. When a
+unit finishes above ``SLOW_PROFILER_THRESHOLD_MS`` its samples are written
+to ``SLOW_PROFILER_DIR`` in the collapsed-stack format read by
+``flamegraph.pl``, speedscope and inferno; faster units are discarded.
+"""
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_DEPTH = 128
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    module = frame.f_globals.get('__name__', '?')
+    return f'{module}:{code.co_name}:{frame.f_lineno}'
+
+
+def _collapse(frame):
+    stack = []
+    while frame is not None and len(stack) < MAX_DEPTH:
+        stack.append(_frame_label(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(stack))
+
+
+class _Unit:
+    __slots__ = ('thread_id', 'started', 'samples')
+
+    def __init__(self, thread_id):
+        self.thread_id = thread_id
+        self.started = time.perf_counter()
+        self.samples = Counter()
+
+
+class SamplingProfiler:
+    def __init__(self, interval):
+        self.interval = interval
+        self._units = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid = None
+
+    def _ensure_thread(self):
+        # Threads do not survive fork (Celery prefork, gunicorn), so start
+        # the sampler lazily in every process that uses it.
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name='slow-profiler', daemon=True).start()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while True:
+            if not self._units:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            frames = sys._current_frames()
+            with self._lock:
+                units = list(self._units.values())
+            stacks = [
+                (unit, _collapse(frames[unit.thread_id]))
+                for unit in units
+                if unit.thread_id in frames and unit.thread_id != own_id
+            ]
+            del frames
+            # Under the lock, so stop() never copies a Counter mid-update
+            with self._lock:
+                for unit, stack in stacks:
+                    unit.samples[stack] += 1
+            time.sleep(self.interval)
+
+    def start(self):
+        """Start sampling the calling thread; returns a handle for ``stop()``"""
+        unit = _Unit(threading.get_ident())
+        with self._lock:
+            self._ensure_thread()
+            self._units[id(unit)] = unit
+        self._wake.set()
+        return unit
+
+    def stop(self, unit):
+        """Stop sampling; returns ``(elapsed seconds, Counter of collapsed stacks)``"""
+        with self._lock:
+            self._units.pop(id(unit), None)
+            samples = Counter(unit.samples)
+        return time.perf_counter() - unit.started, samples
+
+
+_profiler = None
+
+
+def get_profiler():
+    global _profiler
+    if _profiler is None:
+        _profiler = SamplingProfiler(settings.SLOW_PROFILER_INTERVAL_MS / 1000)
+    return _profiler
+
+
+def write_profile(kind, name, elapsed, samples):
+    """Write collapsed stacks for a slow unit of work; returns the file path"""
+    directory = Path(settings.SLOW_PROFILER_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    safe_name = re.sub(r'[^A-Za-z0-9_.-]+', '_', name).strip('_') or 'unknown'
+    stamp = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+    path = directory / f'{kind}-{safe_name}-{stamp}-{int(elapsed * 1000)}ms.folded'
+    with open(path, 'w') as output:
+        for stack, count in samples.most_common():
+            output.write(f'{stack} {count}\n')
+    logger.warning('Slow %s %s took %.0fms, profile written to %s', kind, name, elapsed * 1000, path)
+    return path
+
+
+def finish(kind, name, unit):
+    """Stop ``unit`` and keep its profile if it crossed the threshold"""
+    elapsed, samples = get_profiler().stop(unit)
+    if elapsed * 1000 >= settings.SLOW_PROFILER_THRESHOLD_MS and samples:
+        try:
+            write_profile(kind, name, elapsed, samples)
+        except OSError:
+            logger.exception('Could not write profile for %s %s', kind, name)
@@ -0,0 +1,57 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to DRF's encoder
+    orjson = None
+
+
+def _default(obj):
+    """
+    Encode the types orjson does not handle natively, as DRF's JSONEncoder
+    does; anything else is an error rather than its ``str()``
+    """
+    if isinstance(obj, Promise):
+        return force_str(obj)
+    if isinstance(obj, timedelta):
+        return str(obj.total_seconds())
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, bytes):
+        return obj.decode()
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    if hasattr(obj, '__getitem__'):
+        try:
+            return dict(obj)
+        except (TypeError, ValueError):
+            return list(obj)
+    if hasattr(obj, '__iter__'):
+        return list(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+class ORJSONRenderer(BaseRenderer):
+    """
+    JSON renderer backed by orjson.
+
+    datetime, date, time and UUID values are encoded natively and Decimal is
+    encoded as a float, matching DRF's JSONRenderer output. When orjson is not
+    installed rendering is delegated to DRF's JSONRenderer.
+    """
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+    options = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None:
+            return JSONRenderer().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(data, default=_default, option=self.options)
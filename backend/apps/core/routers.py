@@ -0,0 +1,91 @@
+"""
+Read-replica routing.
+
+Replicas are listed in ``DB_REPLICA_HOSTS`` and become the database aliases
+in ``settings.DATABASE_REPLICAS``. Writes, migrations and ordinary reads stay
+on ``default``; only views decorated with ``@replica_reads`` (lists, reports
+and exports) read from a replica, so check-in never waits behind reporting
+queries.
+
+A user who has just written something (any successful non-GET request,
+recorded by ``ReplicaPinMiddleware``) is pinned to ``default`` for
+``REPLICA_STICKY_SECONDS``, so they never see a replica that has not caught up
+with their own writes. Model caches (``apps.core.cache``) are always built
+from ``default``; a lagging replica could otherwise store stale data under a
+fresh cache generation.
+"""
+import random
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+
+_read_alias = ContextVar('read_alias', default=None)
+
+
+def _pin_key(user_id):
+    return f'replica-pin:{user_id}'
+
+
+def pin_to_primary(user_id):
+    """Send ``user_id``'s replica reads to ``default`` for ``REPLICA_STICKY_SECONDS``"""
+    cache.set(_pin_key(user_id), True, settings.REPLICA_STICKY_SECONDS)
+
+
+async def apin_to_primary(user_id):
+    await cache.aset(_pin_key(user_id), True, settings.REPLICA_STICKY_SECONDS)
+
+
+def replica_for(user):
+    """Replica alias to read from on behalf of ``user``, or None for ``default``"""
+    if not settings.DATABASE_REPLICAS:
+        return None
+    if user.is_authenticated and cache.get(_pin_key(user.pk)):
+        return None
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+class primary_reads:
+    """Context manager sending ``@replica_reads`` reads back to ``default``"""
+
+    def __enter__(self):
+        self.token = _read_alias.set(None)
+
+    def __exit__(self, *exc_info):
+        _read_alias.reset(self.token)
+
+
+def replica_reads(view):
+    """
+    Run a (DRF) view's reads on a replica. Apply it below ``@api_view`` so
+    authentication has already run on ``default``. Querysets evaluated after
+    the view returns (streamed exports) must be bound with
+    ``.using(router.db_for_read(Model))`` inside the view.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        alias = replica_for(request.user)
+        if alias is None:
+            return view(request, *args, **kwargs)
+        token = _read_alias.set(alias)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _read_alias.reset(token)
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as default
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
@@ -0,0 +1,17 @@
+from .bulk import iter_rows
+
+
+def display_name(first_name, last_name, username):
+    """Mirror ``user.get_full_name() or user.username`` for values rows"""
+    full_name = f'{first_name} {last_name}'.strip()
+    return full_name or username
+
+
+def values_rows(queryset, fields, build_row):
+    """
+    Serialise a queryset row by row without instantiating models.
+
+    ``build_row`` receives each row (a namedtuple from ``iter_rows``) and
+    returns the response payload for that row.
+    """
+    return [build_row(row) for row in iter_rows(queryset, fields)]
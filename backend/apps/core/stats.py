@@ -0,0 +1,18 @@
+def percentile(samples, pct):
+    """Nearest-rank percentile of ``samples`` (pct in 0-100)"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(int(round(pct / 100 * len(ordered))) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def latency_summary(samples, elapsed):
+    """p50/p95/p99 (milliseconds) and throughput for a list of second samples"""
+    return {
+        'requests': len(samples),
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p95_ms': percentile(samples, 95) * 1000,
+        'p99_ms': percentile(samples, 99) * 1000,
+        'rps': len(samples) / elapsed if elapsed else 0.0,
+    }
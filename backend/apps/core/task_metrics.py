@@ -0,0 +1,176 @@
+"""
+Celery task metrics, shared by every worker process.
+
+Prefork workers run tasks in child processes that cannot each be scraped,
+so instead of the per-process registry task metrics are accumulated in
+Redis (the broker database): a finished task costs one pipelined round trip
+of ``HINCRBY``s. ``render()`` reads them back, samples the depth of every
+queue and returns Prometheus text, appended to ``/metrics``. Enabled with
+``CELERY_METRICS=True``.
+
+Per task: run time and queue wait (publish to start, excluding ETA and
+countdown tasks) histograms, and outcomes by state (``SUCCESS``,
+``FAILURE``, ``RETRY``); failures are also counted by exception type.
+Throughput is ``rate(tracewing_celery_tasks_total[5m])``.
+"""
+import json
+import logging
+import time
+from collections import defaultdict
+
+import redis
+
+from .metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+COUNTERS_KEY = 'tracewing:celery:counters'
+HISTOGRAMS_KEY = 'tracewing:celery:histograms'
+# Message header carrying the publish time
+PUBLISHED_HEADER = 'tracewing_published_at'
+
+RUNTIME_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 1800)
+WAIT_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900)
+
+METRICS = {
+    'tracewing_celery_tasks_total': ('counter', 'Finished task runs by task, queue and state'),
+    'tracewing_celery_task_failures_total': ('counter', 'Failed task runs by task and exception type'),
+    'tracewing_celery_task_duration_seconds': ('histogram', 'Task run time by task'),
+    'tracewing_celery_task_queue_wait_seconds': ('histogram', 'Time from publish to start by task and queue'),
+    'tracewing_celery_queue_depth': ('gauge', 'Messages waiting in each queue, all priorities'),
+}
+BUCKETS = {
+    'tracewing_celery_task_duration_seconds': RUNTIME_BUCKETS,
+    'tracewing_celery_task_queue_wait_seconds': WAIT_BUCKETS,
+}
+
+_client = None
+# task id -> (start time, queue wait or None), per worker process
+_running = {}
+
+
+def _redis():
+    # redis-py reconnects after fork, so one client per process is safe
+    global _client
+    if _client is None:
+        from tracewing.celery import app
+        _client = redis.Redis.from_url(app.conf.broker_url)
+    return _client
+
+
+def _field(name, labels, part=None):
+    return json.dumps([name, sorted(labels.items()), part])
+
+
+class _Recorder:
+    def __init__(self):
+        self.pipe = _redis().pipeline(transaction=False)
+
+    def inc(self, name, value=1, **labels):
+        self.pipe.hincrbyfloat(COUNTERS_KEY, _field(name, labels), value)
+
+    def observe(self, name, value, **labels):
+        for index, bound in enumerate(BUCKETS[name]):
+            if value <= bound:
+                self.pipe.hincrby(HISTOGRAMS_KEY, _field(name, labels, index), 1)
+        self.pipe.hincrbyfloat(HISTOGRAMS_KEY, _field(name, labels, 'sum'), value)
+        self.pipe.hincrby(HISTOGRAMS_KEY, _field(name, labels, 'count'), 1)
+
+    def send(self):
+        try:
+            self.pipe.execute()
+        except redis.RedisError:
+            logger.warning('Could not record Celery task metrics', exc_info=True)
+
+
+def _queue(task):
+    return (task.request.delivery_info or {}).get('routing_key') or 'unknown'
+
+
+def mark_published(headers):
+    headers[PUBLISHED_HEADER] = time.time()
+
+
+def task_started(task_id, task):
+    now = time.time()
+    published = getattr(task.request, PUBLISHED_HEADER, None)
+    wait = now - published if published and not task.request.eta else None
+    _running[task_id] = (now, wait)
+
+
+def task_finished(task_id, task, state):
+    started = _running.pop(task_id, None)
+    if started is None:
+        return
+    start, wait = started
+    queue = _queue(task)
+    recorder = _Recorder()
+    recorder.inc('tracewing_celery_tasks_total', task=task.name, queue=queue, state=state or 'UNKNOWN')
+    recorder.observe('tracewing_celery_task_duration_seconds', time.time() - start, task=task.name)
+    if wait is not None:
+        recorder.observe('tracewing_celery_task_queue_wait_seconds', max(wait, 0.0), task=task.name, queue=queue)
+    recorder.send()
+
+
+def task_failed(task, exception):
+    recorder = _Recorder()
+    recorder.inc('tracewing_celery_task_failures_total', task=task.name, exception=type(exception).__name__)
+    recorder.send()
+
+
+def _queue_depths(client):
+    from tracewing.celery import CELERY_QUEUES, app
+
+    options = app.conf.broker_transport_options
+    separator = options.get('sep', '\x06\x16')
+    steps = options.get('priority_steps', [0])
+    # kombu keeps one list per priority step; step 0 uses the bare queue name
+    names = {
+        queue: [queue] + [f'{queue}{separator}{step}' for step in steps if step]
+        for queue in CELERY_QUEUES
+    }
+    pipe = client.pipeline(transaction=False)
+    for lists in names.values():
+        for name in lists:
+            pipe.llen(name)
+    lengths = iter(pipe.execute())
+    return {queue: sum(next(lengths) for _ in lists) for queue, lists in names.items()}
+
+
+def render():
+    """Prometheus text of the task metrics and current queue depths"""
+    snapshot = MetricsRegistry()
+    for name, (kind, help_text) in METRICS.items():
+        snapshot.describe(name, kind, help_text)
+
+    client = _redis()
+    try:
+        counters = client.hgetall(COUNTERS_KEY)
+        histograms = client.hgetall(HISTOGRAMS_KEY)
+        depths = _queue_depths(client)
+    except redis.RedisError:
+        logger.warning('Could not read Celery task metrics', exc_info=True)
+        return ''
+
+    for field, value in counters.items():
+        name, labels, _ = json.loads(field)
+        snapshot.inc(name, float(value), **dict(labels))
+
+    series = defaultdict(lambda: {'counts': None, 'sum': 0.0, 'count': 0})
+    for field, value in histograms.items():
+        name, labels, part = json.loads(field)
+        data = series[name, tuple(map(tuple, labels))]
+        if data['counts'] is None:
+            data['counts'] = [0] * len(BUCKETS[name])
+        if part == 'sum':
+            data['sum'] = float(value)
+        elif part == 'count':
+            data['count'] = int(value)
+        else:
+            data['counts'][part] = int(value)
+    for (name, labels), data in series.items():
+        snapshot.add_histogram(name, BUCKETS[name], data['counts'], data['sum'], data['count'], **dict(labels))
+
+    for queue, depth in depths.items():
+        snapshot.set('tracewing_celery_queue_depth', depth, queue=queue)
+    return snapshot.render()
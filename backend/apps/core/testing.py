@@ -0,0 +1,134 @@
+"""Fixture helpers shared by the test suites"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.gis.geos import Point
+from django.utils import timezone
+
+from apps.attendance.models import AttendanceRecord, LeaveRequest, LeaveType
+from apps.employees.models import Department, Employee
+from apps.geofencing.models import EmployeeLocationLog, GeofenceLocation, GeofenceVisit, LocationTrack
+from apps.geofencing.trajectory import Fix, encode_fixes
+from apps.notifications.models import Notification
+from apps.payroll.models import PayrollPeriod, Payslip, SalaryComponent
+
+PASSWORD = 'password'
+
+
+def create_employee(username, is_staff=False, department=None):
+    user = User.objects.create_user(
+        username=username, password=PASSWORD, first_name=username.title(), last_name='Tester',
+        is_staff=is_staff,
+    )
+    employee = Employee.objects.create(
+        user=user, employee_id=f'T-{username}', department=department,
+        position='Tester', hire_date=date(2024, 1, 1),
+    )
+    return employee
+
+
+def seed_workforce(employees, days, offset=0, owners=()):
+    """
+    Bulk-create ``employees`` employees with ``days`` of history each.
+
+    History (attendance, leave, payslips, notifications) is also added for the
+    existing ``owners`` employees so per-user endpoints grow with the volume.
+    Call again with a different ``offset`` to add more rows.
+    """
+    tag = f's{offset}'
+    department = Department.objects.create(name=f'Department {tag}')
+    password = make_password(PASSWORD)
+
+    users = User.objects.bulk_create([
+        User(username=f'{tag}-user{i}', first_name='Seed', last_name=str(i), password=password)
+        for i in range(employees)
+    ])
+    staff = Employee.objects.bulk_create([
+        Employee(
+            user=user, employee_id=f'{tag}-{i:05d}', department=department,
+            position='Worker', hire_date=date(2024, 1, 1), salary=Decimal('50000.00'),
+        )
+        for i, user in enumerate(users)
+    ])
+    staff.extend(owners)
+
+    today = date.today()
+    AttendanceRecord.objects.bulk_create([
+        AttendanceRecord(
+            employee=employee, date=today - timedelta(days=offset + day + 1), status='present',
+            hours_worked=Decimal('8.00'), overtime_hours=Decimal('0.00'),
+        )
+        for employee in staff
+        for day in range(days)
+    ])
+
+    periods = PayrollPeriod.objects.bulk_create([
+        PayrollPeriod(
+            name=f'Period {tag}-{day}',
+            start_date=today - timedelta(days=offset + day + 1),
+            end_date=today - timedelta(days=offset + day + 1),
+            payment_date=today,
+        )
+        for day in range(days)
+    ])
+    Payslip.objects.bulk_create([
+        Payslip(
+            employee=employee, payroll_period=period, gross_salary=Decimal('1000.00'),
+            net_salary=Decimal('900.00'), total_deductions=Decimal('100.00'), status='paid',
+        )
+        for employee in staff
+        for period in periods
+    ])
+
+    Notification.objects.bulk_create([
+        Notification(recipient=employee.user, title=f'Notice {day}', message='Seeded')
+        for employee in staff
+        for day in range(days)
+    ])
+
+    now = timezone.now()
+    EmployeeLocationLog.objects.bulk_create([
+        EmployeeLocationLog(employee=employee, location=Point(74.3, 31.5 + day * 0.0001), action='location_update')
+        for employee in staff
+        for day in range(days)
+    ])
+    hours = [(now - timedelta(hours=offset + day + 1)).replace(minute=0, second=0, microsecond=0) for day in range(days)]
+    LocationTrack.objects.bulk_create([
+        LocationTrack(
+            employee=employee, start=hour, end=hour, point_count=1,
+            data=encode_fixes([Fix(hour, 74.3, 31.5, 'location_update', True, None)]),
+        )
+        for employee in staff
+        for hour in hours
+    ])
+
+    fences = GeofenceLocation.objects.bulk_create([
+        GeofenceLocation(name=f'Fence {tag}-{i}', location=Point(74.3 + i * 0.01, 31.5), radius=150)
+        for i in range(employees // 2 + 1)
+    ])
+    GeofenceVisit.objects.bulk_create([
+        GeofenceVisit(
+            employee=employee, geofence_location=fences[day % len(fences)],
+            entered_at=hour, exited_at=hour + timedelta(minutes=30), last_seen_at=hour + timedelta(minutes=29),
+        )
+        for employee in staff
+        for day, hour in enumerate(hours)
+    ])
+    leave_types = LeaveType.objects.bulk_create([
+        LeaveType(name=f'Leave {tag}-{i}', days_allowed=10) for i in range(3)
+    ])
+    LeaveRequest.objects.bulk_create([
+        LeaveRequest(
+            employee=employee, leave_type=leave_types[day % len(leave_types)],
+            start_date=today - timedelta(days=offset + day + 1), end_date=today - timedelta(days=offset + day + 1),
+            days_requested=1, reason='Seeded',
+        )
+        for employee in staff
+        for day in range(days)
+    ])
+    SalaryComponent.objects.bulk_create([
+        SalaryComponent(name=f'Component {tag}-{i}', component_type='allowance') for i in range(3)
+    ])
+    return staff
@@ -0,0 +1,659 @@
+import importlib
+import itertools
+import json
+import tempfile
+import time
+from collections import defaultdict, namedtuple
+from datetime import date, timedelta
+from decimal import Decimal
+from functools import partial
+from importlib import import_module
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth.models import User, update_last_login
+from django.core.cache import cache
+from django.db import connection
+from django.db import router
+from django.test import SimpleTestCase, TestCase, modify_settings, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, clear_url_caches, get_resolver, reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from apps.attendance.models import AttendanceRecord, LeaveRequest, LeaveType
+from apps.geofencing.models import EmployeeLocationLog
+from apps.notifications.models import Notification
+from apps.payroll.models import EmployeeSalaryStructure, Payslip, SalaryComponent
+
+from . import profiling, renderers, task_metrics
+from .cache import model_generation
+from .metrics import registry
+from .routers import pin_to_primary, replica_for, replica_reads
+from .testing import PASSWORD, create_employee, seed_workforce
+
+# name: URL name, role: acting user (None = anonymous), budget: max queries.
+# prepare(test) runs outside the measured block and returns (url kwargs, body).
+Endpoint = namedtuple('Endpoint', 'name method role budget prepare', defaults=(None,))
+
+_usernames = itertools.count()
+_leave_batches = itertools.count()
+
+
+def _register(test):
+    n = next(_usernames)
+    return {}, {'username': f'new-user-{n}', 'email': f'new-user-{n}@example.com', 'password': 'Sup3r-secret!'}
+
+
+def _login(test):
+    return {}, {'username': test.employee.user.username, 'password': PASSWORD}
+
+
+def _check_in(test):
+    AttendanceRecord.objects.filter(employee=test.employee, date=date.today()).delete()
+    return {}, {'notes': 'on site'}
+
+
+def _check_out(test):
+    AttendanceRecord.objects.update_or_create(
+        employee=test.employee, date=date.today(),
+        defaults={'check_in_time': timezone.now(), 'check_out_time': None},
+    )
+    return {}, {}
+
+
+def _decide_leave(test):
+    # Fresh, non-overlapping pending requests on every call
+    leave_type, _ = LeaveType.objects.get_or_create(name='Bulk', defaults={'days_allowed': 365})
+    first = date(2030, 1, 1) + timedelta(weeks=3 * next(_leave_batches))
+    requests = [
+        LeaveRequest.objects.create(
+            employee=test.employee, leave_type=leave_type, start_date=first + timedelta(weeks=week),
+            end_date=first + timedelta(weeks=week, days=2), reason='Holiday',
+        )
+        for week in range(3)
+    ]
+    return {}, {'ids': [leave_request.id for leave_request in requests], 'action': 'approve'}
+
+
+def _mark_as_read(test):
+    notification = Notification.objects.filter(recipient=test.employee.user).first()
+    return {'notification_id': notification.id}, {}
+
+
+def _create_geofence(test):
+    return {}, {'name': 'HQ', 'latitude': 31.5, 'longitude': 74.3, 'radius': 200}
+
+
+def _check_location(test):
+    return {}, {'latitude': 31.5, 'longitude': 74.3}
+
+
+def _own_history(test):
+    return {'employee_id': test.employee.id}, {}
+
+
+def _create_notification(test):
+    return {}, {'user_id': test.employee.user_id, 'title': 'Hello', 'message': 'Hi', 'type': 'info'}
+
+
+ENDPOINTS = [
+    Endpoint('schema', 'get', 'staff', 1),
+    Endpoint('swagger-ui', 'get', 'staff', 1),
+    Endpoint('redoc', 'get', 'staff', 1),
+    # Authentication
+    Endpoint('auth_test', 'get', None, 0),
+    Endpoint('register', 'post', None, 7, _register),
+    Endpoint('login', 'post', None, 2, _login),
+    Endpoint('logout', 'post', 'leaver', 2),
+    Endpoint('profile', 'get', 'employee', 1),
+    # Employees
+    Endpoint('employees_test', 'get', None, 0),
+    Endpoint('list_employees', 'get', 'staff', 2),
+    Endpoint('department_dashboard', 'get', 'staff', 2),
+    # Attendance
+    Endpoint('attendance_test', 'get', None, 0),
+    Endpoint('list_attendance', 'get', 'staff', 2),
+    Endpoint('list_attendance', 'get', 'employee', 2),
+    Endpoint('check_in', 'post', 'employee', 4, _check_in),
+    Endpoint('check_out', 'post', 'employee', 3, _check_out),
+    Endpoint('list_leave_types', 'get', 'employee', 2),
+    Endpoint('list_leave_balances', 'get', 'employee', 2),
+    Endpoint('decide_leave', 'post', 'staff', 12, _decide_leave),
+    Endpoint('export_attendance', 'get', 'staff', 2),
+    # Geofencing
+    Endpoint('geofencing_test', 'get', None, 0),
+    Endpoint('list_geofences', 'get', 'employee', 2),
+    Endpoint('create_geofence', 'post', 'staff', 2, _create_geofence),
+    Endpoint('check_location', 'post', 'employee', 2, _check_location),
+    Endpoint('record_location', 'post', 'employee', 4, _check_location),
+    Endpoint('geofence_bundle', 'get', 'employee', 4),
+    Endpoint('location_history', 'get', 'staff', 3, _own_history),
+    Endpoint('location_history', 'get', 'employee', 4, _own_history),
+    Endpoint('employee_route', 'get', 'staff', 4, _own_history),
+    Endpoint('employee_route', 'get', 'employee', 5, _own_history),
+    Endpoint('list_visits', 'get', 'staff', 2),
+    Endpoint('list_visits', 'get', 'employee', 2),
+    Endpoint('fence_occupancy', 'get', 'staff', 2),
+    Endpoint('location_heatmap', 'get', 'staff', 2),
+    # Notifications
+    Endpoint('notifications_test', 'get', None, 0),
+    Endpoint('list_notifications', 'get', 'employee', 2),
+    Endpoint('mark_as_read', 'post', 'employee', 3, _mark_as_read),
+    Endpoint('mark_all_as_read', 'post', 'employee', 2),
+    Endpoint('create_notification', 'post', 'staff', 3, _create_notification),
+    # Payroll
+    Endpoint('payroll_test', 'get', None, 0),
+    Endpoint('list_payroll', 'get', 'staff', 2),
+    Endpoint('list_payroll', 'get', 'employee', 3),
+    Endpoint('payroll_summary', 'get', 'employee', 4),
+    Endpoint('export_payroll', 'get', 'staff', 2),
+]
+
+# URL names deliberately not covered here
+UNCOVERED = {
+    'metrics',  # instrumentation endpoint, only routed with REQUEST_METRICS or CELERY_METRICS
+}
+
+
+def _url_names(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            if pattern.namespace == 'admin':
+                continue  # the Django admin is not part of the API
+            yield from _url_names(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            yield pattern.name
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class EndpointQueryCountTests(TestCase):
+    """
+    Every API endpoint must issue a bounded number of queries that does not
+    grow with the number of rows in the database (no N+1 on lazy FKs).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = create_employee('boss', is_staff=True)
+        cls.employee = create_employee('worker')
+        cls.leaver = create_employee('leaver')
+        cls.users = {
+            'staff': cls.staff.user,
+            'employee': cls.employee.user,
+            'leaver': cls.leaver.user,
+        }
+        for user in cls.users.values():
+            Token.objects.create(user=user)
+        seed_workforce(employees=3, days=2, owners=[cls.staff, cls.employee])
+
+    def measure(self, endpoint):
+        url_kwargs, data = endpoint.prepare(self) if endpoint.prepare else ({}, {})
+        headers = {}
+        if endpoint.role:
+            token, _ = Token.objects.get_or_create(user=self.users[endpoint.role])
+            headers['HTTP_AUTHORIZATION'] = f'Token {token.key}'
+        cache.clear()
+
+        request = getattr(self.client, endpoint.method)
+        url = reverse(endpoint.name, kwargs=url_kwargs)
+        with CaptureQueriesContext(connection) as queries:
+            if endpoint.method == 'post':
+                response = request(url, data, content_type='application/json', **headers)
+            else:
+                response = request(url, **headers)
+            if response.streaming:
+                # Streamed bodies run their queries while being consumed
+                b''.join(response.streaming_content)
+
+        self.assertLess(response.status_code, 500, f'{endpoint.name}: {getattr(response, "content", b"")[:200]}')
+        return len(queries), queries
+
+    def test_every_url_has_a_query_budget(self):
+        covered = {endpoint.name for endpoint in ENDPOINTS} | UNCOVERED
+        missing = set(_url_names(get_resolver().url_patterns)) - covered
+        self.assertFalse(missing, f'Add query budgets for: {sorted(missing)}')
+
+    def test_query_counts_are_bounded_and_flat(self):
+        small = {}
+        for endpoint in ENDPOINTS:
+            small[endpoint] = self.measure(endpoint)[0]
+
+        # Grow every table roughly tenfold and measure again
+        seed_workforce(employees=30, days=20, offset=100, owners=[self.staff, self.employee])
+
+        for endpoint in ENDPOINTS:
+            with self.subTest(endpoint=endpoint.name, role=endpoint.role):
+                count, queries = self.measure(endpoint)
+                sql = '\n'.join(query['sql'] for query in queries.captured_queries)
+                self.assertLessEqual(count, endpoint.budget, f'{endpoint.name} issued {count} queries:\n{sql}')
+                self.assertEqual(count, small[endpoint], f'{endpoint.name} query count grows with row count:\n{sql}')
+
+
+# Admin changelists of the large tables, with their query budgets. Each is
+# loaded plain, searched and drilled into a year.
+CHANGELISTS = [
+    ('attendance', 'attendancerecord', 'date', 9),
+    ('attendance', 'leaverequest', 'start_date', 9),
+    ('geofencing', 'employeelocationlog', 'timestamp', 8),
+    ('notifications', 'notification', 'created_at', 8),
+    ('payroll', 'payslip', 'payroll_period__start_date', 9),
+]
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    # Always use the planner estimate so counts do not depend on table statistics
+    ADMIN_ESTIMATED_COUNT_THRESHOLD=-1,
+)
+class AdminChangelistQueryTests(TestCase):
+    """
+    Changelists of the large tables must not issue a query per row, and the
+    same number of queries whatever the table size.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_employee('admin', is_staff=True).user
+        cls.admin.is_superuser = True
+        cls.admin.save()
+        seed_workforce(employees=3, days=2)
+
+    def measure(self, url, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, url)
+        return len(queries), queries
+
+    def test_changelist_query_counts_are_bounded_and_flat(self):
+        self.client.force_login(self.admin)
+        year = date.today().year
+        pages = [
+            (reverse(f'admin:{app}_{model}_changelist'), params, budget)
+            for app, model, date_field, budget in CHANGELISTS
+            for params in ({}, {'q': 'Seed'}, {f'{date_field}__year': year})
+        ]
+        small = [self.measure(url, params)[0] for url, params, budget in pages]
+
+        seed_workforce(employees=30, days=20, offset=100)
+
+        for (url, params, budget), small_count in zip(pages, small):
+            with self.subTest(url=url, params=params):
+                count, queries = self.measure(url, params)
+                sql = '\n'.join(query['sql'] for query in queries.captured_queries)
+                self.assertLessEqual(count, budget, f'{url} issued {count} queries:\n{sql}')
+                self.assertEqual(count, small_count, f'{url} query count grows with row count:\n{sql}')
+
+    def test_date_hierarchy_links_reach_rows_outside_the_default_window(self):
+        self.client.force_login(self.admin)
+        employee = create_employee('archived')
+        AttendanceRecord.objects.create(employee=employee, date=date(2019, 6, 3), status='present')
+        response = self.client.get(reverse('admin:attendance_attendancerecord_changelist'))
+        self.assertContains(response, 'date__year=2019')
+        self.assertNotContains(response, 'T-archived')
+
+
+class IndexUsageTests(TestCase):
+    """
+    The hot queries behind the lists, inbox and payroll summary can be
+    answered from their composite indexes. Sequential scans are disabled so
+    the planner's choice on these tiny tables reflects which index fits.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = create_employee('indexed')
+        seed_workforce(employees=20, days=5, owners=[cls.employee])
+        component = SalaryComponent.objects.first()
+        EmployeeSalaryStructure.objects.bulk_create([
+            EmployeeSalaryStructure(
+                employee=cls.employee, salary_component=component, amount=100,
+                effective_from=date(2024, 1, 1) + timedelta(days=30 * i), is_active=i % 2 == 0,
+            )
+            for i in range(6)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, plan)
+
+    def test_employee_attendance_history(self):
+        self.assertUsesIndex(
+            AttendanceRecord.objects.filter(employee=self.employee).order_by('-date', '-check_in_time')[:50],
+            'attendance_employee_date_idx',
+        )
+
+    def test_attendance_by_day_and_status(self):
+        self.assertUsesIndex(
+            AttendanceRecord.objects.filter(date=date.today() - timedelta(days=1), status='late'),
+            'attendance_date_status_idx',
+        )
+
+    def test_employee_latest_locations(self):
+        self.assertUsesIndex(
+            EmployeeLocationLog.objects.filter(employee=self.employee).order_by('-timestamp')[:20],
+            'location_log_employee_ts_idx',
+        )
+
+    def test_unread_notifications(self):
+        self.assertUsesIndex(
+            Notification.objects.filter(recipient=self.employee.user, is_read=False).order_by('-created_at')[:20],
+            'notification_inbox_idx',
+        )
+
+    def test_paid_payslips(self):
+        self.assertUsesIndex(
+            Payslip.objects.filter(
+                employee=self.employee, status='paid', payroll_period__start_date__year=date.today().year,
+            ).values('net_salary'),
+            'payslip_employee_status_idx',
+        )
+
+    def test_active_salary_structure(self):
+        self.assertUsesIndex(
+            EmployeeSalaryStructure.objects.filter(
+                employee=self.employee, is_active=True, effective_from__lte=date.today(),
+            ),
+            'salary_structure_active_idx',
+        )
+
+
+@override_settings(
+    DATABASE_REPLICAS=['default'],  # stands in for a replica alias
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class ReplicaRoutingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = create_employee('reader')
+        cls.token = Token.objects.create(user=cls.employee.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_reads_inside_replica_views_use_the_replica(self):
+        @replica_reads
+        def view(request):
+            return router.db_for_read(AttendanceRecord)
+
+        request = namedtuple('Request', 'user')(self.employee.user)
+        self.assertEqual(view(request), 'default')
+        self.assertIsNone(router.routers[0].db_for_read(AttendanceRecord))
+
+    def test_writers_are_pinned_to_the_primary(self):
+        self.assertEqual(replica_for(self.employee.user), 'default')
+        pin_to_primary(self.employee.user.pk)
+        self.assertIsNone(replica_for(self.employee.user))
+
+    @modify_settings(MIDDLEWARE={'append': 'apps.core.middleware.ReplicaPinMiddleware'})
+    def test_successful_writes_pin_the_user(self):
+        headers = {'HTTP_AUTHORIZATION': f'Token {self.token.key}'}
+        self.client.get(reverse('list_attendance'), **headers)
+        self.assertEqual(replica_for(self.employee.user), 'default')
+
+        response = self.client.post(reverse('check_in'), {}, content_type='application/json', **headers)
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNone(replica_for(self.employee.user))
+
+
+@override_settings(CELERY_METRICS=False)
+@modify_settings(MIDDLEWARE={'prepend': 'apps.core.middleware.RequestMetricsMiddleware'})
+class RequestMetricsTests(TestCase):
+    """/metrics is only routed with the flag on, so the urlconf is reloaded around each test"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = create_employee('measured')
+
+    def setUp(self):
+        flag = override_settings(REQUEST_METRICS=True)
+        flag.enable()
+        # Cleanups run last in first out: the flag is dropped before the reload
+        self.addCleanup(self.reload_urls)
+        self.addCleanup(flag.disable)
+        self.reload_urls()
+        registry.clear()
+        self.addCleanup(registry.clear)
+
+    def reload_urls(self):
+        importlib.reload(import_module(settings.ROOT_URLCONF))
+        clear_url_caches()
+
+    def test_responses_carry_server_timing_and_query_count(self):
+        self.client.force_login(self.employee.user)
+        response = self.client.get(reverse('list_attendance'))
+        queries = int(response['X-Query-Count'])
+        self.assertGreater(queries, 0)
+        self.assertRegex(
+            response['Server-Timing'],
+            rf'^db;dur=[0-9.]+;desc="{queries} queries", serialize;dur=[0-9.]+, total;dur=[0-9.]+$',
+        )
+
+    def test_metrics_renders_the_request_histograms(self):
+        self.client.force_login(self.employee.user)
+        self.client.get(reverse('list_attendance'))
+        text = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('# TYPE tracewing_http_request_duration_seconds histogram', text)
+        self.assertIn('tracewing_http_request_duration_seconds_bucket{view="list_attendance",le="+Inf"} 1', text)
+        self.assertIn('tracewing_http_request_queries_count{view="list_attendance"} 1', text)
+        self.assertIn('tracewing_http_requests_total{status="200",view="list_attendance"} 1.0', text)
+        self.assertNotIn('view="metrics"', text)
+
+    def test_metrics_refuses_clients_outside_the_allow_list(self):
+        with self.settings(METRICS_ALLOWED_IPS=['127.0.0.1/32']):
+            self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='10.1.2.3').status_code, 403)
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+
+
+@skipUnless(renderers.orjson, 'orjson is not installed')
+class RendererTests(SimpleTestCase):
+    def test_encodes_the_types_drf_encodes(self):
+        data = {'amount': Decimal('1.50'), 'duration': timedelta(seconds=90), 'ids': {3}, 'raw': b'ok'}
+        self.assertEqual(
+            renderers.ORJSONRenderer().render(data),
+            b'{"amount":1.5,"duration":"90.0","ids":[3],"raw":"ok"}',
+        )
+
+    def test_unsupported_types_raise(self):
+        with self.assertRaises(TypeError):
+            renderers.ORJSONRenderer().render({'value': object()})
+
+
+class AsyncViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = create_employee('async')
+        cls.token = Token.objects.create(user=cls.employee.user)
+
+    def test_body_must_be_a_json_object(self):
+        for body in ('[]', '"x"', '1'):
+            response = self.client.post(
+                reverse('check_in'), body, content_type='application/json',
+                HTTP_AUTHORIZATION=f'Token {self.token.key}',
+            )
+            self.assertEqual(response.status_code, 400, body)
+
+    def test_unauthenticated_requests_get_the_token_challenge(self):
+        response = self.client.get(reverse('list_notifications'))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Token')
+
+    def test_async_views_are_in_the_schema(self):
+        staff = create_employee('schema-reader', is_staff=True)
+        self.client.force_login(staff.user)
+        response = self.client.get(reverse('schema'), {'format': 'json'})
+        paths = response.json()['paths']
+        for name in ('check_in', 'check_out', 'check_location', 'record_location', 'list_notifications'):
+            self.assertIn(reverse(name), paths)
+
+
+class CacheInvalidationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_logins_keep_the_user_cache_generation(self):
+        user = create_employee('cached').user
+        generation = model_generation(User)
+        update_last_login(None, user)
+        self.assertEqual(model_generation(User), generation)
+
+        user.first_name = 'Renamed'
+        user.save()
+        self.assertNotEqual(model_generation(User), generation)
+
+
+class ProfilerTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        patcher = patch.object(profiling, '_profiler', profiling.SamplingProfiler(0.001))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def profile(self, name, seconds):
+        unit = profiling.get_profiler().start()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            pass
+        profiling.finish('task', name, unit)
+
+    def test_slow_units_write_collapsed_stacks(self):
+        with override_settings(SLOW_PROFILER_DIR=str(self.directory), SLOW_PROFILER_THRESHOLD_MS=50):
+            self.profile('apps.payroll.tasks.run_payroll', 0.2)
+        [path] = self.directory.iterdir()
+        self.assertTrue(path.name.startswith('task-apps.payroll.tasks.run_payroll-'), path.name)
+        lines = path.read_text().splitlines()
+        self.assertTrue(lines)
+        for line in lines:
+            stack, count = line.rsplit(' ', 1)
+            self.assertIn(f'{__name__}:profile:', stack)
+            self.assertGreater(int(count), 0)
+
+    def test_fast_units_are_discarded(self):
+        with override_settings(SLOW_PROFILER_DIR=str(self.directory), SLOW_PROFILER_THRESHOLD_MS=60_000):
+            self.profile('apps.notifications.tasks.send_leave_decisions', 0.05)
+        self.assertEqual(list(self.directory.iterdir()), [])
+
+
+class FakeRedis:
+    """In-memory stand-in for the hash and list commands task_metrics uses (bytes, like redis-py)"""
+
+    def __init__(self, lists=None):
+        self.hashes = defaultdict(dict)
+        self.lists = lists or {}
+
+    def hincrby(self, key, field, value):
+        fields = self.hashes[key.encode()]
+        fields[field.encode()] = str(int(fields.get(field.encode(), 0)) + value).encode()
+
+    def hincrbyfloat(self, key, field, value):
+        fields = self.hashes[key.encode()]
+        fields[field.encode()] = repr(float(fields.get(field.encode(), 0)) + value).encode()
+
+    def hgetall(self, key):
+        return dict(self.hashes[key.encode()])
+
+    def llen(self, name):
+        return self.lists.get(name, 0)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client, self.calls = client, []
+
+    def __getattr__(self, name):
+        return lambda *args: self.calls.append(partial(getattr(self.client, name), *args))
+
+    def execute(self):
+        return [call() for call in self.calls]
+
+
+class TaskMetricsTests(SimpleTestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        patcher = patch.object(task_metrics, '_client', self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_task(self, name='apps.payroll.tasks.run_payroll', queue='batch', waited=2.0, eta=None):
+        request = SimpleNamespace(delivery_info={'routing_key': queue}, eta=eta)
+        setattr(request, task_metrics.PUBLISHED_HEADER, time.time() - waited)
+        task = SimpleNamespace(name=name, request=request)
+        task_metrics.task_started('task-id', task)
+        task_metrics.task_finished('task-id', task, 'SUCCESS')
+
+    def histogram(self, name):
+        fields = self.redis.hashes[task_metrics.HISTOGRAMS_KEY.encode()]
+        return {
+            part: value for (field_name, labels, part), value in (
+                (json.loads(field), value) for field, value in fields.items()
+            )
+            if field_name == name
+        }
+
+    def test_observe_counts_every_bucket_the_value_fits(self):
+        recorder = task_metrics._Recorder()
+        recorder.observe('tracewing_celery_task_duration_seconds', 0.3, task='t')
+        recorder.send()
+
+        field = task_metrics._field('tracewing_celery_task_duration_seconds', {'task': 't'}, 3)
+        self.assertEqual(json.loads(field), ['tracewing_celery_task_duration_seconds', [['task', 't']], 3])
+        parts = self.histogram('tracewing_celery_task_duration_seconds')
+        first = task_metrics.RUNTIME_BUCKETS.index(0.5)
+        self.assertEqual(
+            sorted(part for part in parts if isinstance(part, int)),
+            list(range(first, len(task_metrics.RUNTIME_BUCKETS))),
+        )
+        self.assertEqual((float(parts['sum']), int(parts['count'])), (0.3, 1))
+
+    def test_render_reads_back_counters_and_histograms(self):
+        self.run_task()
+        self.run_task()
+        with patch.object(task_metrics, '_queue_depths', return_value={'batch': 3}):
+            text = task_metrics.render()
+
+        labels = 'queue="batch",state="SUCCESS",task="apps.payroll.tasks.run_payroll"'
+        self.assertIn(f'tracewing_celery_tasks_total{{{labels}}} 2.0', text)
+        wait = 'tracewing_celery_task_queue_wait_seconds_bucket'
+        self.assertIn(f'{wait}{{queue="batch",task="apps.payroll.tasks.run_payroll",le="1.0"}} 0', text)
+        self.assertIn(f'{wait}{{queue="batch",task="apps.payroll.tasks.run_payroll",le="5.0"}} 2', text)
+        self.assertIn('tracewing_celery_task_duration_seconds_count{task="apps.payroll.tasks.run_payroll"} 2', text)
+        self.assertIn('tracewing_celery_queue_depth{queue="batch"} 3.0', text)
+
+    def test_eta_tasks_record_no_queue_wait(self):
+        self.run_task(eta='2026-01-01T00:00:00+00:00', waited=600)
+        self.assertEqual(self.histogram('tracewing_celery_task_queue_wait_seconds'), {})
+        self.assertEqual(int(self.histogram('tracewing_celery_task_duration_seconds')['count']), 1)
+
+    def test_queue_depth_reads_every_kombu_priority_list(self):
+        from kombu.transport.redis import Channel
+
+        from tracewing.celery import app
+
+        options = app.conf.broker_transport_options
+        channel = SimpleNamespace(sep=options['sep'], priority_steps=options['priority_steps'])
+        channel.priority = partial(Channel.priority, channel)
+
+        def list_name(queue, priority):
+            return Channel._q_for_pri(channel, queue, priority)
+
+        client = FakeRedis({list_name('batch', 0): 1, list_name('batch', 9): 2, list_name('realtime', 3): 4})
+        depths = task_metrics._queue_depths(client)
+        self.assertEqual((depths['batch'], depths['realtime'], depths['location']), (3, 4, 0))
+
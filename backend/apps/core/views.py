@@ -0,0 +1,22 @@
+import ipaddress
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+from .metrics import registry
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint, restricted to METRICS_ALLOWED_IPS"""
+    remote_addr = request.META.get('REMOTE_ADDR', '')
+    try:
+        address = ipaddress.ip_address(remote_addr)
+    except ValueError:
+        return HttpResponseForbidden()
+    if not any(address in ipaddress.ip_network(network) for network in settings.METRICS_ALLOWED_IPS):
+        return HttpResponseForbidden()
+    body = registry.render()
+    if settings.CELERY_METRICS:
+        from .task_metrics import render
+        body += render()
+    return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class EmployeesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.employees'
+
+    def ready(self):
+        from apps.core.cache import register_cache_invalidation
+        from django.contrib.auth.models import User
+        from .models import Department, Employee
+        register_cache_invalidation(Department, Employee)
+        # Cached employee rows show these user fields; logins only touch last_login
+        register_cache_invalidation(User, fields=('username', 'first_name', 'last_name', 'email', 'is_active'))
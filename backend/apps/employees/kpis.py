@@ -0,0 +1,21 @@
+"""
+Department KPIs for the dashboard.
+
+``DepartmentKPI`` is a materialized view, so the dashboard reads one row per
+department instead of joining employees, attendance, leave and payslips on
+every request. It is refreshed ``CONCURRENTLY`` (readers keep the previous
+contents while the new ones are built) by Celery beat every
+``KPI_REFRESH_INTERVAL_SECONDS``, and after each payroll run.
+"""
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import DepartmentKPI
+
+
+def refresh_department_kpis(concurrently=True):
+    """Rebuild the view; "today" is the current date in ``TIME_ZONE``"""
+    refresh = 'REFRESH MATERIALIZED VIEW CONCURRENTLY' if concurrently else 'REFRESH MATERIALIZED VIEW'
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("SELECT set_config('TimeZone', %s, true)", [settings.TIME_ZONE])
+        cursor.execute(f'{refresh} {DepartmentKPI._meta.db_table}')
@@ -0,0 +1,112 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Latest figures per department. "Today" is CURRENT_DATE of the refreshing
+# session, which apps.employees.kpis sets to TIME_ZONE; every source is
+# aggregated per department before the join so rows never fan out.
+CREATE_VIEW = """
+CREATE MATERIALIZED VIEW employees_departmentkpi AS
+WITH staff AS (
+    SELECT department_id, COUNT(*) AS headcount
+    FROM employees_employee
+    WHERE status = 'active' AND department_id IS NOT NULL
+    GROUP BY department_id
+),
+attendance AS (
+    SELECT employee.department_id,
+           COUNT(*) FILTER (WHERE record.status IN ('present', 'late', 'half_day')) AS present,
+           COUNT(*) FILTER (WHERE record.status = 'late') AS late
+    FROM attendance_attendancerecord AS record
+    JOIN employees_employee AS employee ON employee.id = record.employee_id
+    WHERE record.date = CURRENT_DATE AND employee.status = 'active'
+    GROUP BY employee.department_id
+),
+leave_counts AS (
+    SELECT employee.department_id,
+           COUNT(*) FILTER (WHERE leave_request.status = 'approved') AS on_leave,
+           COUNT(*) FILTER (WHERE leave_request.status = 'pending') AS pending
+    FROM attendance_leaverequest AS leave_request
+    JOIN employees_employee AS employee ON employee.id = leave_request.employee_id
+    WHERE leave_request.status = 'pending' OR (leave_request.status = 'approved' AND leave_request.period @> CURRENT_DATE)
+    GROUP BY employee.department_id
+),
+latest_period AS (
+    SELECT id FROM payroll_payrollperiod
+    WHERE is_processed
+    ORDER BY end_date DESC, id DESC
+    LIMIT 1
+),
+payroll AS (
+    SELECT employee.department_id,
+           COUNT(*) AS payslips,
+           SUM(payslip.gross_salary) AS gross,
+           SUM(payslip.net_salary) AS net
+    FROM payroll_payslip AS payslip
+    JOIN latest_period ON latest_period.id = payslip.payroll_period_id
+    JOIN employees_employee AS employee ON employee.id = payslip.employee_id
+    GROUP BY employee.department_id
+)
+SELECT department.id AS department_id,
+       department.name AS department_name,
+       COALESCE(staff.headcount, 0) AS headcount,
+       COALESCE(attendance.present, 0) AS present_today,
+       COALESCE(attendance.late, 0) AS late_today,
+       ROUND(100.0 * COALESCE(attendance.present, 0) / NULLIF(staff.headcount, 0), 1) AS attendance_rate,
+       COALESCE(leave_counts.on_leave, 0) AS on_leave_today,
+       COALESCE(leave_counts.pending, 0) AS pending_leave_requests,
+       latest_period.id AS payroll_period_id,
+       COALESCE(payroll.payslips, 0) AS payslips,
+       COALESCE(payroll.gross, 0) AS payroll_gross,
+       COALESCE(payroll.net, 0) AS payroll_net,
+       CURRENT_DATE AS as_of,
+       now() AS refreshed_at
+FROM employees_department AS department
+LEFT JOIN staff ON staff.department_id = department.id
+LEFT JOIN attendance ON attendance.department_id = department.id
+LEFT JOIN leave_counts ON leave_counts.department_id = department.id
+LEFT JOIN payroll ON payroll.department_id = department.id
+LEFT JOIN latest_period ON true
+"""
+
+# REFRESH ... CONCURRENTLY needs a unique index covering every row
+CREATE_INDEX = 'CREATE UNIQUE INDEX department_kpi_pk ON employees_departmentkpi (department_id)'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0004_attendance_composite_indexes'),
+        ('employees', '0001_initial'),
+        ('payroll', '0002_payroll_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            [CREATE_VIEW, CREATE_INDEX],
+            reverse_sql='DROP MATERIALIZED VIEW employees_departmentkpi',
+        ),
+        migrations.CreateModel(
+            name='DepartmentKPI',
+            fields=[
+                ('department', models.OneToOneField(on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='kpi', serialize=False, to='employees.department')),
+                ('department_name', models.CharField(max_length=100)),
+                ('headcount', models.IntegerField()),
+                ('present_today', models.IntegerField()),
+                ('late_today', models.IntegerField()),
+                ('attendance_rate', models.DecimalField(decimal_places=1, max_digits=5, null=True)),
+                ('on_leave_today', models.IntegerField()),
+                ('pending_leave_requests', models.IntegerField()),
+                ('payslips', models.IntegerField()),
+                ('payroll_gross', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('payroll_net', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('as_of', models.DateField()),
+                ('refreshed_at', models.DateTimeField()),
+                ('payroll_period', models.ForeignKey(null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='payroll.payrollperiod')),
+            ],
+            options={
+                'db_table': 'employees_departmentkpi',
+                'ordering': ['department_name'],
+                'managed': False,
+            },
+        ),
+    ]
@@ -51,3 +51,37 @@ class Employee(models.Model):
 
     class Meta:
         ordering = ['employee_id']
+
+class DepartmentKPI(models.Model):
+    """
+    Per-department dashboard figures, one row per department. A PostgreSQL
+    materialized view (migration 0002) refreshed by ``apps.employees.kpis``;
+    read only.
+    """
+    department = models.OneToOneField(
+        Department, on_delete=models.DO_NOTHING, primary_key=True, related_name='kpi'
+    )
+    department_name = models.CharField(max_length=100)
+    headcount = models.IntegerField()
+    present_today = models.IntegerField()
+    late_today = models.IntegerField()
+    attendance_rate = models.DecimalField(max_digits=5, decimal_places=1, null=True)
+    on_leave_today = models.IntegerField()
+    pending_leave_requests = models.IntegerField()
+    # Totals of the latest processed payroll period
+    payroll_period = models.ForeignKey(
+        'payroll.PayrollPeriod', on_delete=models.DO_NOTHING, null=True, related_name='+'
+    )
+    payslips = models.IntegerField()
+    payroll_gross = models.DecimalField(max_digits=14, decimal_places=2)
+    payroll_net = models.DecimalField(max_digits=14, decimal_places=2)
+    as_of = models.DateField()
+    refreshed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.department_name} ({self.as_of})"
+
+    class Meta:
+        managed = False
+        db_table = 'employees_departmentkpi'
+        ordering = ['department_name']
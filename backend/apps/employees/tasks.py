@@ -0,0 +1,9 @@
+from celery import shared_task
+
+from .kpis import refresh_department_kpis
+
+
+@shared_task(time_limit=5 * 60, soft_time_limit=4 * 60)
+def refresh_department_kpis_task():
+    """Refresh the department KPI view; scheduled by beat and queued after payroll runs"""
+    refresh_department_kpis()
@@ -1,3 +1,51 @@
+from datetime import timedelta
+from decimal import Decimal
+
 from django.test import TestCase
+from django.utils import timezone
+
+from apps.attendance.models import AttendanceRecord, LeaveRequest, LeaveType
+from apps.core.testing import create_employee
+from apps.payroll.models import PayrollPeriod, Payslip
+
+from .kpis import refresh_department_kpis
+from .models import Department, DepartmentKPI
+
+
+class DepartmentKPITests(TestCase):
+    def test_refresh_rolls_up_each_department(self):
+        today = timezone.localdate()
+        department = Department.objects.create(name='Operations')
+        late = create_employee('late', department=department)
+        create_employee('absent', department=department)
+        away = create_employee('away', department=department)
+        AttendanceRecord.objects.create(employee=late, date=today, status='late')
+        leave_type = LeaveType.objects.create(name='Annual', days_allowed=20)
+        LeaveRequest.objects.create(
+            employee=away, leave_type=leave_type, start_date=today, end_date=today, reason='Rest', status='approved',
+        )
+        LeaveRequest.objects.create(
+            employee=late, leave_type=leave_type, start_date=today + timedelta(days=7),
+            end_date=today + timedelta(days=8), reason='Trip',
+        )
+        period = PayrollPeriod.objects.create(
+            name='Last month', start_date=today - timedelta(days=30), end_date=today - timedelta(days=1),
+            payment_date=today, is_processed=True,
+        )
+        Payslip.objects.bulk_create([
+            Payslip(employee=employee, payroll_period=period, gross_salary=Decimal('1000.00'),
+                    total_deductions=Decimal('100.00'), net_salary=Decimal('900.00'))
+            for employee in (late, away)
+        ])
+
+        refresh_department_kpis()
 
-# Create your tests here.
+        kpi = DepartmentKPI.objects.get(department=department)
+        self.assertEqual(
+            (kpi.headcount, kpi.present_today, kpi.late_today, kpi.on_leave_today, kpi.pending_leave_requests),
+            (3, 1, 1, 1, 1),
+        )
+        self.assertEqual(kpi.attendance_rate, Decimal('33.3'))
+        self.assertEqual((kpi.payroll_period_id, kpi.payslips), (period.id, 2))
+        self.assertEqual((kpi.payroll_gross, kpi.payroll_net), (Decimal('2000.00'), Decimal('1800.00')))
+        self.assertEqual(kpi.as_of, today)
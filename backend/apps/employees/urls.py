@@ -4,4 +4,5 @@ from . import views
 urlpatterns = [
     path('test/', views.test_view, name='employees_test'),
     path('', views.list_employees, name='list_employees'),
+    path('dashboard/', views.department_dashboard, name='department_dashboard'),
 ]
@@ -1,13 +1,67 @@
 from django.shortcuts import render
 from django.http import JsonResponse
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from drf_spectacular.utils import extend_schema
-from .models import Employee, Department
+from drf_spectacular.utils import extend_schema, OpenApiResponse
+from django.contrib.auth.models import User
+from apps.core.cache import cached
+from apps.core.routers import replica_reads
+from apps.core.serialization import display_name, values_rows
+from .models import Department, DepartmentKPI, Employee
 
 # Create your views here.
 
+EMPLOYEE_LIST_FIELDS = (
+    'id', 'employee_id', 'user__first_name', 'user__last_name',
+    'user__username', 'department__name', 'position', 'status',
+    'employment_type', 'hire_date',
+)
+
+def _employee_row(row):
+    return {
+        'id': row.id,
+        'employee_id': row.employee_id,
+        'name': display_name(row.user__first_name, row.user__last_name, row.user__username),
+        'department': row.department__name,
+        'position': row.position,
+        'status': row.status,
+        'employment_type': row.employment_type,
+        'hire_date': row.hire_date
+    }
+
+DEPARTMENT_KPI_FIELDS = (
+    'department_id', 'department_name', 'headcount', 'present_today', 'late_today',
+    'attendance_rate', 'on_leave_today', 'pending_leave_requests', 'payroll_period_id',
+    'payroll_period__name', 'payslips', 'payroll_gross', 'payroll_net', 'as_of', 'refreshed_at',
+)
+
+def _department_kpi_row(row):
+    return {
+        'department_id': row.department_id,
+        'department': row.department_name,
+        'headcount': row.headcount,
+        'attendance': {
+            'present': row.present_today,
+            'late': row.late_today,
+            'rate': row.attendance_rate
+        },
+        'leave': {
+            'on_leave': row.on_leave_today,
+            'pending_requests': row.pending_leave_requests
+        },
+        'payroll': {
+            'period_id': row.payroll_period_id,
+            'period': row.payroll_period__name,
+            'payslips': row.payslips,
+            'gross': row.payroll_gross,
+            'net': row.payroll_net
+        },
+        'as_of': row.as_of,
+        'refreshed_at': row.refreshed_at
+    }
+
 def test_view(request):
     """Simple test view to verify URL configuration is working"""
     return JsonResponse({
@@ -42,23 +96,14 @@ def test_view(request):
     }
 )
 @api_view(['GET'])
+@replica_reads
 def list_employees(request):
     """Get list of all employees"""
     try:
-        employees = Employee.objects.select_related('user', 'department').all()
-        employee_data = []
-        
-        for employee in employees:
-            employee_data.append({
-                'id': employee.id,
-                'employee_id': employee.employee_id,
-                'name': employee.user.get_full_name() or employee.user.username,
-                'department': employee.department.name if employee.department else None,
-                'position': employee.position,
-                'status': employee.status,
-                'employment_type': employee.employment_type,
-                'hire_date': employee.hire_date
-            })
+        employee_data = cached(
+            (Employee, Department, User), 'list',
+            lambda: values_rows(Employee.objects.all(), EMPLOYEE_LIST_FIELDS, _employee_row)
+        )
         
         return Response({
             'employees': employee_data,
@@ -69,3 +114,43 @@ def list_employees(request):
         return Response({
             'error': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@extend_schema(
+    tags=['Employees'],
+    summary='Department Dashboard',
+    description=(
+        'Admin only. Per-department headcount, today\'s attendance (present, late, rate), leave (on leave '
+        'today, pending requests) and totals of the latest processed payroll period, from the department '
+        'KPI view. Figures are as of refreshed_at, at most a few minutes old.'
+    ),
+    responses={
+        200: OpenApiResponse(
+            description='KPIs per department'
+        ),
+        403: OpenApiResponse(
+            description='Not an administrator'
+        )
+    }
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@replica_reads
+def department_dashboard(request):
+    """Get department KPIs"""
+    try:
+        if not request.user.is_staff:
+            return Response({
+                'error': 'Only administrators can view the dashboard'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        department_data = values_rows(DepartmentKPI.objects.all(), DEPARTMENT_KPI_FIELDS, _department_kpi_row)
+        
+        return Response({
+            'departments': department_data,
+            'count': len(department_data)
+        }, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
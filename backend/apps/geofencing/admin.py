@@ -1,3 +1,15 @@
 from django.contrib import admin
+from apps.core.changelists import LargeTableAdmin
+from .models import EmployeeLocationLog
 
 # Register your models here.
+
+@admin.register(EmployeeLocationLog)
+class EmployeeLocationLogAdmin(LargeTableAdmin):
+    list_display = ['employee', 'action', 'timestamp', 'geofence_location', 'is_within_geofence', 'distance_from_geofence']
+    list_filter = ['action', 'is_within_geofence']
+    list_select_related = ['employee__user', 'geofence_location']
+    search_fields = ['employee__user__first_name', 'employee__user__last_name', 'employee__employee_id']
+    raw_id_fields = ['employee', 'geofence_location']
+    date_hierarchy = 'timestamp'
+    readonly_fields = ['timestamp']
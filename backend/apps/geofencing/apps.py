@@ -1,6 +1,18 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete
+
+
+def _record_tombstone(sender, instance, **kwargs):
+    from .models import GeofenceTombstone
+    GeofenceTombstone.objects.create(geofence_id=instance.pk)
 
 
 class GeofencingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.geofencing'
+
+    def ready(self):
+        from apps.core.cache import register_cache_invalidation
+        from .models import GeofenceLocation, GeofenceTombstone
+        register_cache_invalidation(GeofenceLocation, GeofenceTombstone)
+        post_delete.connect(_record_tombstone, sender=GeofenceLocation, dispatch_uid='geofencing:tombstone')
@@ -0,0 +1,124 @@
+"""
+Versioned geofence bundles for on-device evaluation.
+
+The mobile app downloads the fences around it once, evaluates containment
+locally and only talks to the server on a fence transition (``ping``) or
+when the bundle version moves. The version is the latest geofence change
+(update or deletion) in epoch milliseconds. A client holding version ``v``
+asks for ``?since=v`` and gets only the fences changed after it, plus the
+ids to drop (deleted, deactivated, or moved out of the bundle's radius); an
+unchanged bundle is an empty delta. Deletions are remembered for
+``GEOFENCE_TOMBSTONE_RETENTION_DAYS``: a client holding an older version gets
+a full bundle instead of a delta.
+
+Fences are encoded as positional arrays to keep the payload small:
+``[id, kind, longitude, latitude, radius]`` with kind ``"c"`` (circle), and
+a GeoJSON MultiPolygon ``coordinates`` list appended for kind ``"p"``
+(polygon). Coordinates are rounded to 6 decimals (~0.1 m).
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.gis.measure import D
+from django.db.models import BooleanField, ExpressionWrapper, Max, Q, Value
+from django.utils import timezone
+
+from apps.core.bulk import iter_rows
+from apps.core.cache import cached
+
+from .models import GeofenceLocation, GeofenceTombstone
+
+BUNDLE_FORMAT = 1
+COORDINATE_DECIMALS = 6
+# Deltas overlap by this much so fences saved by a server with a slightly
+# late clock are not missed; re-sending a fence is harmless
+CLOCK_SKEW = timedelta(seconds=5)
+
+BUNDLE_FIELDS = ('id', 'location', 'radius', 'boundary', 'is_active', 'updated_at')
+
+
+def _millis(moment):
+    return int(moment.timestamp() * 1000) if moment else 0
+
+
+def _from_millis(value):
+    return datetime.fromtimestamp(value / 1000, tz=dt_timezone.utc)
+
+
+def _compute_version():
+    updated = GeofenceLocation.objects.aggregate(latest=Max('updated_at'))['latest']
+    deleted = GeofenceTombstone.objects.aggregate(latest=Max('deleted_at'))['latest']
+    return max(_millis(updated), _millis(deleted))
+
+
+def bundle_version():
+    """Current bundle version, cached until a geofence is saved or deleted"""
+    return cached((GeofenceLocation, GeofenceTombstone), 'bundle-version', _compute_version)
+
+
+def _round(coordinates):
+    if isinstance(coordinates[0], (int, float)):
+        return [round(value, COORDINATE_DECIMALS) for value in coordinates]
+    return [_round(part) for part in coordinates]
+
+
+def encode_fence(row):
+    location = row.location
+    fence = [row.id, 'p' if row.boundary else 'c',
+             round(location.x, COORDINATE_DECIMALS), round(location.y, COORDINATE_DECIMALS), row.radius]
+    if row.boundary:
+        fence.append(_round(row.boundary.coords))
+    return fence
+
+
+def tombstone_cutoff():
+    """Deletions before this are forgotten; older bundle versions get a full bundle"""
+    return timezone.now() - timedelta(days=settings.GEOFENCE_TOMBSTONE_RETENTION_DAYS)
+
+
+def build_bundle(center=None, radius_km=None, since=None):
+    """
+    Bundle of the fences within ``radius_km`` of ``center`` (all fences
+    without a center), in full or, with ``since``, as a delta.
+    """
+    version = bundle_version()
+    if since and _from_millis(since) < tombstone_cutoff():
+        since = None
+    fences = GeofenceLocation.objects.order_by('id')
+    within = Q(location__distance_lte=(center, D(km=radius_km))) if center is not None else Q()
+
+    removed = []
+    if since:
+        # Every changed fence; those now outside the radius are removed too
+        changed_after = _from_millis(since) - CLOCK_SKEW
+        in_scope = ExpressionWrapper(within, output_field=BooleanField()) if center is not None else Value(True)
+        fences = fences.filter(updated_at__gt=changed_after).annotate(in_scope=in_scope)
+        removed = list(
+            GeofenceTombstone.objects.filter(deleted_at__gt=changed_after).values_list('geofence_id', flat=True)
+        )
+    else:
+        fences = fences.filter(within, is_active=True).annotate(in_scope=Value(True))
+
+    encoded = []
+    for row in iter_rows(fences, BUNDLE_FIELDS + ('in_scope',)):
+        if row.is_active and row.in_scope:
+            encoded.append(encode_fence(row))
+        else:
+            removed.append(row.id)
+
+    return {
+        'format': BUNDLE_FORMAT,
+        'version': version,
+        'full': not since,
+        'center': [round(center.x, COORDINATE_DECIMALS), round(center.y, COORDINATE_DECIMALS)] if center else None,
+        'radius_km': radius_km if center else None,
+        'fences': encoded,
+        'removed': removed,
+    }
+
+
+def prune_tombstones():
+    """Delete tombstones past the retention period, keeping the newest (it may carry the version)"""
+    newest = GeofenceTombstone.objects.order_by('-deleted_at').values_list('pk', flat=True).first()
+    deleted, _ = GeofenceTombstone.objects.filter(deleted_at__lt=tombstone_cutoff()).exclude(pk=newest).delete()
+    return deleted
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.geofencing.visits import DEFAULT_BATCH_SIZE, process_location_stream
+
+
+class Command(BaseCommand):
+    help = (
+        'Run new EmployeeLocationLog rows through the geofence enter/exit detector and '
+        'record GeofenceVisit rows, a batch at a time, until the stream is drained. '
+        'With AUTO_ATTENDANCE, entries also create the check-ins, as the Celery task does.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        from apps.attendance.automation import open_attendance
+
+        handle_events = open_attendance if settings.AUTO_ATTENDANCE else None
+        entered = exited = 0
+        while events := process_location_stream(options['batch_size'], handle_events):
+            for event in events:
+                if event.kind == 'enter':
+                    entered += 1
+                else:
+                    exited += 1
+        self.stdout.write(self.style.SUCCESS(f'{entered} geofence entries, {exited} exits'))
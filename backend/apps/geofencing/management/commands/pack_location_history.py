@@ -0,0 +1,107 @@
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from apps.core.bulk import iter_rows
+from apps.core.cache import invalidate_model
+from apps.geofencing.models import LOG_FIX_FIELDS, EmployeeLocationLog, LocationStreamCursor, LocationTrack
+from apps.geofencing.trajectory import Fix, decode_fixes, encode_fixes
+from apps.geofencing.visits import STREAM_NAME
+
+
+def _hour(timestamp):
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+def _millis(fix):
+    return round(fix.timestamp.timestamp() * 1000)
+
+
+class Command(BaseCommand):
+    help = (
+        'Pack EmployeeLocationLog rows older than --older-than-days into hourly compressed '
+        'LocationTrack blobs per employee and delete the packed rows. Rows the visit detector '
+        'has not consumed yet are left alone.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=7)
+        parser.add_argument('--batch-size', type=int, default=50000, help='Fixes per transaction (whole employees)')
+        parser.add_argument('--keep-raw', action='store_true', help='Do not delete the packed log rows')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        # The heatmap roll-up re-reads the last OCCUPANCY_ROLLUP_LOOKBACK_MINUTES
+        # of raw logs, and the visit detector every row past its cursor
+        cutoff = _hour(min(
+            now - timedelta(days=options['older_than_days']),
+            now - timedelta(minutes=settings.OCCUPANCY_ROLLUP_LOOKBACK_MINUTES),
+        ))
+        consumed = LocationStreamCursor.objects.filter(name=STREAM_NAME).values_list('last_log_id', flat=True).first()
+        logs = EmployeeLocationLog.objects.filter(timestamp__lt=cutoff, id__lte=consumed or 0)
+        # Rows synced after this point are left for the next run
+        last_id = logs.aggregate(last=Max('id'))['last']
+        if last_id is None:
+            self.stdout.write('Nothing to pack')
+            return
+        logs = logs.filter(id__lte=last_id)
+        self.keep_raw = options['keep_raw']
+
+        rows = iter_rows(logs.order_by('employee_id', 'timestamp', 'id'), ('employee_id',) + LOG_FIX_FIELDS)
+        batch, batch_fixes, packed, tracks = {}, 0, 0, 0
+        for employee_id, employee_rows in groupby(rows, key=lambda row: row.employee_id):
+            if batch_fixes >= options['batch_size']:
+                self.flush(batch, cutoff, last_id)
+                batch, batch_fixes = {}, 0
+            for hour, hour_rows in groupby(employee_rows, key=lambda row: _hour(row.timestamp)):
+                fixes = [
+                    Fix(row.timestamp, row.location.x, row.location.y, row.action,
+                        row.is_within_geofence, row.geofence_location_id)
+                    for row in hour_rows
+                ]
+                batch[employee_id, hour] = fixes
+                batch_fixes += len(fixes)
+                packed += len(fixes)
+                tracks += 1
+        self.flush(batch, cutoff, last_id)
+        # bulk_create bypasses the post_save hooks; drop cached routes
+        invalidate_model(LocationTrack)
+        self.stdout.write(self.style.SUCCESS(f'Packed {packed} fixes into {tracks} hourly tracks'))
+
+    def flush(self, batch, cutoff, last_id):
+        if not batch:
+            return
+        employee_ids = {employee_id for employee_id, hour in batch}
+        with transaction.atomic():
+            # Late uploads (or --keep-raw re-runs) merge into tracks already
+            # written; fixes are deduplicated on their (millisecond) timestamp
+            existing = LocationTrack.objects.filter(
+                employee_id__in=employee_ids, start__in={hour for employee_id, hour in batch}
+            )
+            for row in iter_rows(existing, ('employee_id', 'start', 'data')):
+                if (row.employee_id, row.start) in batch:
+                    merged = {_millis(fix): fix for fix in decode_fixes(row.data)}
+                    merged.update((_millis(fix), fix) for fix in batch[row.employee_id, row.start])
+                    batch[row.employee_id, row.start] = [merged[key] for key in sorted(merged)]
+
+            LocationTrack.objects.bulk_create(
+                [
+                    LocationTrack(
+                        employee_id=employee_id, start=hour, end=fixes[-1].timestamp,
+                        point_count=len(fixes), data=encode_fixes(fixes),
+                    )
+                    for (employee_id, hour), fixes in batch.items()
+                ],
+                update_conflicts=True,
+                unique_fields=['employee', 'start'],
+                update_fields=['end', 'point_count', 'data'],
+            )
+            if not self.keep_raw:
+                EmployeeLocationLog.objects.filter(
+                    employee_id__in=employee_ids, timestamp__lt=cutoff, id__lte=last_id,
+                ).delete()
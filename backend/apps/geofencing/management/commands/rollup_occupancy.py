@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from apps.geofencing.occupancy import rollup_heatmap, rollup_occupancy
+
+
+def _moment(value):
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f'Not a date or datetime: {value}')
+        moment = datetime.combine(day, datetime.min.time())
+    if timezone.is_naive(moment):
+        moment = moment.replace(tzinfo=dt_timezone.utc)
+    return moment
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild FenceOccupancy and HeatmapCell buckets between --since and --until (default now), '
+        'one day at a time. Heatmaps need the raw location logs, which pack_location_history removes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', required=True, help='Date or ISO datetime (UTC if naive)')
+        parser.add_argument('--until', help='Date or ISO datetime (UTC if naive), default now')
+        parser.add_argument('--skip-heatmap', action='store_true')
+
+    def handle(self, *args, **options):
+        since = _moment(options['since'])
+        until = _moment(options['until']) if options['until'] else timezone.now()
+        if since >= until:
+            raise CommandError('--since must be before --until')
+
+        buckets = cells = 0
+        start = since
+        while start < until:
+            end = min(start + timedelta(days=1), until)
+            buckets += rollup_occupancy(start, end)
+            if not options['skip_heatmap']:
+                cells += rollup_heatmap(start, end)
+            start = end
+        self.stdout.write(self.style.SUCCESS(f'Rolled up {buckets} occupancy buckets and {cells} heatmap cells'))
@@ -0,0 +1,28 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0001_initial'),
+        ('geofencing', '0002_convert_to_postgis'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LocationTrack',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start', models.DateTimeField(help_text='Start of the hour the fixes fall in')),
+                ('end', models.DateTimeField(help_text='Timestamp of the last fix')),
+                ('point_count', models.PositiveIntegerField(default=0)),
+                ('data', models.BinaryField(help_text='Delta-encoded, zlib-compressed fixes')),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='location_tracks', to='employees.employee')),
+            ],
+            options={
+                'ordering': ['start'],
+                'constraints': [models.UniqueConstraint(fields=('employee', 'start'), name='unique_location_track_hour')],
+            },
+        ),
+    ]
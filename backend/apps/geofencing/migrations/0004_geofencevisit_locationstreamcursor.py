@@ -0,0 +1,41 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0001_initial'),
+        ('geofencing', '0003_locationtrack'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeofenceVisit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entered_at', models.DateTimeField()),
+                ('exited_at', models.DateTimeField(blank=True, null=True)),
+                ('last_seen_at', models.DateTimeField(help_text='Timestamp of the last fix inside the geofence')),
+                ('fix_count', models.PositiveIntegerField(default=1)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='geofence_visits', to='employees.employee')),
+                ('geofence_location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='visits', to='geofencing.geofencelocation')),
+            ],
+            options={
+                'ordering': ['-entered_at'],
+                'indexes': [
+                    models.Index(fields=['employee', 'entered_at'], name='geofence_visit_employee_idx'),
+                    models.Index(fields=['geofence_location', 'entered_at'], name='geofence_visit_fence_idx'),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name='LocationStreamCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_log_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,17 @@
+import django.contrib.gis.db.models.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geofencing', '0004_geofencevisit_locationstreamcursor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='geofencelocation',
+            name='boundary',
+            field=django.contrib.gis.db.models.fields.MultiPolygonField(blank=True, help_text='Outline for irregular sites; when set it is used instead of location + radius', null=True, srid=4326),
+        ),
+    ]
@@ -0,0 +1,19 @@
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction; pings keep
+    # writing while the index builds
+    atomic = False
+
+    dependencies = [
+        ('geofencing', '0006_geofencetombstone'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='employeelocationlog',
+            index=models.Index(fields=['employee', '-timestamp'], name='location_log_employee_ts_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geofencing', '0007_location_log_employee_ts_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FenceOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField(help_text='Start of the 15 minute bucket')),
+                ('employees', models.PositiveIntegerField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('geofence_location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy', to='geofencing.geofencelocation')),
+            ],
+            options={
+                'ordering': ['bucket'],
+                'constraints': [models.UniqueConstraint(fields=('geofence_location', 'bucket'), name='unique_fence_occupancy_bucket')],
+                'indexes': [models.Index(fields=['bucket'], name='fence_occupancy_bucket_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='HeatmapCell',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField(help_text='Start of the hour')),
+                ('geohash', models.CharField(max_length=12)),
+                ('fixes', models.PositiveIntegerField()),
+                ('employees', models.PositiveIntegerField()),
+            ],
+            options={
+                'ordering': ['bucket', 'geohash'],
+                'constraints': [models.UniqueConstraint(fields=('bucket', 'geohash'), name='unique_heatmap_cell')],
+            },
+        ),
+    ]
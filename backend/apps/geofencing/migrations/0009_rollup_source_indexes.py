@@ -0,0 +1,24 @@
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction; pings keep
+    # writing while the indexes build
+    atomic = False
+
+    dependencies = [
+        ('geofencing', '0008_fenceoccupancy_heatmapcell'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='employeelocationlog',
+            index=django.contrib.postgres.indexes.BrinIndex(fields=['timestamp'], name='location_log_timestamp_brin'),
+        ),
+        AddIndexConcurrently(
+            model_name='geofencevisit',
+            index=models.Index(fields=['exited_at'], name='geofence_visit_exited_idx'),
+        ),
+    ]
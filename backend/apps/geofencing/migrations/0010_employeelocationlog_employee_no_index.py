@@ -0,0 +1,50 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def _employee_indexes(schema_editor, table):
+    with schema_editor.connection.cursor() as cursor:
+        constraints = schema_editor.connection.introspection.get_constraints(cursor, table)
+    return [
+        name for name, info in constraints.items()
+        if info['index'] and not info['unique'] and not info['primary_key'] and info['columns'] == ['employee_id']
+    ]
+
+
+def drop_employee_index(apps, schema_editor):
+    table = apps.get_model('geofencing', 'EmployeeLocationLog')._meta.db_table
+    for name in _employee_indexes(schema_editor, table):
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {schema_editor.quote_name(name)}')
+
+
+def create_employee_index(apps, schema_editor):
+    table = apps.get_model('geofencing', 'EmployeeLocationLog')._meta.db_table
+    name = schema_editor._create_index_name(table, ['employee_id'], suffix='')
+    schema_editor.execute(
+        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {schema_editor.quote_name(name)} '
+        f'ON {schema_editor.quote_name(table)} (employee_id)'
+    )
+
+
+class Migration(migrations.Migration):
+    # location_log_employee_ts_idx leads with employee_id, so the FK's own index
+    # only costs writes. DROP INDEX CONCURRENTLY cannot run inside a
+    # transaction, and AlterField would drop it with a blocking lock
+    atomic = False
+
+    dependencies = [
+        ('geofencing', '0009_rollup_source_indexes'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[migrations.RunPython(drop_employee_index, create_employee_index)],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='employeelocationlog',
+                    name='employee',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='employees.employee'),
+                ),
+            ],
+        ),
+    ]
@@ -2,11 +2,23 @@ from django.contrib.gis.db import models
 from django.contrib.gis.geos import Point
 from django.contrib.gis.measure import Distance
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import BrinIndex
+from apps.core.bulk import iter_rows
 from apps.employees.models import Employee
+from operator import attrgetter
+from .trajectory import Fix, decode_fixes
 import math
 
+# EmployeeLocationLog columns that make up a trajectory.Fix
+LOG_FIX_FIELDS = ('timestamp', 'location', 'action', 'is_within_geofence', 'geofence_location_id')
+
 # Create your models here.
 
+# Prepared fence outlines per (id, updated_at), shared by every instance in
+# this process (instances served from the cache are new objects each time)
+_prepared_boundaries = {}
+MAX_PREPARED_BOUNDARIES = 1000
+
 class GeofenceLocation(models.Model):
     LOCATION_TYPE_CHOICES = [
         ('office', 'Office'),
@@ -19,6 +31,10 @@ class GeofenceLocation(models.Model):
     location_type = models.CharField(max_length=20, choices=LOCATION_TYPE_CHOICES, default='office')
     location = models.PointField(help_text="Geographic location (longitude, latitude)")
     radius = models.IntegerField(default=100, help_text="Radius in meters")
+    boundary = models.MultiPolygonField(
+        null=True, blank=True,
+        help_text="Outline for irregular sites; when set it is used instead of location + radius"
+    )
     address = models.TextField(blank=True, null=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -38,29 +54,78 @@ class GeofenceLocation(models.Model):
 
     def is_within_geofence(self, latitude, longitude):
         """
-        Check if given coordinates are within the geofence radius
-        Using PostGIS spatial functions for accurate calculation
+        Check if given coordinates are within the geofence boundary or radius
         """
-        if not self.location:
-            return False
-            
-        point = Point(float(longitude), float(latitude))
-        distance = self.location.distance(point) * 111000  # Convert degrees to meters (approximate)
-        return distance <= self.radius
+        return self.is_point_within_geofence(Point(float(longitude), float(latitude)))
     
     def is_point_within_geofence(self, point):
         """
-        Check if a PostGIS Point is within the geofence radius
+        Check if a PostGIS Point is within the geofence boundary or radius
         """
-        if not self.location or not point:
+        if not point:
+            return False
+        if self.boundary:
+            return self.prepared_boundary().covers(point)
+        if not self.location:
             return False
             
         distance = self.location.distance(point) * 111000  # Convert degrees to meters (approximate)
         return distance <= self.radius
 
+    def distance_to(self, point):
+        """Approximate distance in metres from the geofence edge (polygons) or centre"""
+        if self.boundary:
+            return self.boundary.distance(point) * 111000
+        return self.location.distance(point) * 111000
+
+    def prepared_boundary(self):
+        """
+        GEOS prepared geometry for ``boundary``, built once per process and
+        geofence version; repeated point-in-polygon tests against it skip
+        re-indexing the outline.
+        """
+        if self.pk is None:
+            return self.boundary.prepared
+        key = (self.pk, self.updated_at)
+        prepared = _prepared_boundaries.get(key)
+        if prepared is None:
+            if len(_prepared_boundaries) >= MAX_PREPARED_BOUNDARIES:
+                _prepared_boundaries.clear()
+            prepared = _prepared_boundaries[key] = self.boundary.prepared
+        return prepared
+
     class Meta:
         ordering = ['name']
 
+class GeofenceTombstone(models.Model):
+    """Records a deleted geofence so bundle deltas can tell clients to drop it"""
+    geofence_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"Geofence {self.geofence_id} deleted at {self.deleted_at}"
+
+def match_geofence(point, geofences):
+    """
+    ``(geofence, is_within, distance in metres)`` for ``point``: the first
+    geofence containing it, else the closest one (None without geofences).
+    """
+    closest_location = None
+    min_distance = float('inf')
+    
+    for geofence in geofences:
+        if geofence.is_point_within_geofence(point):
+            return geofence, True, 0
+        elif geofence.location or geofence.boundary:
+            distance = geofence.distance_to(point)
+            if distance < min_distance:
+                min_distance = distance
+                closest_location = geofence
+    
+    if closest_location is None:
+        return None, False, None
+    return closest_location, False, round(min_distance, 2)
+
 class EmployeeLocationLog(models.Model):
     ACTION_CHOICES = [
         ('check_in', 'Check In'),
@@ -68,7 +133,8 @@ class EmployeeLocationLog(models.Model):
         ('location_update', 'Location Update'),
     ]
 
-    employee = models.ForeignKey(Employee, on_delete=models.CASCADE)
+    # Indexed by location_log_employee_ts_idx
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, db_index=False)
     geofence_location = models.ForeignKey(GeofenceLocation, on_delete=models.CASCADE, null=True, blank=True)
     location = models.PointField(help_text="Employee's geographic location (longitude, latitude)")
     action = models.CharField(max_length=20, choices=ACTION_CHOICES)
@@ -89,26 +155,9 @@ class EmployeeLocationLog(models.Model):
     def save(self, *args, **kwargs):
         # Check if location is within any active geofence
         if not self.geofence_location and self.location:
-            # Find the closest geofence location using PostGIS
-            closest_location = None
-            min_distance = float('inf')
-            
-            for geofence in GeofenceLocation.objects.filter(is_active=True):
-                if geofence.is_point_within_geofence(self.location):
-                    self.geofence_location = geofence
-                    self.is_within_geofence = True
-                    self.distance_from_geofence = 0
-                    break
-                elif geofence.location:
-                    # Calculate distance using PostGIS
-                    distance = geofence.location.distance(self.location) * 111000  # Convert to meters
-                    if distance < min_distance:
-                        min_distance = distance
-                        closest_location = geofence
-            
-            if not self.is_within_geofence and closest_location:
-                self.geofence_location = closest_location
-                self.distance_from_geofence = min_distance
+            self.geofence_location, self.is_within_geofence, self.distance_from_geofence = match_geofence(
+                self.location, GeofenceLocation.objects.filter(is_active=True)
+            )
         
         super().save(*args, **kwargs)
 
@@ -117,3 +166,138 @@ class EmployeeLocationLog(models.Model):
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            # An employee's latest fixes and history windows
+            models.Index(fields=['employee', '-timestamp'], name='location_log_employee_ts_idx'),
+            # Time range scans of the whole (append-only) log, for the heatmap rollup
+            BrinIndex(fields=['timestamp'], name='location_log_timestamp_brin'),
+        ]
+
+
+class LocationTrack(models.Model):
+    """
+    One hour of an employee's GPS fixes packed into a single compressed blob
+    (see ``trajectory.encode_fixes``). ``pack_location_history`` moves old
+    ``EmployeeLocationLog`` rows here.
+    """
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='location_tracks')
+    start = models.DateTimeField(help_text="Start of the hour the fixes fall in")
+    end = models.DateTimeField(help_text="Timestamp of the last fix")
+    point_count = models.PositiveIntegerField(default=0)
+    data = models.BinaryField(help_text="Delta-encoded, zlib-compressed fixes")
+
+    def __str__(self):
+        return f"{self.employee} - {self.point_count} fixes from {self.start}"
+
+    def fixes(self):
+        return decode_fixes(self.data)
+
+    class Meta:
+        ordering = ['start']
+        constraints = [
+            models.UniqueConstraint(fields=['employee', 'start'], name='unique_location_track_hour'),
+        ]
+
+
+class GeofenceVisit(models.Model):
+    """
+    A stay inside one geofence, derived from the location stream by
+    ``visits.VisitDetector``. ``exited_at`` is empty while the visit is open.
+    """
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='geofence_visits')
+    geofence_location = models.ForeignKey(GeofenceLocation, on_delete=models.CASCADE, related_name='visits')
+    entered_at = models.DateTimeField()
+    exited_at = models.DateTimeField(null=True, blank=True)
+    last_seen_at = models.DateTimeField(help_text="Timestamp of the last fix inside the geofence")
+    fix_count = models.PositiveIntegerField(default=1)
+
+    @property
+    def dwell(self):
+        return (self.exited_at or self.last_seen_at) - self.entered_at
+
+    def __str__(self):
+        return f"{self.employee} at {self.geofence_location} from {self.entered_at}"
+
+    class Meta:
+        ordering = ['-entered_at']
+        indexes = [
+            models.Index(fields=['employee', 'entered_at'], name='geofence_visit_employee_idx'),
+            models.Index(fields=['geofence_location', 'entered_at'], name='geofence_visit_fence_idx'),
+            # Open and recently closed visits, for the occupancy rollup
+            models.Index(fields=['exited_at'], name='geofence_visit_exited_idx'),
+        ]
+
+
+class FenceOccupancy(models.Model):
+    """
+    Distinct employees inside a geofence during a 15 minute bucket, rolled up
+    from ``GeofenceVisit`` by ``occupancy.rollup_occupancy``.
+    """
+    geofence_location = models.ForeignKey(GeofenceLocation, on_delete=models.CASCADE, related_name='occupancy')
+    bucket = models.DateTimeField(help_text="Start of the 15 minute bucket")
+    employees = models.PositiveIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.geofence_location} at {self.bucket}: {self.employees}"
+
+    class Meta:
+        ordering = ['bucket']
+        constraints = [
+            models.UniqueConstraint(fields=['geofence_location', 'bucket'], name='unique_fence_occupancy_bucket'),
+        ]
+        indexes = [
+            models.Index(fields=['bucket'], name='fence_occupancy_bucket_idx'),
+        ]
+
+
+class HeatmapCell(models.Model):
+    """
+    Location fixes per geohash cell and hour, rolled up from
+    ``EmployeeLocationLog`` by ``occupancy.rollup_heatmap``.
+    """
+    bucket = models.DateTimeField(help_text="Start of the hour")
+    geohash = models.CharField(max_length=12)
+    fixes = models.PositiveIntegerField()
+    employees = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f"{self.geohash} at {self.bucket}: {self.fixes} fixes"
+
+    class Meta:
+        ordering = ['bucket', 'geohash']
+        constraints = [
+            models.UniqueConstraint(fields=['bucket', 'geohash'], name='unique_heatmap_cell'),
+        ]
+
+
+class LocationStreamCursor(models.Model):
+    """Last ``EmployeeLocationLog`` id consumed by a stream processor"""
+    name = models.CharField(max_length=50, unique=True)
+    last_log_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_log_id}"
+
+
+def get_location_history(employee_id, start, end):
+    """
+    Fixes recorded for an employee between ``start`` and ``end``, decoded
+    from packed tracks and merged with not-yet-packed raw logs.
+    """
+    tracks = LocationTrack.objects.filter(employee_id=employee_id, start__lte=end, end__gte=start)
+    fixes = [
+        fix
+        for track in iter_rows(tracks, ('data',))
+        for fix in decode_fixes(track.data)
+        if start <= fix.timestamp <= end
+    ]
+    logs = EmployeeLocationLog.objects.filter(employee_id=employee_id, timestamp__range=(start, end))
+    fixes.extend(
+        Fix(row.timestamp, row.location.x, row.location.y, row.action, row.is_within_geofence, row.geofence_location_id)
+        for row in iter_rows(logs, LOG_FIX_FIELDS)
+    )
+    fixes.sort(key=attrgetter('timestamp'))
+    return fixes
+
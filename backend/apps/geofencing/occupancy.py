@@ -0,0 +1,139 @@
+"""
+Occupancy and heatmap roll-ups for the operations dashboard.
+
+Two small tables are maintained by scheduled SQL roll-ups, so dashboards
+never scan location logs or attendance:
+
+* ``FenceOccupancy``: distinct employees inside each geofence per 15 minute
+  bucket, from ``GeofenceVisit`` (an open visit counts up to its last fix
+  inside the fence);
+* ``HeatmapCell``: fixes and distinct employees per geohash cell
+  (``HEATMAP_GEOHASH_PRECISION``, 7 = ~150 m) and hour, from
+  ``EmployeeLocationLog``.
+
+``rollup_recent`` re-aggregates the last ``OCCUPANCY_ROLLUP_LOOKBACK_MINUTES``
+(whole buckets), which absorbs visits that are closed late and fixes that
+arrive late. Occupancy buckets of the window are replaced, so a bucket whose
+visits were closed earlier or rebuilt elsewhere disappears; heatmap cells
+are upserted, since raw logs only ever leave through the packer. Older windows can be rebuilt with the
+``rollup_occupancy`` command, for heatmaps only while the raw logs are still
+there (``pack_location_history`` removes them).
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max, Sum
+from django.db.models.functions import Left
+from django.utils import timezone
+
+from .models import EmployeeLocationLog, FenceOccupancy, GeofenceVisit, HeatmapCell
+
+OCCUPANCY_BUCKET = timedelta(minutes=15)
+HEATMAP_BUCKET = timedelta(hours=1)
+
+_OCCUPANCY_SQL = """
+INSERT INTO {occupancy} (geofence_location_id, bucket, employees, updated_at)
+SELECT visit.geofence_location_id, slot.bucket, COUNT(DISTINCT visit.employee_id), now()
+FROM {visit} AS visit
+CROSS JOIN LATERAL generate_series(
+    date_bin('15 minutes', GREATEST(visit.entered_at, %(start)s), TIMESTAMPTZ '2000-01-01 00:00:00+00'),
+    LEAST(COALESCE(visit.exited_at, visit.last_seen_at), %(end)s - INTERVAL '1 microsecond'),
+    INTERVAL '15 minutes'
+) AS slot(bucket)
+WHERE (visit.exited_at IS NULL OR visit.exited_at >= %(start)s)
+  AND visit.entered_at < %(end)s
+GROUP BY visit.geofence_location_id, slot.bucket
+ON CONFLICT (geofence_location_id, bucket)
+DO UPDATE SET employees = EXCLUDED.employees, updated_at = EXCLUDED.updated_at
+"""
+
+_HEATMAP_SQL = """
+INSERT INTO {heatmap} (bucket, geohash, fixes, employees)
+SELECT date_trunc('hour', log.timestamp), ST_GeoHash(log.location, %(precision)s),
+       COUNT(*), COUNT(DISTINCT log.employee_id)
+FROM {log} AS log
+WHERE log.timestamp >= %(start)s AND log.timestamp < %(end)s
+GROUP BY 1, 2
+ON CONFLICT (bucket, geohash)
+DO UPDATE SET fixes = EXCLUDED.fixes, employees = EXCLUDED.employees
+"""
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def floor_time(moment, step):
+    """Start of the ``step``-long bucket (aligned to the epoch) ``moment`` falls in"""
+    seconds = moment.timestamp()
+    return datetime.fromtimestamp(seconds - seconds % step.total_seconds(), tz=dt_timezone.utc)
+
+
+def _ceil_time(moment, step):
+    floor = floor_time(moment, step)
+    return floor if floor == moment else floor + step
+
+
+def rollup_occupancy(start, end):
+    """Recompute the occupancy buckets in [start, end), widened to whole buckets"""
+    sql = _OCCUPANCY_SQL.format(
+        occupancy=FenceOccupancy._meta.db_table, visit=GeofenceVisit._meta.db_table,
+    )
+    params = {'start': floor_time(start, OCCUPANCY_BUCKET), 'end': _ceil_time(end, OCCUPANCY_BUCKET)}
+    with transaction.atomic(), connection.cursor() as cursor:
+        FenceOccupancy.objects.filter(bucket__gte=params['start'], bucket__lt=params['end']).delete()
+        cursor.execute(sql, params)
+        return cursor.rowcount
+
+
+def rollup_heatmap(start, end):
+    """
+    Recompute the heatmap cells of the hours in [start, end), widened to
+    whole hours. Cells are not cleared first: hours already packed have no
+    raw logs left to rebuild them from.
+    """
+    sql = _HEATMAP_SQL.format(heatmap=HeatmapCell._meta.db_table, log=EmployeeLocationLog._meta.db_table)
+    params = {
+        'start': floor_time(start, HEATMAP_BUCKET),
+        'end': _ceil_time(end, HEATMAP_BUCKET),
+        'precision': settings.HEATMAP_GEOHASH_PRECISION,
+    }
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
+
+
+def rollup_recent(now=None):
+    now = now or timezone.now()
+    start = now - timedelta(minutes=settings.OCCUPANCY_ROLLUP_LOOKBACK_MINUTES)
+    return {
+        'occupancy_buckets': rollup_occupancy(start, now),
+        'heatmap_cells': rollup_heatmap(start, now),
+    }
+
+
+def geohash_center(geohash):
+    """(latitude, longitude) of the centre of a geohash cell"""
+    bounds = [[-90.0, 90.0], [-180.0, 180.0]]
+    even = True
+    for character in geohash:
+        value = _BASE32.index(character)
+        for bit in (16, 8, 4, 2, 1):
+            interval = bounds[1] if even else bounds[0]
+            middle = (interval[0] + interval[1]) / 2
+            interval[0 if value & bit else 1] = middle
+            even = not even
+    return (bounds[0][0] + bounds[0][1]) / 2, (bounds[1][0] + bounds[1][1]) / 2
+
+
+def heatmap(start, end, precision):
+    """
+    Heatmap cells over [start, end), merged up to ``precision`` geohash
+    characters: total fixes and the peak hourly number of employees per cell.
+    """
+    return (
+        HeatmapCell.objects.filter(bucket__gte=start, bucket__lt=end)
+        .annotate(cell=Left('geohash', precision))
+        .values('cell')
+        .annotate(fixes_total=Sum('fixes'), peak_employees=Max('employees'))
+        .order_by('cell')
+    )
@@ -0,0 +1,49 @@
+from celery import shared_task
+from django.conf import settings
+from django.core.management import call_command
+
+from .visits import process_location_stream
+
+
+@shared_task(time_limit=5 * 60, soft_time_limit=4 * 60)
+def process_location_stream_task(max_batches=20):
+    """
+    Drain new location logs through the visit detector, a batch at a time,
+    and apply automatic attendance (AUTO_ATTENDANCE) to the resulting events.
+    Scheduled by beat; ingesting a ping only inserts the log row.
+    """
+    from apps.attendance.automation import close_attendance, open_attendance
+
+    checked_in = []
+    # Check-ins commit in the same transaction as the stream cursor, so an
+    # error or time limit between the two can never drop an entry
+    handle_events = (lambda batch: checked_in.append(open_attendance(batch))) if settings.AUTO_ATTENDANCE else None
+    events = 0
+    for _ in range(max_batches):
+        batch = process_location_stream(handle_events=handle_events)
+        if not batch:
+            break
+        events += len(batch)
+
+    checked_out = close_attendance() if settings.AUTO_ATTENDANCE else 0
+    return {'events': events, 'checked_in': sum(checked_in), 'checked_out': checked_out}
+
+
+@shared_task
+def pack_location_history_task(older_than_days=7):
+    """Nightly maintenance: pack old location logs into LocationTrack blobs"""
+    call_command('pack_location_history', older_than_days=older_than_days)
+
+
+@shared_task
+def prune_geofence_tombstones_task():
+    """Nightly maintenance: forget geofence deletions past GEOFENCE_TOMBSTONE_RETENTION_DAYS"""
+    from .bundle import prune_tombstones
+    return prune_tombstones()
+
+
+@shared_task(time_limit=5 * 60, soft_time_limit=4 * 60)
+def rollup_occupancy_task():
+    """Refresh the recent occupancy and heatmap buckets (see occupancy.py)"""
+    from .occupancy import rollup_recent
+    return rollup_recent()
@@ -1,3 +1,371 @@
-from django.test import TestCase
+import json
+import zlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.gis.geos import MultiPolygon, Point, Polygon
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.attendance.automation import open_attendance
+from apps.attendance.models import AttendanceRecord
+from apps.core.testing import create_employee
+
+from .bundle import build_bundle, bundle_version
+from .models import (
+    EmployeeLocationLog, FenceOccupancy, GeofenceLocation, GeofenceVisit, HeatmapCell, LocationStreamCursor,
+    LocationTrack, match_geofence,
+)
+from .occupancy import HEATMAP_BUCKET, floor_time, geohash_center, heatmap, rollup_heatmap, rollup_occupancy
+from .trajectory import ACTIONS, FORMAT_VERSION, Fix, decode_fixes, encode_fixes
+from .visits import STREAM_NAME, VisitDetector, process_location_stream
+
+
+class RouteCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_fixes_synced_late_refresh_a_finished_route(self):
+        employee = create_employee('route')
+        staff = create_employee('route-admin', is_staff=True)
+        day = timezone.localdate() - timedelta(days=1)
+        check_in = timezone.now() - timedelta(days=1, hours=4)
+        AttendanceRecord.objects.create(
+            employee=employee, date=day, check_in_time=check_in, check_out_time=check_in + timedelta(hours=2),
+        )
+
+        def add_fix(minutes):
+            log = EmployeeLocationLog.objects.create(
+                employee=employee, location=Point(74.3, 31.5 + minutes * 0.001), action='location_update',
+            )
+            EmployeeLocationLog.objects.filter(pk=log.pk).update(timestamp=check_in + timedelta(minutes=minutes))
+
+        def route_points():
+            url = reverse('employee_route', kwargs={'employee_id': employee.id})
+            return self.client.get(url, {'date': day.isoformat(), 'zoom': 18}).json()['count']
+
+        self.client.force_login(staff.user)
+        add_fix(10)
+        self.assertEqual(route_points(), 1)
+        add_fix(20)
+        self.assertEqual(route_points(), 2)
+
+
+class LocationStreamTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_check_ins_commit_with_the_stream_cursor(self):
+        employee = create_employee('walker')
+        fence = GeofenceLocation.objects.create(name='Gate', location=Point(74.3, 31.5), radius=100)
+        EmployeeLocationLog.objects.create(
+            employee=employee, location=Point(74.3, 31.5), action='location_update',
+            is_within_geofence=True, geofence_location=fence,
+        )
+
+        def worker_lost(events):
+            raise RuntimeError('worker lost')
+
+        with self.assertRaises(RuntimeError):
+            process_location_stream(handle_events=worker_lost)
+        self.assertFalse(GeofenceVisit.objects.exists())
+
+        events = process_location_stream(handle_events=open_attendance)
+        self.assertEqual([event.kind for event in events], ['enter'])
+        self.assertEqual(AttendanceRecord.objects.filter(employee=employee, source='geofence').count(), 1)
+        self.assertEqual(process_location_stream(handle_events=open_attendance), [])
+
+
+class VisitDetectorTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.employee = create_employee('visitor').id
+        self.gate = GeofenceLocation.objects.create(name='Gate', location=Point(74.3, 31.5), radius=100).id
+        self.yard = GeofenceLocation.objects.create(name='Yard', location=Point(74.31, 31.5), radius=100).id
+        self.start = timezone.now() - timedelta(hours=1)
+
+    def at(self, seconds):
+        return self.start + timedelta(seconds=seconds)
+
+    def run_fixes(self, fixes, position=1, loaded_at=0):
+        detector = VisitDetector(exit_grace=60)
+        detector.load([self.employee], position=loaded_at)
+        for seconds, geofence_id in fixes:
+            detector.feed(self.employee, self.at(seconds), geofence_id)
+        detector.flush(position)
+        return [(event.kind, event.geofence_id, event.timestamp) for event in detector.events]
+
+    def visits(self):
+        return list(
+            GeofenceVisit.objects.order_by('entered_at')
+            .values_list('geofence_location_id', 'entered_at', 'exited_at', 'last_seen_at', 'fix_count')
+        )
+
+    def test_fixes_inside_extend_the_visit_across_batches(self):
+        self.assertEqual(self.run_fixes([(0, self.gate), (10, self.gate)]), [('enter', self.gate, self.at(0))])
+        self.assertEqual(self.run_fixes([(20, self.gate)], position=2, loaded_at=1), [])
+        self.assertEqual(self.visits(), [(self.gate, self.at(0), None, self.at(20), 3)])
+
+    def test_jitter_shorter_than_the_grace_keeps_one_visit(self):
+        events = self.run_fixes([(0, self.gate), (10, None), (50, None), (60, self.gate)])
+        self.assertEqual(events, [('enter', self.gate, self.at(0))])
+        self.assertEqual(self.visits(), [(self.gate, self.at(0), None, self.at(60), 2)])
+
+    def test_exit_after_the_grace_is_dated_when_the_employee_left(self):
+        events = self.run_fixes([(0, self.gate), (30, None), (60, None), (90, None)])
+        self.assertEqual(events, [('enter', self.gate, self.at(0)), ('exit', self.gate, self.at(30))])
+        self.assertEqual(self.visits(), [(self.gate, self.at(0), self.at(30), self.at(0), 1)])
+
+    def test_moving_straight_to_another_fence(self):
+        events = self.run_fixes([(0, self.gate), (10, self.yard)])
+        self.assertEqual(events, [
+            ('enter', self.gate, self.at(0)), ('exit', self.gate, self.at(10)), ('enter', self.yard, self.at(10)),
+        ])
+        self.assertEqual(self.visits(), [
+            (self.gate, self.at(0), self.at(10), self.at(0), 1), (self.yard, self.at(10), None, self.at(10), 1),
+        ])
+
+    def test_late_and_repeated_fixes_are_ignored(self):
+        events = self.run_fixes([(10, self.gate), (20, self.gate), (20, self.gate), (5, None), (15, self.yard)])
+        self.assertEqual(events, [('enter', self.gate, self.at(10))])
+        self.assertEqual(self.visits(), [(self.gate, self.at(10), None, self.at(20), 2)])
+
+    def test_state_from_a_rolled_back_batch_is_rebuilt_from_open_visits(self):
+        GeofenceVisit.objects.create(
+            employee_id=self.employee, geofence_location_id=self.gate,
+            entered_at=self.at(0), last_seen_at=self.at(10), fix_count=2,
+        )
+        # Written by a batch that ended at position 5 and then rolled back
+        cache.set(f'fencestate:{self.employee}', {
+            'position': 5, 'last_fix': self.at(100), 'outside_since': None, 'visit': None,
+        })
+        self.assertEqual(self.run_fixes([(20, self.gate)], position=4, loaded_at=3), [])
+        self.assertEqual(self.visits(), [(self.gate, self.at(0), None, self.at(20), 3)])
+
+
+class TrajectoryTests(SimpleTestCase):
+    def test_fixes_round_trip(self):
+        start = datetime(2026, 3, 2, 8, 0, 0, 123000, tzinfo=dt_timezone.utc)
+        fixes = [
+            Fix(start, 74.312345, 31.512345, 'check_in', True, 7),
+            # Negative deltas, west and south of the origin, a millisecond later
+            Fix(start + timedelta(milliseconds=1), -0.127512, -33.868821, 'location_update', False, None),
+            Fix(start + timedelta(seconds=90, milliseconds=999), -0.127513, -33.868822, 'location_update', True, 123456),
+            Fix(start + timedelta(hours=1), 74.3, 31.5, 'check_out', False, None),
+        ]
+        self.assertEqual({value for value, label in EmployeeLocationLog.ACTION_CHOICES}, set(ACTIONS))
+        self.assertEqual(decode_fixes(encode_fixes(fixes)), fixes)
+        self.assertEqual(decode_fixes(encode_fixes([])), [])
+
+    def test_unknown_versions_are_refused(self):
+        with self.assertRaises(ValueError):
+            decode_fixes(zlib.compress(bytes([FORMAT_VERSION + 1, 0])))
+
+
+class PackLocationHistoryTests(TestCase):
+    def pack(self, *args):
+        call_command('pack_location_history', *args, stdout=StringIO())
+
+    def test_packing_leaves_fixes_the_detector_has_not_consumed(self):
+        employee = create_employee('packer')
+        old = timezone.now() - timedelta(days=10)
+        logs = [
+            EmployeeLocationLog.objects.create(employee=employee, location=Point(74.3, 31.5), action='location_update')
+            for _ in range(3)
+        ]
+        EmployeeLocationLog.objects.update(timestamp=old)
+        LocationStreamCursor.objects.create(name=STREAM_NAME, last_log_id=logs[1].id)
+
+        self.pack()
+        self.assertEqual(list(EmployeeLocationLog.objects.values_list('id', flat=True)), [logs[2].id])
+        self.assertEqual(LocationTrack.objects.get(employee=employee).point_count, 2)
+
+    def test_repacking_an_hour_merges_into_its_track(self):
+        employee = create_employee('repacked')
+        hour = (timezone.now() - timedelta(days=10)).replace(minute=0, second=0, microsecond=0)
+        packed = [
+            Fix(hour + timedelta(minutes=1), 74.3, 31.5, 'check_in', True, None),
+            Fix(hour + timedelta(minutes=2), 74.3, 31.5, 'location_update', True, None),
+        ]
+        LocationTrack.objects.create(
+            employee=employee, start=hour, end=packed[-1].timestamp, point_count=2, data=encode_fixes(packed),
+        )
+
+        def log(minutes, longitude):
+            row = EmployeeLocationLog.objects.create(
+                employee=employee, location=Point(longitude, 31.5), action='location_update',
+            )
+            EmployeeLocationLog.objects.filter(pk=row.pk).update(timestamp=hour + timedelta(minutes=minutes))
+            return row
+
+        # A late upload repeats the two minute fix and adds a third
+        log(2, 74.301)
+        last = log(3, 74.302)
+        LocationStreamCursor.objects.create(name=STREAM_NAME, last_log_id=last.id)
+        self.pack('--keep-raw')
+        self.pack()
+
+        track = LocationTrack.objects.get(employee=employee)
+        fixes = track.fixes()
+        self.assertEqual([fix.timestamp for fix in fixes], [hour + timedelta(minutes=minutes) for minutes in (1, 2, 3)])
+        self.assertEqual([fix.longitude for fix in fixes], [74.3, 74.301, 74.302])
+        self.assertEqual((track.point_count, track.end), (3, hour + timedelta(minutes=3)))
+        self.assertFalse(EmployeeLocationLog.objects.exists())
+
+
+def _square(x, y, size=0.01):
+    return Polygon(((x, y), (x + size, y), (x + size, y + size), (x, y + size), (x, y)), srid=4326)
+
+
+class GeofencePolygonTests(TestCase):
+    # A U shape, 0.001 degrees (~111 m) per unit, open at the top between x=1 and x=2
+    U_SHAPE = [(0, 0), (3, 0), (3, 3), (2, 3), (2, 1), (1, 1), (1, 3), (0, 3), (0, 0)]
+
+    def point(self, x, y):
+        return Point(74.3 + x * 0.001, 31.5 + y * 0.001, srid=4326)
+
+    def create(self, boundary, **fields):
+        return GeofenceLocation.objects.create(
+            name='Site', location=boundary.centroid, boundary=boundary, **fields,
+        )
+
+    def test_concave_outlines_leave_the_notch_outside(self):
+        outline = Polygon([(74.3 + x * 0.001, 31.5 + y * 0.001) for x, y in self.U_SHAPE], srid=4326)
+        fence = self.create(MultiPolygon(outline, srid=4326))
+        # The notch is within the default radius of the centroid; the outline wins
+        self.assertTrue(fence.location.distance(self.point(1.5, 2)) * 111000 < fence.radius)
+        self.assertTrue(fence.is_point_within_geofence(self.point(0.5, 2)))
+        self.assertTrue(fence.is_point_within_geofence(self.point(1.5, 0.5)))
+        self.assertFalse(fence.is_point_within_geofence(self.point(1.5, 2)))
+        self.assertFalse(fence.is_point_within_geofence(self.point(4, 1)))
+
+    def test_prepared_outline_is_rebuilt_when_the_fence_changes(self):
+        fence = self.create(MultiPolygon(_square(74.3, 31.5), srid=4326))
+        prepared = fence.prepared_boundary()
+        self.assertIs(GeofenceLocation.objects.get(pk=fence.pk).prepared_boundary(), prepared)
+
+        fence.boundary = MultiPolygon(_square(74.4, 31.5), srid=4326)
+        fence.save()
+        moved = GeofenceLocation.objects.get(pk=fence.pk)
+        self.assertIsNot(moved.prepared_boundary(), prepared)
+        self.assertTrue(moved.is_point_within_geofence(Point(74.405, 31.505, srid=4326)))
+        self.assertFalse(moved.is_point_within_geofence(Point(74.305, 31.505, srid=4326)))
+
+    def test_distance_is_measured_to_the_outline(self):
+        fence = self.create(MultiPolygon(_square(74.3, 31.5), srid=4326), radius=0)
+        outside = Point(74.32, 31.505, srid=4326)
+        self.assertAlmostEqual(fence.distance_to(outside), 1110, delta=1)
+        self.assertEqual(match_geofence(Point(74.305, 31.505, srid=4326), [fence]), (fence, True, 0))
+        match, within, distance = match_geofence(outside, [fence])
+        self.assertEqual((match, within), (fence, False))
+        self.assertAlmostEqual(distance, 1110, delta=1)
+
+    def test_create_geofence_accepts_polygons_and_rejects_invalid_outlines(self):
+        self.client.force_login(create_employee('fence-admin', is_staff=True).user)
+
+        def create(boundary):
+            return self.client.post(
+                reverse('create_geofence'), {'name': 'Site', 'boundary': boundary}, content_type='application/json',
+            )
+
+        polygon = json.loads(_square(74.3, 31.5).geojson)
+        response = create(polygon)
+        self.assertEqual(response.status_code, 201)
+        geofence = response.json()['geofence']
+        self.assertEqual(geofence['boundary']['type'], 'MultiPolygon')
+        self.assertAlmostEqual(geofence['center']['longitude'], 74.305)
+        self.assertAlmostEqual(geofence['center']['latitude'], 31.505)
+
+        pair = MultiPolygon(_square(74.3, 31.5), _square(74.4, 31.5), srid=4326)
+        response = create(pair.geojson)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json()['geofence']['boundary']['coordinates']), 2)
+
+        bowtie = {'type': 'Polygon', 'coordinates': [[[74.3, 31.5], [74.31, 31.51], [74.31, 31.5], [74.3, 31.51], [74.3, 31.5]]]}
+        for boundary in (bowtie, {'type': 'Point', 'coordinates': [74.3, 31.5]}):
+            response = create(boundary)
+            self.assertEqual(response.status_code, 400, boundary)
+            self.assertTrue(response.json()['error'].startswith('Invalid boundary'))
+        self.assertEqual(GeofenceLocation.objects.count(), 2)
+
+
+class GeofenceBundleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_fences_moved_out_of_range_are_removed(self):
+        center = Point(74.3, 31.5, srid=4326)
+        fence = GeofenceLocation.objects.create(name='Depot', location=Point(74.3, 31.5), radius=100)
+        version = bundle_version()
+        self.assertEqual([row[0] for row in build_bundle(center, 5)['fences']], [fence.id])
+
+        # A later updated_at than the version the client holds
+        GeofenceLocation.objects.filter(pk=fence.pk).update(
+            location=Point(75.3, 31.5), updated_at=timezone.now() + timedelta(seconds=10),
+        )
+        delta = build_bundle(center, 5, since=version)
+        self.assertFalse(delta['full'])
+        self.assertEqual((delta['fences'], delta['removed']), ([], [fence.id]))
+
+    @override_settings(GEOFENCE_TOMBSTONE_RETENTION_DAYS=30)
+    def test_versions_older_than_the_tombstones_get_a_full_bundle(self):
+        GeofenceLocation.objects.create(name='Yard', location=Point(74.3, 31.5), radius=100)
+        stale = int((timezone.now() - timedelta(days=31)).timestamp() * 1000)
+        self.assertTrue(build_bundle(since=stale)['full'])
+
+
+class OccupancyTests(TestCase):
+    def setUp(self):
+        self.hour = floor_time(timezone.now() - timedelta(days=1), HEATMAP_BUCKET)
+        self.fence = GeofenceLocation.objects.create(name='Plant', location=Point(74.3, 31.5), radius=200)
+        self.first, self.second = create_employee('first'), create_employee('second')
+
+    def at(self, minutes):
+        return self.hour + timedelta(minutes=minutes)
+
+    def occupancy(self):
+        return {
+            (bucket - self.hour).seconds // 60: employees
+            for bucket, employees in FenceOccupancy.objects.values_list('bucket', 'employees')
+        }
+
+    def test_visits_fill_every_bucket_they_span_and_reruns_replace_the_window(self):
+        closed = GeofenceVisit.objects.create(
+            employee=self.first, geofence_location=self.fence,
+            entered_at=self.at(5), exited_at=self.at(40), last_seen_at=self.at(38),
+        )
+        # Still open: counts up to its last fix inside the fence
+        GeofenceVisit.objects.create(
+            employee=self.second, geofence_location=self.fence, entered_at=self.at(20), last_seen_at=self.at(25),
+        )
+        rollup_occupancy(self.at(0), self.at(60))
+        self.assertEqual(self.occupancy(), {0: 1, 15: 2, 30: 1})
+
+        # Closed earlier on a later pass: the 30 minute bucket must not keep its count
+        GeofenceVisit.objects.filter(pk=closed.pk).update(exited_at=self.at(10), last_seen_at=self.at(10))
+        rollup_occupancy(self.at(0), self.at(60))
+        self.assertEqual(self.occupancy(), {0: 1, 15: 1})
+
+    def test_heatmap_counts_fixes_per_cell_and_merges_to_coarser_cells(self):
+        for employee, point in ((self.first, Point(74.3, 31.5)), (self.first, Point(74.3, 31.5)),
+                                (self.second, Point(74.4, 31.5))):
+            EmployeeLocationLog.objects.create(employee=employee, location=point, action='location_update')
+        EmployeeLocationLog.objects.update(timestamp=self.at(10))
+
+        rollup_heatmap(self.at(0), self.at(60))
+        cells = {geohash: (fixes, employees) for geohash, fixes, employees in
+                 HeatmapCell.objects.values_list('geohash', 'fixes', 'employees')}
+        self.assertEqual(sorted(cells.values()), [(1, 1), (2, 1)])
+        busiest = max(cells, key=cells.get)
+        latitude, longitude = geohash_center(busiest)
+        self.assertAlmostEqual(latitude, 31.5, delta=0.001)
+        self.assertAlmostEqual(longitude, 74.3, delta=0.001)
+
+        merged = list(heatmap(self.at(0), self.at(60), 2).values_list('cell', 'fixes_total', 'peak_employees'))
+        self.assertEqual(merged, [(busiest[:2], 3, 1)])
+
+    def test_geohash_center_of_a_known_cell(self):
+        self.assertEqual(geohash_center('ezs42'), (42.60498046875, -5.60302734375))
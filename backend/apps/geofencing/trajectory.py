@@ -0,0 +1,167 @@
+"""
+Compact storage for GPS fixes.
+
+A run of fixes (one employee, one hour) is packed into a single blob: each
+fix is stored as the difference from the previous one (milliseconds, and
+longitude/latitude in millionths of a degree, about 0.1 m), zigzag-encoded
+as varints, then zlib-compressed. Consecutive fixes of a walking or parked
+employee differ by a few units, so a fix costs a handful of bytes instead of
+the >100 bytes (plus index entries) of an ``EmployeeLocationLog`` row.
+
+The blob layout is ``version, count, then count x (dt, dlon, dlat, flags,
+geofence id)``; flags hold the action index and the within-geofence bit.
+
+For route playback, ``levels_of_detail`` simplifies a run of fixes with
+Douglas-Peucker at a tolerance of one screen pixel per Web Mercator zoom.
+"""
+import math
+import zlib
+from collections import namedtuple
+from datetime import datetime, timezone
+
+FORMAT_VERSION = 1
+COORDINATE_SCALE = 10 ** 6
+ACTIONS = ('check_in', 'check_out', 'location_update')
+
+# Web Mercator ground resolution at zoom 0 (metres per 256px-tile pixel at the equator)
+METERS_PER_PIXEL_ZOOM_0 = 156543.03
+METERS_PER_DEGREE_LATITUDE = 110540
+METERS_PER_DEGREE_LONGITUDE = 111320
+
+Fix = namedtuple('Fix', 'timestamp longitude latitude action is_within_geofence geofence_id')
+
+
+def _zigzag(value):
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value):
+    return value // 2 if not value & 1 else -(value + 1) // 2
+
+
+def _write_varint(output, value):
+    while value > 0x7f:
+        output.append(value & 0x7f | 0x80)
+        value >>= 7
+    output.append(value)
+
+
+def _read_varint(data, position):
+    value = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+def encode_fixes(fixes):
+    """Pack ``Fix`` tuples, in timestamp order, into a compressed blob"""
+    output = bytearray([FORMAT_VERSION])
+    _write_varint(output, len(fixes))
+    previous = (0, 0, 0)
+    for fix in fixes:
+        current = (
+            round(fix.timestamp.timestamp() * 1000),
+            round(fix.longitude * COORDINATE_SCALE),
+            round(fix.latitude * COORDINATE_SCALE),
+        )
+        for value, last in zip(current, previous):
+            _write_varint(output, _zigzag(value - last))
+        _write_varint(output, ACTIONS.index(fix.action) << 1 | bool(fix.is_within_geofence))
+        _write_varint(output, fix.geofence_id or 0)
+        previous = current
+    return zlib.compress(bytes(output), 9)
+
+
+def decode_fixes(blob):
+    """Unpack a blob written by ``encode_fixes`` into a list of ``Fix``"""
+    data = zlib.decompress(blob)
+    if data[0] != FORMAT_VERSION:
+        raise ValueError(f'Unknown trajectory format version {data[0]}')
+    count, position = _read_varint(data, 1)
+    fixes = []
+    time_ms = longitude = latitude = 0
+    for _ in range(count):
+        delta, position = _read_varint(data, position)
+        time_ms += _unzigzag(delta)
+        delta, position = _read_varint(data, position)
+        longitude += _unzigzag(delta)
+        delta, position = _read_varint(data, position)
+        latitude += _unzigzag(delta)
+        flags, position = _read_varint(data, position)
+        geofence_id, position = _read_varint(data, position)
+        fixes.append(Fix(
+            datetime.fromtimestamp(time_ms / 1000, tz=timezone.utc),
+            longitude / COORDINATE_SCALE,
+            latitude / COORDINATE_SCALE,
+            ACTIONS[flags >> 1],
+            bool(flags & 1),
+            geofence_id or None,
+        ))
+    return fixes
+
+
+def _project(fixes):
+    # Local equirectangular projection in metres, accurate enough over a shift
+    if not fixes:
+        return []
+    scale_x = METERS_PER_DEGREE_LONGITUDE * math.cos(math.radians(fixes[0].latitude))
+    return [(fix.longitude * scale_x, fix.latitude * METERS_PER_DEGREE_LATITUDE) for fix in fixes]
+
+
+def simplify(points, tolerance):
+    """
+    Douglas-Peucker: indices of the ``points`` ((x, y) in metres) to keep so
+    that no dropped point is further than ``tolerance`` from the path.
+    """
+    count = len(points)
+    if count < 3:
+        return list(range(count))
+    keep = [False] * count
+    keep[0] = keep[-1] = True
+    limit = tolerance * tolerance
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        ax, ay = points[first]
+        dx, dy = points[last][0] - ax, points[last][1] - ay
+        length = dx * dx + dy * dy
+        worst, worst_index = -1.0, None
+        for index in range(first + 1, last):
+            px, py = points[index][0] - ax, points[index][1] - ay
+            t = min(1.0, max(0.0, (px * dx + py * dy) / length)) if length else 0.0
+            distance = (px - t * dx) ** 2 + (py - t * dy) ** 2
+            if distance > worst:
+                worst, worst_index = distance, index
+        if worst > limit:
+            keep[worst_index] = True
+            stack.append((first, worst_index))
+            stack.append((worst_index, last))
+    return [index for index, kept in enumerate(keep) if kept]
+
+
+def zoom_tolerance(zoom, latitude, pixels=1):
+    """Metres covered by ``pixels`` screen pixels at a Web Mercator ``zoom`` level"""
+    return pixels * METERS_PER_PIXEL_ZOOM_0 * math.cos(math.radians(latitude)) / 2 ** zoom
+
+
+def levels_of_detail(fixes, zooms):
+    """
+    Simplified paths for each zoom level: ``{zoom: [Fix, ...]}``.
+
+    Levels are computed from the most detailed down, each one simplifying the
+    previous level's result, so the whole pyramid costs little more than the
+    first pass.
+    """
+    levels = {}
+    current = fixes
+    for zoom in sorted(zooms, reverse=True):
+        if current:
+            tolerance = zoom_tolerance(zoom, current[0].latitude)
+            current = [current[index] for index in simplify(_project(current), tolerance)]
+        levels[zoom] = current
+    return levels
+
@@ -6,4 +6,11 @@ urlpatterns = [
     path('', views.list_geofences, name='list_geofences'),
     path('create/', views.create_geofence, name='create_geofence'),
     path('check-location/', views.check_location, name='check_location'),
+    path('ping/', views.record_location, name='record_location'),
+    path('bundle/', views.geofence_bundle, name='geofence_bundle'),
+    path('history/<int:employee_id>/', views.location_history, name='location_history'),
+    path('route/<int:employee_id>/', views.employee_route, name='employee_route'),
+    path('visits/', views.list_visits, name='list_visits'),
+    path('occupancy/', views.fence_occupancy, name='fence_occupancy'),
+    path('heatmap/', views.location_heatmap, name='location_heatmap'),
 ]
@@ -1,16 +1,113 @@
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
-from drf_spectacular.utils import extend_schema, OpenApiResponse
-from .models import GeofenceLocation
-from django.contrib.gis.geos import Point
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
+from apps.core.async_views import api_response, async_api_view
+from apps.core.bulk import iter_rows
+from apps.core.cache import acached, cached
+from apps.core.routers import replica_reads
+from apps.core.serialization import values_rows
+from apps.employees.models import Employee
+from apps.attendance.models import AttendanceRecord
+from .models import EmployeeLocationLog, FenceOccupancy, GeofenceLocation, GeofenceVisit, LocationTrack, get_location_history, match_geofence
+from .bundle import build_bundle
+from .occupancy import HEATMAP_BUCKET, OCCUPANCY_BUCKET, floor_time, geohash_center, heatmap
+from .trajectory import levels_of_detail
+from django.contrib.gis.gdal import GDALException
+from django.contrib.gis.geos import GEOSException, GEOSGeometry, MultiPolygon, Point, Polygon
 from django.contrib.gis.measure import Distance
+from django.utils import timezone
+from django.db.models import Count, Max
+from django.utils.dateparse import parse_datetime
+from datetime import date, datetime, time, timedelta
+import json
 
 # Create your views here.
 
+GEOFENCE_LIST_FIELDS = (
+    'id', 'name', 'location_type', 'radius', 'location', 'boundary',
+    'address', 'is_active', 'created_at',
+)
+
+def _geofence_row(row):
+    location = row.location
+    return {
+        'id': row.id,
+        'name': row.name,
+        'location_type': row.location_type,
+        'radius': row.radius,
+        'center': {
+            'latitude': location.y if location else None,
+            'longitude': location.x if location else None
+        },
+        'boundary': json.loads(row.boundary.geojson) if row.boundary else None,
+        'address': row.address,
+        'is_active': row.is_active,
+        'created_at': row.created_at
+    }
+
+MAX_HISTORY_DAYS = 31
+ROUTE_ZOOM_LEVELS = (10, 12, 14, 16, 18)
+ROUTE_CACHE_TIMEOUT = 24 * 60 * 60
+
+def _history_bound(value, default):
+    if not value:
+        return default
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(value)
+    return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+
+VISIT_LIST_FIELDS = (
+    'id', 'employee_id', 'employee__employee_id', 'geofence_location_id',
+    'geofence_location__name', 'entered_at', 'exited_at', 'last_seen_at',
+    'fix_count',
+)
+
+def _parse_boundary(value):
+    """GeoJSON Polygon/MultiPolygon (dict or string) to a valid MultiPolygon"""
+    geometry = GEOSGeometry(value if isinstance(value, str) else json.dumps(value), srid=4326)
+    if isinstance(geometry, Polygon):
+        geometry = MultiPolygon(geometry, srid=4326)
+    if not isinstance(geometry, MultiPolygon):
+        raise ValueError('expected a Polygon or MultiPolygon')
+    if not geometry.valid:
+        raise ValueError(geometry.valid_reason)
+    return geometry
+
+def _visit_row(row):
+    return {
+        'id': row.id,
+        'employee_id': row.employee__employee_id,
+        'geofence_id': row.geofence_location_id,
+        'geofence_name': row.geofence_location__name,
+        'entered_at': row.entered_at,
+        'exited_at': row.exited_at,
+        'last_seen_at': row.last_seen_at,
+        'dwell_seconds': int(((row.exited_at or row.last_seen_at) - row.entered_at).total_seconds()),
+        'fix_count': row.fix_count
+    }
+
+def _route_levels(employee_id, start, end):
+    levels = levels_of_detail(get_location_history(employee_id, start, end), ROUTE_ZOOM_LEVELS)
+    return {
+        zoom: {
+            'coordinates': [[fix.longitude, fix.latitude] for fix in fixes],
+            'timestamps': [fix.timestamp for fix in fixes]
+        }
+        for zoom, fixes in levels.items()
+    }
+
+async def _active_geofences():
+    return [geofence async for geofence in GeofenceLocation.objects.filter(is_active=True)]
+
 def test_view(request):
     """Simple test view to verify URL configuration is working"""
     return JsonResponse({
@@ -36,23 +133,10 @@ def test_view(request):
 def list_geofences(request):
     """Get all geofence areas"""
     try:
-        geofences = GeofenceLocation.objects.all()
-        geofence_data = []
-        
-        for geofence in geofences:
-            geofence_data.append({
-                'id': geofence.id,
-                'name': geofence.name,
-                'location_type': geofence.location_type,
-                'radius': geofence.radius,
-                'center': {
-                    'latitude': geofence.latitude,
-                    'longitude': geofence.longitude
-                },
-                'address': geofence.address,
-                'is_active': geofence.is_active,
-                'created_at': geofence.created_at
-            })
+        geofence_data = cached(
+            GeofenceLocation, 'list',
+            lambda: values_rows(GeofenceLocation.objects.all(), GEOFENCE_LIST_FIELDS, _geofence_row)
+        )
         
         return Response({
             'geofences': geofence_data,
@@ -76,9 +160,10 @@ def list_geofences(request):
             'latitude': {'type': 'number', 'format': 'float'},
             'longitude': {'type': 'number', 'format': 'float'},
             'radius': {'type': 'integer', 'description': 'Radius in meters'},
+            'boundary': {'type': 'object', 'description': 'GeoJSON Polygon or MultiPolygon outline (longitude, latitude)'},
             'address': {'type': 'string'}
         },
-        'required': ['name', 'latitude', 'longitude', 'radius']
+        'required': ['name']
     },
     responses={
         201: OpenApiResponse(
@@ -110,18 +195,28 @@ def create_geofence(request):
         radius = data.get('radius', 100)
         address = data.get('address', '')
         
+        boundary = None
+        if data.get('boundary'):
+            try:
+                boundary = _parse_boundary(data['boundary'])
+            except (ValueError, GEOSException, GDALException) as e:
+                return Response({
+                    'error': f'Invalid boundary: {e}'
+                }, status=status.HTTP_400_BAD_REQUEST)
+        
         # Validate required fields
-        if not all([name, latitude, longitude]):
+        if not name or (boundary is None and not all([latitude, longitude])):
             return Response({
-                'error': 'Name, latitude, and longitude are required'
+                'error': 'Name and either latitude and longitude or a boundary are required'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Create geofence
+        # Create geofence; polygon fences default their centre to the centroid
         geofence = GeofenceLocation.objects.create(
             name=name,
             location_type=location_type,
-            location=Point(longitude, latitude),
+            location=Point(longitude, latitude) if latitude and longitude else boundary.centroid,
             radius=radius,
+            boundary=boundary,
             address=address,
             is_active=True
         )
@@ -137,6 +232,7 @@ def create_geofence(request):
                     'latitude': geofence.latitude,
                     'longitude': geofence.longitude
                 },
+                'boundary': json.loads(geofence.boundary.geojson) if geofence.boundary else None,
                 'address': geofence.address,
                 'is_active': geofence.is_active
             }
@@ -171,26 +267,26 @@ def create_geofence(request):
         )
     }
 )
-@api_view(['POST'])
-@permission_classes([IsAuthenticated])
-def check_location(request):
-    """Check if location is within any geofence"""
+@async_api_view(['POST'])
+async def check_location(request):
+    """Check if location is within any geofence (async, served natively under ASGI)"""
     try:
         data = request.data
         latitude = data.get('latitude')
         longitude = data.get('longitude')
         
         if not latitude or not longitude:
-            return Response({
+            return api_response({
                 'error': 'Latitude and longitude are required'
             }, status=status.HTTP_400_BAD_REQUEST)
         
         # Check if point is within any active geofence
-        geofences = GeofenceLocation.objects.filter(is_active=True)
+        point = Point(float(longitude), float(latitude))
+        geofences = await acached(GeofenceLocation, 'active', _active_geofences)
         within_geofences = []
         
         for geofence in geofences:
-            if geofence.is_within_geofence(latitude, longitude):
+            if geofence.is_point_within_geofence(point):
                 within_geofences.append({
                     'id': geofence.id,
                     'name': geofence.name,
@@ -198,7 +294,7 @@ def check_location(request):
                     'distance': 0  # Within geofence
                 })
         
-        return Response({
+        return api_response({
             'location': {
                 'latitude': latitude,
                 'longitude': longitude
@@ -207,6 +303,532 @@ def check_location(request):
             'is_within_geofence': len(within_geofences) > 0
         }, status=status.HTTP_200_OK)
         
+    except Exception as e:
+        return api_response({
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@extend_schema(
+    tags=['Geofencing'],
+    summary='Geofence Bundle',
+    description=(
+        'Get a compact, versioned bundle of the geofences around a position for on-device evaluation. '
+        'Pass the version you hold as since to receive only the fences changed after it plus the ids to '
+        'remove. Fences are [id, kind, longitude, latitude, radius(, polygon coordinates)] with kind c or p. '
+        'The body is gzip-compressed when the client accepts it.'
+    ),
+    parameters=[
+        OpenApiParameter('latitude', OpenApiTypes.DOUBLE, description='Centre of the bundle'),
+        OpenApiParameter('longitude', OpenApiTypes.DOUBLE, description='Centre of the bundle'),
+        OpenApiParameter('radius_km', OpenApiTypes.DOUBLE, description='Bundle radius (default GEOFENCE_BUNDLE_RADIUS_KM)'),
+        OpenApiParameter('since', OpenApiTypes.INT, description='Bundle version held by the client'),
+    ],
+    responses={
+        200: OpenApiResponse(
+            description='Full bundle or delta'
+        ),
+        304: OpenApiResponse(
+            description='Bundle unchanged (If-None-Match)'
+        ),
+        400: OpenApiResponse(
+            description='Invalid parameters'
+        )
+    }
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def geofence_bundle(request):
+    """Get a geofence bundle for the mobile app"""
+    try:
+        params = request.query_params
+        try:
+            center = None
+            if params.get('latitude') and params.get('longitude'):
+                center = Point(float(params['longitude']), float(params['latitude']), srid=4326)
+            radius_km = float(params.get('radius_km') or settings.GEOFENCE_BUNDLE_RADIUS_KM)
+            since = int(params.get('since') or 0)
+        except ValueError:
+            return Response({
+                'error': 'latitude, longitude and radius_km must be numbers and since an integer'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        bundle = build_bundle(center, radius_km, since)
+        etag = f'"{bundle["version"]}:{request.get_full_path()}"'
+        if request.headers.get('If-None-Match') == etag:
+            return HttpResponse(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        
+        body = json.dumps(bundle, separators=(',', ':')).encode()
+        headers = {'ETag': etag}
+        if 'gzip' in request.headers.get('Accept-Encoding', ''):
+            body = compress_string(body)
+            headers['Content-Encoding'] = 'gzip'
+        response = HttpResponse(body, content_type='application/json', headers=headers)
+        patch_vary_headers(response, ['Accept-Encoding'])
+        return response
+        
+    except Exception as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@extend_schema(
+    tags=['Geofencing'],
+    summary='Record Location',
+    description=(
+        'Record a location ping from the mobile app. Only the log row is written; geofence visits and '
+        'automatic attendance are derived from the stream in the background.'
+    ),
+    request={
+        'type': 'object',
+        'properties': {
+            'latitude': {'type': 'number', 'format': 'float'},
+            'longitude': {'type': 'number', 'format': 'float'},
+            'action': {'type': 'string'},
+            'notes': {'type': 'string'}
+        },
+        'required': ['latitude', 'longitude']
+    },
+    responses={
+        201: OpenApiResponse(
+            description='Location recorded, with the matched geofence'
+        ),
+        400: OpenApiResponse(
+            description='Invalid request data'
+        ),
+        404: OpenApiResponse(
+            description='Employee profile not found'
+        )
+    }
+)
+@async_api_view(['POST'])
+async def record_location(request):
+    """
+    Record a location ping (async, served natively under ASGI). Only the log
+    row is written here; visits and automatic attendance are derived from
+    the stream by a Celery batch task.
+    """
+    try:
+        data = request.data
+        latitude = data.get('latitude')
+        longitude = data.get('longitude')
+        action = data.get('action', 'location_update')
+        
+        if latitude is None or longitude is None:
+            return api_response({
+                'error': 'Latitude and longitude are required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            location = Point(float(longitude), float(latitude))
+        except (TypeError, ValueError):
+            return api_response({
+                'error': 'Latitude and longitude must be numbers'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if action not in dict(EmployeeLocationLog.ACTION_CHOICES):
+            return api_response({
+                'error': 'Invalid action'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            employee = await Employee.objects.only('id').aget(user=request.user)
+        except Employee.DoesNotExist:
+            return api_response({
+                'error': 'Employee profile not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        geofences = await acached(GeofenceLocation, 'active', _active_geofences)
+        geofence, is_within, distance = match_geofence(location, geofences)
+        
+        # bulk_create skips EmployeeLocationLog.save(), which would query the
+        # geofences again
+        await EmployeeLocationLog.objects.abulk_create([EmployeeLocationLog(
+            employee=employee,
+            geofence_location=geofence,
+            location=location,
+            action=action,
+            is_within_geofence=is_within,
+            distance_from_geofence=distance,
+            notes=data.get('notes', '')
+        )])
+        
+        return api_response({
+            'message': 'Location recorded',
+            'is_within_geofence': is_within,
+            'geofence': {
+                'id': geofence.id,
+                'name': geofence.name,
+                'distance': distance
+            } if geofence else None
+        }, status=status.HTTP_201_CREATED)
+        
+    except Exception as e:
+        return api_response({
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@extend_schema(
+    tags=['Geofencing'],
+    summary='Location History',
+    description=(
+        'Get the GPS fixes recorded for an employee between start and end (default: the last 24 hours), '
+        f'decoded from packed location tracks. At most {MAX_HISTORY_DAYS} days per request.'
+    ),
+    parameters=[
+        OpenApiParameter('start', OpenApiTypes.DATETIME, description='Start of the window (ISO 8601)'),
+        OpenApiParameter('end', OpenApiTypes.DATETIME, description='End of the window (ISO 8601)'),
+    ],
+    responses={
+        200: OpenApiResponse(
+            description='Location fixes in time order'
+        ),
+        400: OpenApiResponse(
+            description='Invalid time window'
+        ),
+        403: OpenApiResponse(
+            description='Not allowed to view this employee'
+        )
+    }
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@replica_reads
+def location_history(request, employee_id):
+    """Get an employee's location history"""
+    try:
+        if not request.user.is_staff and not Employee.objects.filter(id=employee_id, user=request.user).exists():
+            return Response({
+                'error': 'You can only view your own location history'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        try:
+            end = _history_bound(request.query_params.get('end'), timezone.now())
+            start = _history_bound(request.query_params.get('start'), end - timedelta(days=1))
+        except ValueError:
+            return Response({
+                'error': 'start and end must be ISO 8601 datetimes'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if not start <= end <= start + timedelta(days=MAX_HISTORY_DAYS):
+            return Response({
+                'error': f'start must be before end and at most {MAX_HISTORY_DAYS} days apart'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        fixes = get_location_history(employee_id, start, end)
+        
+        return Response({
+            'employee_id': employee_id,
+            'start': start,
+            'end': end,
+            'points': [
+                {
+                    'timestamp': fix.timestamp,
+                    'latitude': fix.latitude,
+                    'longitude': fix.longitude,
+                    'action': fix.action,
+                    'is_within_geofence': fix.is_within_geofence,
+                    'geofence_id': fix.geofence_id
+                }
+                for fix in fixes
+            ],
+            'count': len(fixes)
+        }, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@extend_schema(
+    tags=['Geofencing'],
+    summary='Route Playback',
+    description=(
+        "Get an employee's simplified route for one shift (the attendance check-in to check-out, or the "
+        'whole day without one). Points are thinned with Douglas-Peucker at one screen pixel for the '
+        f'requested zoom, snapped to the nearest precomputed level {ROUTE_ZOOM_LEVELS}.'
+    ),
+    parameters=[
+        OpenApiParameter('date', OpenApiTypes.DATE, description='Shift date (default: today)'),
+        OpenApiParameter('zoom', OpenApiTypes.INT, description='Map zoom level (default: 14)'),
+    ],
+    responses={
+        200: OpenApiResponse(
+            description='Simplified route as a GeoJSON LineString plus per-point timestamps'
+        ),
+        400: OpenApiResponse(
+            description='Invalid date or zoom'
+        ),
+        403: OpenApiResponse(
+            description='Not allowed to view this employee'
+        )
+    }
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@replica_reads
+def employee_route(request, employee_id):
+    """Get a simplified route for route playback"""
+    try:
+        if not request.user.is_staff and not Employee.objects.filter(id=employee_id, user=request.user).exists():
+            return Response({
+                'error': 'You can only view your own route'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        try:
+            day = date.fromisoformat(request.query_params.get('date') or timezone.localdate().isoformat())
+            zoom = int(request.query_params.get('zoom', 14))
+        except ValueError:
+            return Response({
+                'error': 'date must be YYYY-MM-DD and zoom an integer'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Snap to the closest precomputed level at or below the requested zoom
+        level = max([z for z in ROUTE_ZOOM_LEVELS if z <= zoom] or [min(ROUTE_ZOOM_LEVELS)])
+        
+        shift = AttendanceRecord.objects.filter(
+            employee_id=employee_id, date=day
+        ).values('check_in_time', 'check_out_time').first()
+        day_start = timezone.make_aware(datetime.combine(day, time.min))
+        start = (shift and shift['check_in_time']) or day_start
+        end = (shift and shift['check_out_time']) or min(day_start + timedelta(days=1), timezone.now())
+        
+        if end < timezone.now() - timedelta(hours=1):
+            # Finished shifts rarely change, keep every level of detail for
+            # them. pack_location_history bumps LocationTrack; fixes synced
+            # late change the window's raw log count and latest id
+            raw = EmployeeLocationLog.objects.filter(
+                employee_id=employee_id, timestamp__range=(start, end)
+            ).aggregate(count=Count('id'), last=Max('id'))
+            levels = cached(
+                LocationTrack,
+                f"route:{employee_id}:{start.isoformat()}:{end.isoformat()}:{raw['count']}:{raw['last']}",
+                lambda: _route_levels(employee_id, start, end), ROUTE_CACHE_TIMEOUT
+            )
+        else:
+            levels = _route_levels(employee_id, start, end)
+        route = levels[level]
+        
+        return Response({
+            'employee_id': employee_id,
+            'date': day,
+            'start': start,
+            'end': end,
+            'zoom': level,
+            'path': {
+                'type': 'LineString',
+                'coordinates': route['coordinates']
+            },
+            'timestamps': route['timestamps'],
+            'count': len(route['timestamps'])
+        }, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@extend_schema(
+    tags=['Geofencing'],
+    summary='List Geofence Visits',
+    description=(
+        'Get geofence visits (enter/exit with dwell time) overlapping a time window, default the last 24 hours. '
+        'Admins see every employee, or one with ?employee=<id>; employees see their own.'
+    ),
+    parameters=[
+        OpenApiParameter('start', OpenApiTypes.DATETIME, description='Start of the window (ISO 8601)'),
+        OpenApiParameter('end', OpenApiTypes.DATETIME, description='End of the window (ISO 8601)'),
+        OpenApiParameter('employee', OpenApiTypes.INT, description='Employee id (admin only)'),
+    ],
+    responses={
+        200: OpenApiResponse(
+            description='List of visits, most recent first'
+        ),
+        400: OpenApiResponse(
+            description='Invalid time window'
+        )
+    }
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@replica_reads
+def list_visits(request):
+    """Get geofence visits"""
+    try:
+        try:
+            end = _history_bound(request.query_params.get('end'), timezone.now())
+            start = _history_bound(request.query_params.get('start'), end - timedelta(days=1))
+        except ValueError:
+            return Response({
+                'error': 'start and end must be ISO 8601 datetimes'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        visits = GeofenceVisit.objects.filter(entered_at__lte=end).exclude(exited_at__lt=start)
+        if not request.user.is_staff:
+            visits = visits.filter(employee__user=request.user)
+        elif request.query_params.get('employee', '').isdigit():
+            visits = visits.filter(employee_id=request.query_params['employee'])
+        
+        visit_data = values_rows(visits, VISIT_LIST_FIELDS, _visit_row)
+        
+        return Response({
+            'visits': visit_data,
+            'count': len(visit_data)
+        }, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@extend_schema(
+    tags=['Geofencing'],
+    summary='Geofence Occupancy',
+    description=(
+        'Admin only. Distinct employees inside each geofence per 15 minute bucket over a time window '
+        '(default the last 24 hours, at most 31 days), from the occupancy roll-up. '
+        'Filter to one geofence with ?geofence=<id>.'
+    ),
+    parameters=[
+        OpenApiParameter('start', OpenApiTypes.DATETIME, description='Start of the window (ISO 8601)'),
+        OpenApiParameter('end', OpenApiTypes.DATETIME, description='End of the window (ISO 8601)'),
+        OpenApiParameter('geofence', OpenApiTypes.INT, description='Geofence id'),
+    ],
+    responses={
+        200: OpenApiResponse(
+            description='Occupancy series per geofence'
+        ),
+        400: OpenApiResponse(
+            description='Invalid time window'
+        ),
+        403: OpenApiResponse(
+            description='Not an administrator'
+        )
+    }
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@replica_reads
+def fence_occupancy(request):
+    """Get geofence occupancy over time"""
+    try:
+        if not request.user.is_staff:
+            return Response({
+                'error': 'Only administrators can view occupancy'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        try:
+            end = _history_bound(request.query_params.get('end'), timezone.now())
+            start = _history_bound(request.query_params.get('start'), end - timedelta(days=1))
+        except ValueError:
+            return Response({
+                'error': 'start and end must be ISO 8601 datetimes'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if not start <= end <= start + timedelta(days=MAX_HISTORY_DAYS):
+            return Response({
+                'error': f'start must be before end and at most {MAX_HISTORY_DAYS} days apart'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        buckets = FenceOccupancy.objects.filter(bucket__gte=start, bucket__lt=end)
+        if request.query_params.get('geofence', '').isdigit():
+            buckets = buckets.filter(geofence_location_id=request.query_params['geofence'])
+        
+        series = {}
+        for row in iter_rows(
+            buckets.order_by('geofence_location_id', 'bucket'),
+            ('geofence_location_id', 'geofence_location__name', 'bucket', 'employees'),
+        ):
+            fence = series.setdefault(row.geofence_location_id, {
+                'geofence_id': row.geofence_location_id,
+                'geofence_name': row.geofence_location__name,
+                'peak_employees': 0,
+                'buckets': []
+            })
+            fence['peak_employees'] = max(fence['peak_employees'], row.employees)
+            fence['buckets'].append({'bucket': row.bucket, 'employees': row.employees})
+        
+        return Response({
+            'bucket_minutes': int(OCCUPANCY_BUCKET.total_seconds() // 60),
+            'geofences': list(series.values()),
+            'count': len(series)
+        }, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@extend_schema(
+    tags=['Geofencing'],
+    summary='Location Heatmap',
+    description=(
+        'Admin only. Location fixes per geohash cell over a time window (default the last 24 hours, '
+        'at most 31 days), from the hourly heatmap roll-up. ?precision=1..7 merges cells into coarser '
+        'geohashes (7 = ~150 m, 6 = ~1 km, 5 = ~5 km).'
+    ),
+    parameters=[
+        OpenApiParameter('start', OpenApiTypes.DATETIME, description='Start of the window (ISO 8601)'),
+        OpenApiParameter('end', OpenApiTypes.DATETIME, description='End of the window (ISO 8601)'),
+        OpenApiParameter('precision', OpenApiTypes.INT, description='Geohash length of the cells'),
+    ],
+    responses={
+        200: OpenApiResponse(
+            description='Heatmap cells with their centre, fix count and peak hourly employees'
+        ),
+        400: OpenApiResponse(
+            description='Invalid time window or precision'
+        ),
+        403: OpenApiResponse(
+            description='Not an administrator'
+        )
+    }
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@replica_reads
+def location_heatmap(request):
+    """Get a location heatmap"""
+    try:
+        if not request.user.is_staff:
+            return Response({
+                'error': 'Only administrators can view heatmaps'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        try:
+            end = _history_bound(request.query_params.get('end'), timezone.now())
+            start = _history_bound(request.query_params.get('start'), end - timedelta(days=1))
+        except ValueError:
+            return Response({
+                'error': 'start and end must be ISO 8601 datetimes'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if not start <= end <= start + timedelta(days=MAX_HISTORY_DAYS):
+            return Response({
+                'error': f'start must be before end and at most {MAX_HISTORY_DAYS} days apart'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        precision = request.query_params.get('precision', str(settings.HEATMAP_GEOHASH_PRECISION))
+        if not precision.isdigit() or not 1 <= int(precision) <= settings.HEATMAP_GEOHASH_PRECISION:
+            return Response({
+                'error': f'precision must be between 1 and {settings.HEATMAP_GEOHASH_PRECISION}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Hourly buckets overlapping the window
+        cells = []
+        for row in heatmap(floor_time(start, HEATMAP_BUCKET), end, int(precision)):
+            latitude, longitude = geohash_center(row['cell'])
+            cells.append({
+                'geohash': row['cell'],
+                'latitude': latitude,
+                'longitude': longitude,
+                'fixes': row['fixes_total'],
+                'peak_employees': row['peak_employees']
+            })
+        
+        return Response({
+            'precision': int(precision),
+            'cells': cells,
+            'count': len(cells)
+        }, status=status.HTTP_200_OK)
+        
     except Exception as e:
         return Response({
             'error': str(e)
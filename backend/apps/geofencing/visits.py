@@ -0,0 +1,171 @@
+"""
+Streaming geofence enter/exit detection.
+
+``VisitDetector`` consumes location fixes in arrival order and keeps each
+employee's last known fence state, so every fix costs one dict lookup and a
+comparison; history is never rescanned. Entering a fence opens a
+``GeofenceVisit``, further fixes in it extend the visit, and leaving closes
+it once the employee has been outside for ``GEOFENCE_EXIT_GRACE_SECONDS``
+(so GPS jitter along the boundary does not split a stay). Fixes older than
+the employee's last processed fix are ignored.
+
+Between batches the state lives in the cache (Redis in production). It is
+tagged with the stream position it was written at; state from a batch whose
+transaction rolled back, or state missing from the cache, is rebuilt from
+the open visits in the database.
+"""
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from apps.core.bulk import iter_rows
+
+from .models import EmployeeLocationLog, GeofenceVisit, LocationStreamCursor
+
+STREAM_NAME = 'visits'
+DEFAULT_BATCH_SIZE = 5000
+
+FenceEvent = namedtuple('FenceEvent', 'kind employee_id geofence_id timestamp visit')
+
+# EmployeeLocationLog columns the detector reads
+STREAM_FIELDS = ('id', 'employee_id', 'timestamp', 'geofence_location_id', 'is_within_geofence')
+
+
+def _state_key(employee_id):
+    return f'fencestate:{employee_id}'
+
+
+class _State:
+    __slots__ = ('last_fix', 'outside_since', 'visit')
+
+    def __init__(self, last_fix=None, outside_since=None, visit=None):
+        self.last_fix = last_fix
+        self.outside_since = outside_since
+        self.visit = visit
+
+
+class VisitDetector:
+    def __init__(self, exit_grace=None):
+        if exit_grace is None:
+            exit_grace = settings.GEOFENCE_EXIT_GRACE_SECONDS
+        self.exit_grace = timedelta(seconds=exit_grace)
+        self.states = {}
+        self.created = []
+        self.changed = {}
+        self.events = []
+
+    def load(self, employee_ids, position=0):
+        """Fetch the state of ``employee_ids`` written at or before stream ``position``"""
+        missing = [employee_id for employee_id in employee_ids if employee_id not in self.states]
+        stored = cache.get_many([_state_key(employee_id) for employee_id in missing])
+        rebuild = []
+        for employee_id in missing:
+            value = stored.get(_state_key(employee_id))
+            if value is None or value['position'] > position:
+                rebuild.append(employee_id)
+                continue
+            visit = None
+            if value['visit']:
+                visit_id, geofence_id, entered_at, last_seen_at, fix_count = value['visit']
+                visit = GeofenceVisit(
+                    id=visit_id, employee_id=employee_id, geofence_location_id=geofence_id,
+                    entered_at=entered_at, last_seen_at=last_seen_at, fix_count=fix_count,
+                )
+            self.states[employee_id] = _State(value['last_fix'], value['outside_since'], visit)
+
+        for employee_id in rebuild:
+            self.states[employee_id] = _State()
+        if rebuild:
+            for visit in GeofenceVisit.objects.filter(employee_id__in=rebuild, exited_at__isnull=True):
+                self.states[visit.employee_id] = _State(last_fix=visit.last_seen_at, visit=visit)
+
+    def feed(self, employee_id, timestamp, geofence_id):
+        """Process one fix; ``geofence_id`` is the fence it falls in, or None"""
+        state = self.states[employee_id]
+        if state.last_fix is not None and timestamp <= state.last_fix:
+            return
+        state.last_fix = timestamp
+        visit = state.visit
+
+        if visit is not None:
+            if geofence_id == visit.geofence_location_id:
+                visit.last_seen_at = timestamp
+                visit.fix_count += 1
+                state.outside_since = None
+                self._touch(visit)
+                return
+            if geofence_id is None:
+                if state.outside_since is None:
+                    state.outside_since = timestamp
+                if timestamp - state.outside_since < self.exit_grace:
+                    return
+                visit.exited_at = state.outside_since
+            else:
+                visit.exited_at = state.outside_since or timestamp
+            self._touch(visit)
+            self.events.append(FenceEvent('exit', employee_id, visit.geofence_location_id, visit.exited_at, visit))
+            state.visit = None
+            state.outside_since = None
+
+        if geofence_id is not None:
+            visit = GeofenceVisit(
+                employee_id=employee_id, geofence_location_id=geofence_id,
+                entered_at=timestamp, last_seen_at=timestamp, fix_count=1,
+            )
+            self.created.append(visit)
+            state.visit = visit
+            self.events.append(FenceEvent('enter', employee_id, geofence_id, timestamp, visit))
+
+    def _touch(self, visit):
+        if visit.pk is not None:
+            self.changed[visit.pk] = visit
+
+    def flush(self, position):
+        """Write new and changed visits and the fence state as of stream ``position``"""
+        GeofenceVisit.objects.bulk_create(self.created)
+        GeofenceVisit.objects.bulk_update(self.changed.values(), ['exited_at', 'last_seen_at', 'fix_count'])
+        self.created = []
+        self.changed = {}
+        cache.set_many({
+            _state_key(employee_id): {
+                'position': position,
+                'last_fix': state.last_fix,
+                'outside_since': state.outside_since,
+                'visit': state.visit and (
+                    state.visit.pk, state.visit.geofence_location_id, state.visit.entered_at,
+                    state.visit.last_seen_at, state.visit.fix_count,
+                ),
+            }
+            for employee_id, state in self.states.items()
+        }, timeout=None)
+
+
+def process_location_stream(batch_size=DEFAULT_BATCH_SIZE, handle_events=None):
+    """
+    Feed the next ``batch_size`` location logs (in arrival order) through a
+    ``VisitDetector``; returns the enter/exit events. Concurrent callers are
+    serialised on the stream cursor row. ``handle_events(events)`` runs in
+    the transaction that advances the cursor, so whatever it writes (e.g.
+    automatic check-ins) commits or rolls back with the batch.
+    """
+    with transaction.atomic():
+        cursor, _ = LocationStreamCursor.objects.select_for_update().get_or_create(name=STREAM_NAME)
+        logs = EmployeeLocationLog.objects.filter(id__gt=cursor.last_log_id).order_by('id')[:batch_size]
+        rows = list(iter_rows(logs, STREAM_FIELDS, chunk_size=batch_size))
+        if not rows:
+            return []
+
+        detector = VisitDetector()
+        detector.load({row.employee_id for row in rows}, position=cursor.last_log_id)
+        for row in rows:
+            detector.feed(row.employee_id, row.timestamp, row.geofence_location_id if row.is_within_geofence else None)
+
+        cursor.last_log_id = rows[-1].id
+        detector.flush(cursor.last_log_id)
+        if handle_events is not None and detector.events:
+            handle_events(detector.events)
+        cursor.save(update_fields=['last_log_id', 'updated_at'])
+    return detector.events
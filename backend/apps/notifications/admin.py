@@ -1,3 +1,16 @@
 from django.contrib import admin
+from apps.core.changelists import LargeTableAdmin
+from .models import Notification
 
 # Register your models here.
+
+@admin.register(Notification)
+class NotificationAdmin(LargeTableAdmin):
+    list_display = ['title', 'recipient', 'priority', 'status', 'is_read', 'created_at']
+    list_filter = ['status', 'priority', 'is_read']
+    list_select_related = ['recipient']
+    # title is matched through the notification_title_trgm index
+    search_fields = ['title', 'recipient__username', 'recipient__first_name', 'recipient__last_name']
+    raw_id_fields = ['recipient', 'sender', 'template']
+    date_hierarchy = 'created_at'
+    readonly_fields = ['read_at', 'sent_at', 'delivered_at', 'created_at', 'updated_at']
@@ -1,5 +1,7 @@
 from django.db import models
+from django.db.models.functions import Upper
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from apps.employees.models import Employee
 
 # Create your models here.
@@ -76,6 +78,12 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # A user's (unread) notifications, newest first
+            models.Index(fields=['recipient', 'is_read', '-created_at'], name='notification_inbox_idx'),
+            # Trigram index for the admin's title search (UPPER(title) LIKE '%...%')
+            GinIndex(OpClass(Upper('title'), name='gin_trgm_ops'), name='notification_title_trgm'),
+        ]
 
 class NotificationPreference(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -0,0 +1,40 @@
+from celery import shared_task
+
+from apps.core.bulk import iter_rows
+
+from .models import Notification
+
+LEAVE_DECISION_FIELDS = (
+    'id', 'status', 'approved_by_id', 'employee__user_id', 'leave_type__name',
+    'start_date', 'end_date', 'rejection_reason',
+)
+
+
+def _leave_decision(row):
+    message = f"Your {row.leave_type__name} leave from {row.start_date} to {row.end_date} was {row.status}."
+    if row.status == 'rejected' and row.rejection_reason:
+        message = f"{message} Reason: {row.rejection_reason}"
+    return Notification(
+        recipient_id=row.employee__user_id,
+        sender_id=row.approved_by_id,
+        title=f"Leave {row.status}",
+        message=message,
+        priority='high' if row.status == 'rejected' else 'medium',
+        metadata={'type': 'leave', 'leave_request_id': row.id, 'status': row.status},
+    )
+
+
+@shared_task(time_limit=60, soft_time_limit=50)
+def send_leave_decisions(leave_request_ids):
+    """
+    Notify employees of approved or rejected leave requests. A whole batch of
+    decisions is one job: one read and one multi-row INSERT.
+    """
+    from apps.attendance.models import LeaveRequest
+
+    decided = LeaveRequest.objects.filter(id__in=leave_request_ids, status__in=('approved', 'rejected'))
+    notifications = Notification.objects.bulk_create(
+        [_leave_decision(row) for row in iter_rows(decided, LEAVE_DECISION_FIELDS)],
+        batch_size=1000,
+    )
+    return len(notifications)
@@ -1,3 +1,49 @@
+from datetime import date
+
 from django.test import TestCase
 
-# Create your tests here.
+from apps.attendance.models import LeaveRequest, LeaveType
+from apps.core.testing import create_employee
+
+from .models import Notification
+from .tasks import send_leave_decisions
+
+
+class LeaveDecisionNotificationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = create_employee('notifying-manager', is_staff=True).user
+        cls.employee = create_employee('notified')
+        cls.leave_type = LeaveType.objects.create(name='Annual', days_allowed=10)
+
+    def request(self, start_date, **fields):
+        return LeaveRequest.objects.create(
+            employee=self.employee, leave_type=self.leave_type, reason='time off',
+            start_date=start_date, end_date=start_date, **fields,
+        )
+
+    def test_one_notification_per_decided_request(self):
+        approved = self.request(date(2026, 3, 2), status='approved', approved_by=self.manager)
+        rejected = self.request(
+            date(2026, 3, 9), status='rejected', approved_by=self.manager, rejection_reason='Audit week',
+        )
+        pending = self.request(date(2026, 3, 16))
+
+        self.assertEqual(send_leave_decisions([approved.id, rejected.id, pending.id]), 2)
+
+        notifications = {
+            notification.metadata['leave_request_id']: notification for notification in Notification.objects.all()
+        }
+        self.assertEqual(set(notifications), {approved.id, rejected.id})
+        for leave, priority in ((approved, 'medium'), (rejected, 'high')):
+            notification = notifications[leave.id]
+            self.assertEqual((notification.recipient, notification.sender), (self.employee.user, self.manager))
+            self.assertEqual(notification.title, f'Leave {leave.status}')
+            self.assertEqual(notification.priority, priority)
+            self.assertEqual(
+                notification.metadata, {'type': 'leave', 'leave_request_id': leave.id, 'status': leave.status},
+            )
+        self.assertEqual(
+            notifications[rejected.id].message,
+            'Your Annual leave from 2026-03-09 to 2026-03-09 was rejected. Reason: Audit week',
+        )
@@ -5,11 +5,18 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from drf_spectacular.utils import extend_schema, OpenApiResponse
+from apps.core.async_views import api_response, async_api_view
+from apps.core.bulk import aiter_rows
 from .models import Notification
 from django.contrib.auth.models import User
 
 # Create your views here.
 
+NOTIFICATION_LIST_FIELDS = (
+    'id', 'title', 'message', 'metadata', 'template__notification_type',
+    'priority', 'is_read', 'created_at', 'read_at',
+)
+
 def test_view(request):
     """Simple test view to verify URL configuration is working"""
     return JsonResponse({
@@ -30,35 +37,37 @@ def test_view(request):
         )
     }
 )
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def list_notifications(request):
-    """Get user notifications"""
+@async_api_view(['GET'])
+async def list_notifications(request):
+    """Get user notifications (async, served natively under ASGI)"""
     try:
         notifications = Notification.objects.filter(
-            user=request.user
+            recipient=request.user
         ).order_by('-created_at')
         
         notification_data = []
-        for notification in notifications:
+        unread_count = 0
+        async for notification in aiter_rows(notifications, NOTIFICATION_LIST_FIELDS):
+            unread_count += not notification.is_read
             notification_data.append({
                 'id': notification.id,
                 'title': notification.title,
                 'message': notification.message,
-                'type': notification.type,
+                'type': notification.metadata.get('type') or notification.template__notification_type,
+                'priority': notification.priority,
                 'is_read': notification.is_read,
                 'created_at': notification.created_at,
                 'read_at': notification.read_at
             })
         
-        return Response({
+        return api_response({
             'notifications': notification_data,
             'count': len(notification_data),
-            'unread_count': notifications.filter(is_read=False).count()
+            'unread_count': unread_count
         }, status=status.HTTP_200_OK)
         
     except Exception as e:
-        return Response({
+        return api_response({
             'error': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -78,33 +87,35 @@ def list_notifications(request):
         )
     }
 )
-@api_view(['POST'])
-@permission_classes([IsAuthenticated])
-def mark_as_read(request, notification_id):
-    """Mark notification as read"""
+@async_api_view(['POST'])
+async def mark_as_read(request, notification_id):
+    """Mark notification as read (async, served natively under ASGI)"""
     try:
-        notification = Notification.objects.get(
+        from django.utils import timezone
+        
+        notifications = Notification.objects.filter(
             id=notification_id,
-            user=request.user
+            recipient=request.user
         )
         
-        if not notification.is_read:
-            notification.is_read = True
-            from django.utils import timezone
-            notification.read_at = timezone.now()
-            notification.save()
+        if not await notifications.aexists():
+            return api_response({
+                'error': 'Notification not found'
+            }, status=status.HTTP_404_NOT_FOUND)
         
-        return Response({
+        await notifications.filter(is_read=False).aupdate(
+            is_read=True,
+            read_at=timezone.now(),
+            status='read'
+        )
+        
+        return api_response({
             'message': 'Notification marked as read',
-            'notification_id': notification.id
+            'notification_id': notification_id
         }, status=status.HTTP_200_OK)
         
-    except Notification.DoesNotExist:
-        return Response({
-            'error': 'Notification not found'
-        }, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
-        return Response({
+        return api_response({
             'error': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -121,27 +132,27 @@ def mark_as_read(request, notification_id):
         )
     }
 )
-@api_view(['POST'])
-@permission_classes([IsAuthenticated])
-def mark_all_as_read(request):
-    """Mark all notifications as read"""
+@async_api_view(['POST'])
+async def mark_all_as_read(request):
+    """Mark all notifications as read (async, served natively under ASGI)"""
     try:
         from django.utils import timezone
         
-        updated_count = Notification.objects.filter(
-            user=request.user,
+        updated_count = await Notification.objects.filter(
+            recipient=request.user,
             is_read=False
-        ).update(
+        ).aupdate(
             is_read=True,
-            read_at=timezone.now()
+            read_at=timezone.now(),
+            status='read'
         )
         
-        return Response({
+        return api_response({
             'message': f'{updated_count} notifications marked as read'
         }, status=status.HTTP_200_OK)
         
     except Exception as e:
-        return Response({
+        return api_response({
             'error': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -206,10 +217,11 @@ def create_notification(request):
         
         # Create notification
         notification = Notification.objects.create(
-            user=user,
+            recipient=user,
+            sender=request.user,
             title=title,
             message=message,
-            type=notification_type
+            metadata={'type': notification_type}
         )
         
         return Response({
@@ -218,7 +230,7 @@ def create_notification(request):
                 'id': notification.id,
                 'title': notification.title,
                 'message': notification.message,
-                'type': notification.type,
+                'type': notification_type,
                 'user': user.username
             }
         }, status=status.HTTP_201_CREATED)
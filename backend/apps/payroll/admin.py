@@ -1,3 +1,15 @@
 from django.contrib import admin
+from apps.core.changelists import LargeTableAdmin
+from .models import Payslip
 
 # Register your models here.
+
+@admin.register(Payslip)
+class PayslipAdmin(LargeTableAdmin):
+    list_display = ['employee', 'payroll_period', 'gross_salary', 'total_deductions', 'net_salary', 'status', 'payment_date']
+    list_filter = ['status', 'payroll_period']
+    list_select_related = ['employee__user', 'payroll_period']
+    search_fields = ['employee__user__first_name', 'employee__user__last_name', 'employee__employee_id']
+    raw_id_fields = ['employee']
+    date_hierarchy = 'payroll_period__start_date'
+    readonly_fields = ['gross_salary', 'total_deductions', 'net_salary', 'created_at', 'updated_at']
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class PayrollConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.payroll'
+
+    def ready(self):
+        from apps.core.cache import register_cache_invalidation
+        from .models import PayrollPeriod, Payslip, SalaryComponent
+        register_cache_invalidation(PayrollPeriod, Payslip, SalaryComponent)
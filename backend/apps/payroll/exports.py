@@ -0,0 +1,65 @@
+from apps.core.bulk import iter_rows
+from apps.core.serialization import display_name
+from .models import Payslip, PayslipComponent
+
+EXPORT_CHUNK_SIZE = 5000
+
+PAYSLIP_COLUMNS = [
+    ('id', 'int'),
+    ('employee_id', 'str'),
+    ('employee_name', 'str'),
+    ('payroll_period', 'str'),
+    ('period_start', 'date'),
+    ('period_end', 'date'),
+    ('gross_salary', 'decimal'),
+    ('total_deductions', 'decimal'),
+    ('net_salary', 'decimal'),
+    ('working_days', 'int'),
+    ('present_days', 'int'),
+    ('overtime_hours', 'decimal'),
+    ('overtime_amount', 'decimal'),
+    ('status', 'str'),
+    ('payment_date', 'date'),
+]
+
+PAYSLIP_COMPONENT_COLUMNS = [
+    ('payslip_id', 'int'),
+    ('employee_id', 'str'),
+    ('payroll_period', 'str'),
+    ('component', 'str'),
+    ('component_type', 'str'),
+    ('amount', 'decimal'),
+    ('is_taxable', 'bool'),
+]
+
+
+def payslip_rows(period_id=None, using=None):
+    """Payslip export rows, optionally for one payroll period, streamed from the ``using`` DB"""
+    payslips = Payslip.objects.using(using).order_by('payroll_period_id', 'id')
+    if period_id:
+        payslips = payslips.filter(payroll_period_id=period_id)
+
+    fields = (
+        'id', 'employee__employee_id', 'employee__user__first_name',
+        'employee__user__last_name', 'employee__user__username',
+        'payroll_period__name', 'payroll_period__start_date',
+        'payroll_period__end_date', 'gross_salary', 'total_deductions',
+        'net_salary', 'working_days', 'present_days', 'overtime_hours',
+        'overtime_amount', 'status', 'payment_date',
+    )
+    for row in iter_rows(payslips, fields, chunk_size=EXPORT_CHUNK_SIZE):
+        yield row[:2] + (display_name(*row[2:5]),) + row[5:]
+
+
+def payslip_component_rows(period_id=None, using=None):
+    """Payslip component export rows, optionally for one payroll period"""
+    components = PayslipComponent.objects.using(using).order_by('payslip_id', 'id')
+    if period_id:
+        components = components.filter(payslip__payroll_period_id=period_id)
+
+    fields = (
+        'payslip_id', 'payslip__employee__employee_id', 'payslip__payroll_period__name',
+        'salary_component__name', 'salary_component__component_type', 'amount',
+        'is_taxable',
+    )
+    return iter_rows(components, fields, chunk_size=EXPORT_CHUNK_SIZE)
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.exports import write_export
+from apps.payroll.exports import (
+    PAYSLIP_COLUMNS, PAYSLIP_COMPONENT_COLUMNS, payslip_component_rows, payslip_rows,
+)
+
+
+class Command(BaseCommand):
+    help = 'Export payslips (or their components) to CSV or Parquet with a server-side cursor (constant memory).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--period', type=int, help='Payroll period id')
+        parser.add_argument('--components', action='store_true', help='Export payslip components instead of payslips')
+        parser.add_argument('--format', choices=['csv', 'parquet'], default='csv')
+        parser.add_argument('--output', required=True, help='File to write')
+        parser.add_argument('--database', help='Database alias to read from, e.g. replica1 (default: default)')
+
+    def handle(self, *args, **options):
+        if options['components']:
+            columns, rows, label = PAYSLIP_COMPONENT_COLUMNS, payslip_component_rows(options['period'], using=options['database']), 'payslip components'
+        else:
+            columns, rows, label = PAYSLIP_COLUMNS, payslip_rows(options['period'], using=options['database']), 'payslips'
+        try:
+            count = write_export(options['output'], options['format'], columns, rows)
+        except RuntimeError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"{count} {label} written to {options['output']}"))
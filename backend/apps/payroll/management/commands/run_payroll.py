@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.payroll.models import PayrollPeriod
+from apps.payroll.tasks import RUN_BATCH_SIZE, run_payroll
+
+
+class Command(BaseCommand):
+    help = (
+        'Create or recalculate the draft payslips of a payroll period. Queues run_payroll on the batch '
+        'worker unless --now is given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('period', type=int, help='Payroll period id')
+        parser.add_argument('--batch-size', type=int, default=RUN_BATCH_SIZE, help='Employees per transaction')
+        parser.add_argument('--now', action='store_true', help='Run in this process instead of queueing the task')
+
+    def handle(self, *args, **options):
+        if not PayrollPeriod.objects.filter(pk=options['period']).exists():
+            raise CommandError(f"Payroll period {options['period']} does not exist")
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        if options['now']:
+            result = run_payroll(options['period'], options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"Calculated {result['payslips']} payslips"))
+        else:
+            task = run_payroll.delay(options['period'], options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Queued payroll run {task.id}'))
@@ -0,0 +1,23 @@
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('employees', '0001_initial'),
+        ('payroll', '0001_initial'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='employeesalarystructure',
+            index=models.Index(fields=['employee', 'is_active', 'effective_from'], name='salary_structure_active_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='payslip',
+            index=models.Index(fields=['employee', 'status', 'payroll_period'], name='payslip_employee_status_idx'),
+        ),
+    ]
@@ -51,6 +51,11 @@ class SalaryComponent(models.Model):
     class Meta:
         ordering = ['component_type', 'name']
 
+def get_salary_components():
+    """All salary components keyed by id, served from cache"""
+    from apps.core.cache import cached
+    return cached(SalaryComponent, 'by_id', lambda: {c.id: c for c in SalaryComponent.objects.all()})
+
 class EmployeeSalaryStructure(models.Model):
     employee = models.ForeignKey(Employee, on_delete=models.CASCADE)
     salary_component = models.ForeignKey(SalaryComponent, on_delete=models.CASCADE)
@@ -73,6 +78,20 @@ class EmployeeSalaryStructure(models.Model):
 
     class Meta:
         ordering = ['employee', 'salary_component']
+        indexes = [
+            # Active structure lookup in Payslip.calculate_salary
+            models.Index(fields=['employee', 'is_active', 'effective_from'], name='salary_structure_active_idx'),
+        ]
+
+def active_salary_structures(period):
+    """Salary structure rows in effect during ``period``, of every employee"""
+    return EmployeeSalaryStructure.objects.filter(
+        is_active=True,
+        effective_from__lte=period.end_date
+    ).filter(
+        models.Q(effective_to__isnull=True) | 
+        models.Q(effective_to__gte=period.start_date)
+    )
 
 class Payslip(models.Model):
     STATUS_CHOICES = [
@@ -97,35 +116,40 @@ class Payslip(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
-    def calculate_salary(self):
-        """Calculate gross, deductions, and net salary"""
+    def calculate_salary(self, salary_structure=None):
+        """
+        Calculate gross, deductions, and net salary. ``salary_structure`` is
+        the employee's active structure rows when the caller already has them.
+        """
         basic_salary = Decimal('0')
         gross_salary = Decimal('0')
         total_deductions = Decimal('0')
 
         # Get active salary structure for this employee
-        salary_structure = EmployeeSalaryStructure.objects.filter(
-            employee=self.employee,
-            is_active=True,
-            effective_from__lte=self.payroll_period.end_date
-        ).filter(
-            models.Q(effective_to__isnull=True) | 
-            models.Q(effective_to__gte=self.payroll_period.start_date)
-        )
+        if salary_structure is None:
+            salary_structure = active_salary_structures(self.payroll_period).filter(employee_id=self.employee_id)
+
+        # Salary components are reference data, resolve them from cache
+        # instead of one query per structure row
+        components = get_salary_components()
+        salary_structure = [
+            (structure, (components.get(structure.salary_component_id) or structure.salary_component).component_type)
+            for structure in salary_structure
+        ]
 
         # First pass: calculate basic salary
-        for structure in salary_structure:
-            if structure.salary_component.component_type == 'basic':
+        for structure, component_type in salary_structure:
+            if component_type == 'basic':
                 basic_salary = structure.get_calculated_amount()
                 break
 
         # Second pass: calculate all components
-        for structure in salary_structure:
+        for structure, component_type in salary_structure:
             amount = structure.get_calculated_amount(basic_salary)
             
-            if structure.salary_component.component_type in ['basic', 'allowance', 'bonus']:
+            if component_type in ['basic', 'allowance', 'bonus']:
                 gross_salary += amount
-            elif structure.salary_component.component_type in ['deduction', 'tax', 'insurance']:
+            elif component_type in ['deduction', 'tax', 'insurance']:
                 total_deductions += amount
 
         # Add overtime
@@ -145,6 +169,10 @@ class Payslip(models.Model):
     class Meta:
         ordering = ['-payroll_period__start_date', 'employee']
         unique_together = ['employee', 'payroll_period']
+        indexes = [
+            # An employee's payslips by status (payroll summary, paid history)
+            models.Index(fields=['employee', 'status', 'payroll_period'], name='payslip_employee_status_idx'),
+        ]
 
 class PayslipComponent(models.Model):
     payslip = models.ForeignKey(Payslip, on_delete=models.CASCADE, related_name='components')
@@ -0,0 +1,62 @@
+from collections import defaultdict
+
+from celery import shared_task
+from django.db import transaction
+from django.utils import timezone
+
+from apps.core.bulk import iter_batches
+from apps.core.cache import invalidate_model
+from apps.employees.models import Employee
+from apps.employees.tasks import refresh_department_kpis_task
+
+from .models import PayrollPeriod, Payslip, active_salary_structures
+
+RUN_BATCH_SIZE = 500
+PAYSLIP_TOTAL_FIELDS = ['gross_salary', 'total_deductions', 'net_salary', 'updated_at']
+
+
+@shared_task
+def run_payroll(period_id, batch_size=RUN_BATCH_SIZE):
+    """
+    Create or recalculate the draft payslips of a payroll period for every
+    active employee, ``batch_size`` employees per transaction. Processed and
+    paid payslips are left alone. Routed to the ``batch`` queue.
+    """
+    period = PayrollPeriod.objects.get(pk=period_id)
+    employees = Employee.objects.filter(status='active').order_by('id')
+    calculated = 0
+
+    for batch in iter_batches(employees, ('id',), batch_size):
+        employee_ids = [row.id for row in batch]
+        structures = defaultdict(list)
+        for structure in active_salary_structures(period).filter(employee_id__in=employee_ids):
+            structures[structure.employee_id].append(structure)
+        with transaction.atomic():
+            existing = {
+                payslip.employee_id: payslip
+                for payslip in Payslip.objects.filter(payroll_period=period, employee_id__in=employee_ids)
+            }
+            created, updated = [], []
+            for employee_id in employee_ids:
+                payslip = existing.get(employee_id)
+                if payslip is None:
+                    payslip = Payslip(employee_id=employee_id, payroll_period=period)
+                    created.append(payslip)
+                elif payslip.status != 'draft':
+                    continue
+                else:
+                    payslip.updated_at = timezone.now()
+                    updated.append(payslip)
+                payslip.payroll_period = period
+                payslip.calculate_salary(structures[employee_id])
+            Payslip.objects.bulk_create(created)
+            Payslip.objects.bulk_update(updated, PAYSLIP_TOTAL_FIELDS)
+            calculated += len(created) + len(updated)
+
+    period.is_processed = True
+    period.save(update_fields=['is_processed', 'updated_at'])
+    # bulk_create/bulk_update bypass the signals that invalidate cached summaries
+    invalidate_model(Payslip)
+    # Department payroll totals come from the latest processed period
+    refresh_department_kpis_task.delay()
+    return {'period': period_id, 'payslips': calculated}
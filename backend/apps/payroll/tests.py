@@ -1,3 +1,140 @@
+import csv
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.core import exports
+from apps.core.testing import create_employee
+from apps.employees.tasks import refresh_department_kpis_task
+
+from .exports import PAYSLIP_COLUMNS, PAYSLIP_COMPONENT_COLUMNS
+from .models import EmployeeSalaryStructure, PayrollPeriod, Payslip, PayslipComponent, SalaryComponent
+
+
+class PayrollRunTests(TestCase):
+    def test_run_creates_recalculates_drafts_and_skips_processed(self):
+        today = timezone.localdate()
+        period = PayrollPeriod.objects.create(
+            name='This month', start_date=today - timedelta(days=30), end_date=today, payment_date=today,
+        )
+        basic = SalaryComponent.objects.create(name='Basic', component_type='basic')
+        tax = SalaryComponent.objects.create(name='Tax', component_type='tax')
+        new, draft, processed = (create_employee(name) for name in ('new', 'draft', 'processed'))
+        for employee in (new, draft, processed):
+            EmployeeSalaryStructure.objects.bulk_create([
+                EmployeeSalaryStructure(employee=employee, salary_component=basic, amount=Decimal('1000'),
+                                        effective_from=period.start_date),
+                EmployeeSalaryStructure(employee=employee, salary_component=tax, amount=Decimal('10'),
+                                        is_percentage=True, effective_from=period.start_date),
+            ])
+        Payslip.objects.bulk_create([
+            Payslip(employee=draft, payroll_period=period, net_salary=Decimal('1.00')),
+            Payslip(employee=processed, payroll_period=period, net_salary=Decimal('2.00'), status='processed'),
+        ])
+
+        with patch.object(refresh_department_kpis_task, 'delay'), CaptureQueriesContext(connection) as queries:
+            call_command('run_payroll', period.id, '--now', '--batch-size', 2, stdout=StringIO())
+
+        net = dict(Payslip.objects.filter(payroll_period=period).values_list('employee_id', 'net_salary'))
+        self.assertEqual(net, {new.id: Decimal('900.00'), draft.id: Decimal('900.00'), processed.id: Decimal('2.00')})
+        structure_table = EmployeeSalaryStructure._meta.db_table
+        lookups = [query for query in queries.captured_queries if f'FROM "{structure_table}"' in query['sql']]
+        self.assertEqual(len(lookups), 2, 'one salary structure query per batch')
+        period.refresh_from_db()
+        self.assertTrue(period.is_processed)
+
+
+class PayrollExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = create_employee('payroll-admin', is_staff=True).user
+        cls.named = create_employee('named')
+        cls.unnamed = create_employee('unnamed')
+        cls.unnamed.user.first_name = cls.unnamed.user.last_name = ''
+        cls.unnamed.user.save()
+        cls.january, cls.february = (
+            PayrollPeriod.objects.create(
+                name=name, start_date=start, end_date=end, payment_date=end, is_processed=True,
+            )
+            for name, start, end in (
+                ('January', date(2026, 1, 1), date(2026, 1, 31)),
+                ('February', date(2026, 2, 1), date(2026, 2, 28)),
+            )
+        )
+        cls.payslip, cls.unnamed_payslip, _ = Payslip.objects.bulk_create([
+            Payslip(employee=cls.named, payroll_period=cls.january, gross_salary=Decimal('1234.5'),
+                    total_deductions=Decimal('34.50'), net_salary=Decimal('1200'), working_days=22,
+                    status='paid', payment_date=date(2026, 2, 2)),
+            Payslip(employee=cls.unnamed, payroll_period=cls.january, net_salary=Decimal('10')),
+            Payslip(employee=cls.named, payroll_period=cls.february, net_salary=Decimal('99')),
+        ])
+        PayslipComponent.objects.create(
+            payslip=cls.payslip, amount=Decimal('1234.5'),
+            salary_component=SalaryComponent.objects.create(name='Basic', component_type='basic'),
+        )
+
+    def download(self, **params):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('export_payroll'), params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_has_the_declared_columns_and_formats_values(self):
+        header, *rows = csv.reader(StringIO(self.download(period=self.january.id)))
+        self.assertEqual(header, [name for name, kind in PAYSLIP_COLUMNS])
+        self.assertEqual(header[:3], ['id', 'employee_id', 'employee_name'])
+        self.assertEqual(rows, [
+            [str(self.payslip.id), 'T-named', 'Named Tester', 'January', '2026-01-01', '2026-01-31',
+             '1234.50', '34.50', '1200.00', '22', '0', '0.00', '0.00', 'paid', '2026-02-02'],
+            [str(self.unnamed_payslip.id), 'T-unnamed', 'unnamed', 'January', '2026-01-01', '2026-01-31',
+             '0.00', '0.00', '10.00', '0', '0', '0.00', '0.00', 'draft', ''],
+        ])
+
+    def test_components_export(self):
+        header, *rows = csv.reader(StringIO(self.download(period=self.january.id, components='true')))
+        self.assertEqual(header, [name for name, kind in PAYSLIP_COMPONENT_COLUMNS])
+        self.assertEqual(rows, [[str(self.payslip.id), 'T-named', 'January', 'Basic', 'basic', '1234.50', 'True']])
+
+    def test_without_a_period_every_payslip_is_exported(self):
+        rows = list(csv.reader(StringIO(self.download())))[1:]
+        self.assertEqual([row[3] for row in rows], ['January', 'January', 'February'])
+
+    def test_only_staff_can_export(self):
+        self.client.force_login(self.named.user)
+        self.assertEqual(self.client.get(reverse('export_payroll')).status_code, 403)
+
+    def test_command_writes_the_same_csv(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'payslips.csv'
+            call_command('export_payroll', '--period', self.january.id, '--output', path, stdout=StringIO())
+            self.assertEqual(path.read_text(), self.download(period=self.january.id))
+
+    @skipUnless(exports.pyarrow, 'pyarrow is not installed')
+    def test_parquet_round_trip(self):
+        import pyarrow.parquet
 
-# Create your tests here.
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'payslips.parquet'
+            call_command(
+                'export_payroll', '--period', self.january.id, '--format', 'parquet', '--output', path,
+                stdout=StringIO(),
+            )
+            table = pyarrow.parquet.read_table(path)
+        self.assertEqual(table.column_names, [name for name, kind in PAYSLIP_COLUMNS])
+        first, second = table.to_pylist()
+        self.assertEqual(
+            (first['employee_name'], first['gross_salary'], first['period_end'], first['payment_date']),
+            ('Named Tester', Decimal('1234.50'), date(2026, 1, 31), date(2026, 2, 2)),
+        )
+        self.assertEqual((second['employee_name'], second['payment_date']), ('unnamed', None))
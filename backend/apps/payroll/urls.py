@@ -5,4 +5,5 @@ urlpatterns = [
     path('test/', views.test_view, name='payroll_test'),
     path('', views.list_payroll, name='list_payroll'),
     path('summary/', views.payroll_summary, name='payroll_summary'),
+    path('export/', views.export_payroll, name='export_payroll'),
 ]
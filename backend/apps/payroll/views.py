@@ -4,13 +4,81 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
-from drf_spectacular.utils import extend_schema, OpenApiResponse
-from .models import Payslip
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
+from apps.core.serialization import display_name, values_rows
+from django.contrib.auth.models import User
+from django.db import router
+from django.db.models import Count, Sum
+from apps.core.cache import cached
+from apps.core.exports import streaming_csv_response
+from apps.core.routers import replica_reads
+from .exports import PAYSLIP_COLUMNS, PAYSLIP_COMPONENT_COLUMNS, payslip_component_rows, payslip_rows
+from .models import PayrollPeriod, Payslip
 from apps.employees.models import Employee
 from decimal import Decimal
 
 # Create your views here.
 
+PAYROLL_LIST_FIELDS = (
+    'id', 'employee__employee_id', 'employee__user__first_name',
+    'employee__user__last_name', 'employee__user__username',
+    'payroll_period__name', 'payroll_period__start_date',
+    'payroll_period__end_date', 'gross_salary', 'total_deductions',
+    'net_salary', 'working_days', 'present_days', 'overtime_hours',
+    'overtime_amount', 'status', 'payment_date', 'created_at',
+)
+
+def _payroll_row(row):
+    return {
+        'id': row.id,
+        'employee_name': display_name(
+            row.employee__user__first_name,
+            row.employee__user__last_name,
+            row.employee__user__username,
+        ),
+        'employee_id': row.employee__employee_id,
+        'payroll_period': row.payroll_period__name,
+        'pay_period_start': row.payroll_period__start_date,
+        'pay_period_end': row.payroll_period__end_date,
+        'gross_salary': row.gross_salary,
+        'total_deductions': row.total_deductions,
+        'net_salary': row.net_salary,
+        'working_days': row.working_days,
+        'present_days': row.present_days,
+        'overtime_hours': row.overtime_hours,
+        'overtime_amount': row.overtime_amount,
+        'status': row.status,
+        'payment_date': row.payment_date,
+        'created_at': row.created_at
+    }
+
+def _build_payroll_summary(employee, today):
+    # Get current month payroll
+    current_month = today.replace(day=1)
+    
+    current_payroll = Payslip.objects.filter(
+        employee=employee,
+        payroll_period__start_date__gte=current_month,
+        status='paid'
+    ).values('net_salary', 'payroll_period__end_date').first()
+    
+    # Get total earnings this year
+    yearly = Payslip.objects.filter(
+        employee=employee,
+        payroll_period__start_date__year=today.year,
+        status='paid'
+    ).aggregate(total=Sum('net_salary'), count=Count('id'))
+    
+    return {
+        'employee_name': employee.user.get_full_name() or employee.user.username,
+        'employee_id': employee.employee_id,
+        'current_month_salary': float(current_payroll['net_salary']) if current_payroll else 0.0,
+        'total_yearly_earnings': float(yearly['total'] or 0),
+        'payroll_records_count': yearly['count'],
+        'last_payroll_date': current_payroll['payroll_period__end_date'] if current_payroll else None
+    }
+
 def test_view(request):
     """Simple test view to verify URL configuration is working"""
     return JsonResponse({
@@ -33,43 +101,25 @@ def test_view(request):
 )
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@replica_reads
 def list_payroll(request):
     """Get payroll records"""
     try:
         if request.user.is_staff:
             # Admin can see all payroll records
-            payroll_records = Payslip.objects.select_related('employee__user', 'payroll_period').all()
+            payroll_records = Payslip.objects.all()
         else:
             # Regular users see only their own records
             try:
                 employee = Employee.objects.get(user=request.user)
-                payroll_records = Payslip.objects.filter(employee=employee).select_related('payroll_period')
+                payroll_records = Payslip.objects.filter(employee=employee)
             except Employee.DoesNotExist:
                 return Response({
                     'payroll_records': [],
                     'count': 0
                 }, status=status.HTTP_200_OK)
         
-        payroll_data = []
-        for record in payroll_records:
-            payroll_data.append({
-                'id': record.id,
-                'employee_name': record.employee.user.get_full_name() or record.employee.user.username,
-                'employee_id': record.employee.employee_id,
-                'payroll_period': record.payroll_period.name,
-                'pay_period_start': record.payroll_period.start_date,
-                'pay_period_end': record.payroll_period.end_date,
-                'gross_salary': float(record.gross_salary),
-                'total_deductions': float(record.total_deductions),
-                'net_salary': float(record.net_salary),
-                'working_days': record.working_days,
-                'present_days': record.present_days,
-                'overtime_hours': float(record.overtime_hours),
-                'overtime_amount': float(record.overtime_amount),
-                'status': record.status,
-                'payment_date': record.payment_date,
-                'created_at': record.created_at
-            })
+        payroll_data = values_rows(payroll_records, PAYROLL_LIST_FIELDS, _payroll_row)
         
         return Response({
             'payroll_records': payroll_data,
@@ -96,48 +146,76 @@ def list_payroll(request):
 )
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@replica_reads
 def payroll_summary(request):
     """Get payroll summary for user"""
     try:
         try:
-            employee = Employee.objects.get(user=request.user)
+            employee = Employee.objects.select_related('user').get(user=request.user)
         except Employee.DoesNotExist:
             return Response({
                 'error': 'Employee record not found'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        # Get current month payroll
+        # Summaries only change when payslips, periods or the employee change,
+        # and are keyed by day so month/year rollovers are picked up
         from datetime import date
-        current_month = date.today().replace(day=1)
-        
-        current_payroll = Payslip.objects.filter(
-            employee=employee,
-            payroll_period__start_date__gte=current_month,
-            status='paid'
-        ).first()
-        
-        # Get total earnings this year
-        current_year = date.today().year
-        yearly_payrolls = Payslip.objects.filter(
-            employee=employee,
-            payroll_period__start_date__year=current_year,
-            status='paid'
+        today = date.today()
+        summary = cached(
+            (Payslip, PayrollPeriod, Employee, User), f'summary:{employee.id}:{today}',
+            lambda: _build_payroll_summary(employee, today)
         )
         
-        total_yearly_earnings = sum(p.net_salary for p in yearly_payrolls)
-        
-        summary = {
-            'employee_name': employee.user.get_full_name() or employee.user.username,
-            'employee_id': employee.employee_id,
-            'current_month_salary': float(current_payroll.net_salary) if current_payroll else 0.0,
-            'total_yearly_earnings': float(total_yearly_earnings),
-            'payroll_records_count': yearly_payrolls.count(),
-            'last_payroll_date': current_payroll.payroll_period.end_date if current_payroll else None
-        }
-        
         return Response(summary, status=status.HTTP_200_OK)
         
     except Exception as e:
         return Response({
             'error': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@extend_schema(
+    tags=['Payroll'],
+    summary='Export Payroll',
+    description='Stream payslips, or their components with components=true, as CSV (admin only)',
+    parameters=[
+        OpenApiParameter('period', OpenApiTypes.INT, description='Payroll period id'),
+        OpenApiParameter('components', OpenApiTypes.BOOL, description='Export payslip components instead of payslips'),
+    ],
+    responses={
+        200: OpenApiResponse(
+            description='CSV file'
+        ),
+        400: OpenApiResponse(
+            description='Invalid period'
+        ),
+        403: OpenApiResponse(
+            description='Admin access required'
+        )
+    }
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@replica_reads
+def export_payroll(request):
+    """Stream payslips or payslip components as CSV"""
+    if not request.user.is_staff:
+        return Response({
+            'error': 'Only administrators can export payroll'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    period = request.query_params.get('period')
+    if period and not period.isdigit():
+        return Response({
+            'error': 'period must be a payroll period id'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    suffix = period or 'all'
+    # Rows stream after the view returns; bind the replica chosen for this request
+    using = router.db_for_read(Payslip)
+    if request.query_params.get('components') in ('1', 'true', 'True'):
+        return streaming_csv_response(
+            request, f'payslip-components-{suffix}.csv',
+            PAYSLIP_COMPONENT_COLUMNS, payslip_component_rows(period, using=using)
+        )
+    return streaming_csv_response(request, f'payslips-{suffix}.csv', PAYSLIP_COLUMNS, payslip_rows(period, using=using))
+
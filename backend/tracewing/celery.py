@@ -1,6 +1,9 @@
 import os
 from celery import Celery
+from celery.schedules import crontab
+from celery.signals import before_task_publish, task_failure, task_postrun, task_prerun, worker_process_init
 from decouple import config
+from kombu import Queue
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tracewing.settings')
@@ -29,9 +32,132 @@ app.conf.update(
     task_reject_on_worker_lost=True,
 )
 
+# Workload classes. Each has its own queue, served by its own worker
+# (see docker-compose.yml), so a payroll run can never hold up notification
+# delivery:
+#   realtime     user-facing notifications; many slots, short limits, prefetch
+#                1 so urgent (low priority number) tasks are never queued
+#                behind ones a busy worker already reserved
+#   location     location stream processing; steady, one batch at a time
+#   batch        payroll runs and other long jobs; few slots, prefetch 1
+#   maintenance  nightly housekeeping
+# Unrouted tasks go to "default", which the realtime worker also serves.
+# Realtime and location tasks set their own, shorter time limits; the global
+# 30 minute limit above is the ceiling for batch work.
+CELERY_QUEUES = ('realtime', 'location', 'batch', 'maintenance', 'default')
+
+app.conf.update(
+    task_queues=[Queue(name) for name in CELERY_QUEUES],
+    task_default_queue='default',
+    task_routes={
+        'apps.notifications.tasks.*': {'queue': 'realtime'},
+        'apps.geofencing.tasks.process_location_stream_task': {'queue': 'location'},
+        'apps.geofencing.tasks.rollup_occupancy_task': {'queue': 'location'},
+        'apps.geofencing.tasks.pack_location_history_task': {'queue': 'maintenance'},
+        'apps.geofencing.tasks.prune_geofence_tombstones_task': {'queue': 'maintenance'},
+        'apps.payroll.tasks.*': {'queue': 'batch'},
+        'apps.employees.tasks.*': {'queue': 'batch'},
+        'tracewing.celery.debug_task': {'queue': 'maintenance'},
+        'celery.backend_cleanup': {'queue': 'maintenance'},
+    },
+    # Priorities within a queue: the Redis transport keeps one list per step
+    # and always drains the lower (more urgent) step first. 0 is the most
+    # urgent, tasks default to the middle.
+    broker_transport_options={
+        'priority_steps': list(range(10)),
+        'sep': ':',
+        'queue_order_strategy': 'priority',
+    },
+    task_default_priority=5,
+)
+
 # Load task modules from all registered Django apps.
 app.autodiscover_tasks()
 
+# Periodic tasks, installed into django-celery-beat's DatabaseScheduler
+app.conf.beat_schedule = {
+    'process-location-stream': {
+        'task': 'apps.geofencing.tasks.process_location_stream_task',
+        'schedule': config('LOCATION_STREAM_INTERVAL_SECONDS', default=30, cast=float),
+    },
+    'rollup-occupancy': {
+        'task': 'apps.geofencing.tasks.rollup_occupancy_task',
+        'schedule': config('OCCUPANCY_ROLLUP_INTERVAL_SECONDS', default=300, cast=float),
+    },
+    'refresh-department-kpis': {
+        'task': 'apps.employees.tasks.refresh_department_kpis_task',
+        'schedule': config('KPI_REFRESH_INTERVAL_SECONDS', default=300, cast=float),
+    },
+    'pack-location-history': {
+        'task': 'apps.geofencing.tasks.pack_location_history_task',
+        'schedule': crontab(hour=3, minute=0),
+    },
+    'prune-geofence-tombstones': {
+        'task': 'apps.geofencing.tasks.prune_geofence_tombstones_task',
+        'schedule': crontab(hour=3, minute=30),
+    },
+}
+
+
+@worker_process_init.connect
+def reset_db_connection_pools(**kwargs):
+    # Celery's Django fixup already drops inherited connections after fork and
+    # applies CONN_MAX_AGE around each task. psycopg connection pools (DB_POOL)
+    # live on the backend class though, so forget any pool inherited from the
+    # parent and let each child process open its own on first use.
+    from django.db import connections
+    for conn in connections.all():
+        getattr(type(conn), '_connection_pools', {}).pop(conn.alias, None)
+
+
+# Sampling profiler (SLOW_PROFILER): keep profiles of tasks slower than
+# SLOW_PROFILER_THRESHOLD_MS
+_profiled_tasks = {}
+
+@task_prerun.connect
+def start_task_profile(task_id=None, **kwargs):
+    from django.conf import settings
+    if settings.SLOW_PROFILER:
+        from apps.core.profiling import get_profiler
+        _profiled_tasks[task_id] = get_profiler().start()
+
+@task_postrun.connect
+def finish_task_profile(task_id=None, task=None, **kwargs):
+    unit = _profiled_tasks.pop(task_id, None)
+    if unit is not None:
+        from apps.core.profiling import finish
+        finish('task', task.name, unit)
+
+# Task metrics (CELERY_METRICS): run time, queue wait and outcomes, shared
+# through Redis and rendered by /metrics with the queue depths
+@before_task_publish.connect
+def stamp_publish_time(headers=None, **kwargs):
+    from django.conf import settings
+    if settings.CELERY_METRICS and headers is not None:
+        from apps.core.task_metrics import mark_published
+        mark_published(headers)
+
+@task_prerun.connect
+def start_task_metrics(task_id=None, task=None, **kwargs):
+    from django.conf import settings
+    if settings.CELERY_METRICS:
+        from apps.core.task_metrics import task_started
+        task_started(task_id, task)
+
+@task_postrun.connect
+def finish_task_metrics(task_id=None, task=None, state=None, **kwargs):
+    from django.conf import settings
+    if settings.CELERY_METRICS:
+        from apps.core.task_metrics import task_finished
+        task_finished(task_id, task, state)
+
+@task_failure.connect
+def count_task_failure(sender=None, exception=None, **kwargs):
+    from django.conf import settings
+    if settings.CELERY_METRICS:
+        from apps.core.task_metrics import task_failed
+        task_failed(sender, exception)
+
 @app.task(bind=True)
 def debug_task(self):
     print(f'Request: {self.request!r}') 
\ No newline at end of file
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import copy
 from pathlib import Path
 
 from decouple import config
@@ -40,10 +41,13 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.gis',  # GeoDjango for PostGIS support
+    'django.contrib.postgres',  # Range fields and exclusion constraints
     'corsheaders',
     'rest_framework',
     'rest_framework.authtoken',
     'drf_spectacular',  # API documentation
+    'django_celery_beat',  # Beat schedule stored in the database (DatabaseScheduler)
+    'apps.core',
     'apps.authentication',
     'apps.employees',
     'apps.attendance',
@@ -63,6 +67,30 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Per-request query count / latency instrumentation (Server-Timing + /metrics)
+REQUEST_METRICS = config('REQUEST_METRICS', default=False, cast=bool)
+METRICS_ALLOWED_IPS = config(
+    'METRICS_ALLOWED_IPS',
+    default='127.0.0.1/32,::1/128',
+    cast=lambda value: [network.strip() for network in value.split(',') if network.strip()],
+)
+
+if REQUEST_METRICS:
+    MIDDLEWARE.insert(0, 'apps.core.middleware.RequestMetricsMiddleware')
+
+# Celery task timings, outcomes and queue depths, kept in the broker's Redis
+# and appended to /metrics
+CELERY_METRICS = config('CELERY_METRICS', default=False, cast=bool)
+
+# Sampling profiler for slow requests and Celery tasks (collapsed stacks)
+SLOW_PROFILER = config('SLOW_PROFILER', default=False, cast=bool)
+SLOW_PROFILER_THRESHOLD_MS = config('SLOW_PROFILER_THRESHOLD_MS', default=1000, cast=int)
+SLOW_PROFILER_INTERVAL_MS = config('SLOW_PROFILER_INTERVAL_MS', default=10, cast=int)
+SLOW_PROFILER_DIR = config('SLOW_PROFILER_DIR', default=str(BASE_DIR / 'profiles'))
+
+if SLOW_PROFILER:
+    MIDDLEWARE.insert(0, 'apps.core.middleware.SlowRequestProfilerMiddleware')
+
 ROOT_URLCONF = 'tracewing.urls'
 
 TEMPLATES = [
@@ -85,6 +113,9 @@ WSGI_APPLICATION = 'tracewing.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+# Connections are closed after each request by default: under ASGI every
+# sync_to_async thread would otherwise keep its own persistent connection.
+# Reuse connections with DB_POOL instead.
 
 DATABASES = {
     'default': {
@@ -94,9 +125,111 @@ DATABASES = {
         'PASSWORD': config('DB_PASSWORD'),
         'HOST': config('DB_HOST', default='localhost'),
         'PORT': config('DB_PORT', default='5432'),
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=0, cast=int),
+        'CONN_HEALTH_CHECKS': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+        'OPTIONS': {},
     }
 }
 
+# Connection pooling
+# DB_POOL enables psycopg3's native pool (one pool per process, so it is safe
+# for WSGI/ASGI workers and forked Celery workers alike). Persistent
+# connections are managed by the pool, so CONN_MAX_AGE must be 0.
+if config('DB_POOL', default=False, cast=bool):
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+        'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+        'timeout': config('DB_POOL_TIMEOUT', default=10, cast=int),
+    }
+
+# DB_PGBOUNCER targets PgBouncer in transaction pooling mode, which cannot keep
+# server-side cursors or prepared statements across transactions.
+if config('DB_PGBOUNCER', default=False, cast=bool):
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+    DATABASES['default']['OPTIONS']['prepare_threshold'] = None
+
+# Read replicas (apps/core/routers.py): comma-separated host[:port] of
+# streaming replicas of the default database, same name and credentials.
+# Views marked @replica_reads read from them, except for users who wrote
+# within REPLICA_STICKY_SECONDS.
+DB_REPLICA_HOSTS = config(
+    'DB_REPLICA_HOSTS',
+    default='',
+    cast=lambda value: [host.strip() for host in value.split(',') if host.strip()],
+)
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=15, cast=int)
+
+DATABASE_REPLICAS = []
+for index, replica in enumerate(DB_REPLICA_HOSTS, start=1):
+    host, _, port = replica.partition(':')
+    alias = f'replica{index}'
+    DATABASES[alias] = {
+        **copy.deepcopy(DATABASES['default']),
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['apps.core.routers.ReplicaRouter']
+
+if DATABASE_REPLICAS:
+    MIDDLEWARE.append('apps.core.middleware.ReplicaPinMiddleware')
+
+
+# Cache
+# Redis is already provisioned for Celery; cached reads use a separate DB.
+# Leave CACHE_URL empty to fall back to a per-process memory cache.
+
+CACHE_URL = config('CACHE_URL', default='redis://redis:6379/1')
+
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+            'KEY_PREFIX': 'tracewing',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+MODEL_CACHE_TIMEOUT = config('MODEL_CACHE_TIMEOUT', default=15 * 60, cast=int)
+
+
+# Geofencing
+# A visit ends once fixes have been outside its fence for this long
+
+GEOFENCE_EXIT_GRACE_SECONDS = config('GEOFENCE_EXIT_GRACE_SECONDS', default=120, cast=int)
+
+# Radius of the geofence bundle the mobile app evaluates on-device
+GEOFENCE_BUNDLE_RADIUS_KM = config('GEOFENCE_BUNDLE_RADIUS_KM', default=50, cast=float)
+# Deleted geofences are reported to bundle deltas for this long; clients
+# holding an older bundle version get a full bundle
+GEOFENCE_TOMBSTONE_RETENTION_DAYS = config('GEOFENCE_TOMBSTONE_RETENTION_DAYS', default=30, cast=int)
+
+# Automatic attendance: the first geofence entry of the day checks an employee
+# in, staying outside every geofence this long after leaving checks them out
+AUTO_ATTENDANCE = config('AUTO_ATTENDANCE', default=False, cast=bool)
+AUTO_CHECKOUT_AFTER_MINUTES = config('AUTO_CHECKOUT_AFTER_MINUTES', default=30, cast=int)
+
+# Occupancy and heatmap roll-ups (apps/geofencing/occupancy.py): every run
+# re-aggregates this many recent minutes; heatmap cells are geohashes of this
+# precision (7 = ~150 m)
+OCCUPANCY_ROLLUP_LOOKBACK_MINUTES = config('OCCUPANCY_ROLLUP_LOOKBACK_MINUTES', default=120, cast=int)
+HEATMAP_GEOHASH_PRECISION = config('HEATMAP_GEOHASH_PRECISION', default=7, cast=int)
+
+
+# Admin changelists of large tables (apps/core/changelists.py): planner
+# estimates replace COUNT(*) above this many rows, and unfiltered lists only
+# cover this many recent days
+ADMIN_ESTIMATED_COUNT_THRESHOLD = config('ADMIN_ESTIMATED_COUNT_THRESHOLD', default=10000, cast=int)
+ADMIN_DATE_HIERARCHY_DAYS = config('ADMIN_DATE_HIERARCHY_DAYS', default=90, cast=int)
 
 
 # Password validation
@@ -166,7 +299,9 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'apps.core.renderers.ORJSONRenderer'
+        if config('FAST_JSON_RENDERER', default=True, cast=bool)
+        else 'rest_framework.renderers.JSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
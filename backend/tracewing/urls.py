@@ -14,6 +14,7 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
@@ -34,3 +35,10 @@ urlpatterns = [
     path('api/notifications/', include('apps.notifications.urls')),
     path('api/payroll/', include('apps.payroll.urls')),
 ]
+
+if settings.REQUEST_METRICS or settings.CELERY_METRICS:
+    from apps.core.views import metrics_view
+
+    urlpatterns += [
+        path('metrics', metrics_view, name='metrics'),
+    ]